@@ -0,0 +1,245 @@
+import contextlib
+import threading
+import time
+from collections import deque
+
+from prediction_client import _env_float, _env_int
+
+
+QUEUE_FULL = "queue_full"
+WAIT_TIMEOUT = "wait_timeout"
+SESSION_QUOTA = "session_quota"
+
+# Llamadas que no pasan por la admisión: el sondeo de salud es esporádico y no debe fallar por la cola
+EXEMPT_KINDS = ("probe",)
+
+# Llamadas interactivas: esperan como mucho ``max_wait``; las demás (lotes, barridos) esperan lo necesario
+INTERACTIVE_KINDS = ("prediction", "hedge")
+
+# Llamadas por lotes (filas de un archivo, barridos, streaming, paridad): van por su propio presupuesto
+BATCH_KINDS = ("batch", "parity")
+
+
+class AdmissionRejected(Exception):
+    """La llamada no se admitió; ``retry_after`` sugiere cuándo reintentar (segundos)"""
+
+    def __init__(self, reason, retry_after, message):
+        super().__init__(message)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Cubeta de tokens: ``rate`` tokens por segundo con capacidad ``burst``. No es thread-safe."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+
+    def refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def try_take(self, now):
+        self.refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def time_to_token(self):
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+class Permit:
+    """Cupo de una llamada admitida; se devuelve al salir del ``with``"""
+
+    def __init__(self, controller):
+        self._controller = controller
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._controller.release()
+
+
+class AdmissionController:
+    """Control de admisión de las llamadas salientes, compartido por todas las sesiones.
+
+    Cada llamada necesita un token de la cubeta global (``rate`` por segundo,
+    ráfagas de hasta ``burst``) y un cupo entre las ``max_concurrent``
+    llamadas en vuelo. Si no los hay, espera en una cola de hasta
+    ``max_queue`` llamadas; las interactivas se rechazan si la espera pasa de
+    ``max_wait`` segundos, y con la cola llena se rechaza de inmediato.
+
+    Aparte, ``check_session`` aplica una cubeta por sesión para que los clics
+    repetidos de un usuario se rechacen al instante, antes de encolar nada.
+
+    Con ``batch`` (otro controlador, ver ``batch_controller``) las llamadas
+    por lotes usan ese presupuesto y no compiten con las interactivas: a 10
+    llamadas por segundo un lote por filas iría unas 30 veces más lento.
+    ``rate=0`` desactiva el límite de tasa y deja solo el de concurrencia.
+    """
+
+    def __init__(self, rate=None, burst=None, max_concurrent=None, max_wait=None, max_queue=None,
+                 session_rate=None, session_burst=None, window=1024, batch=None):
+        self.rate = rate if rate is not None else _env_float("ICFES_GLOBAL_RATE", 10.0)
+        self.burst = burst or _env_int("ICFES_GLOBAL_BURST", 20)
+        self.max_concurrent = max_concurrent or _env_int("ICFES_MAX_CONCURRENT", 8)
+        self.max_wait = max_wait or _env_float("ICFES_ADMISSION_MAX_WAIT", 5.0)
+        self.max_queue = max_queue or _env_int("ICFES_ADMISSION_MAX_QUEUE", 50)
+        self.session_rate = session_rate or _env_float("ICFES_SESSION_RATE", 0.5)
+        self.session_burst = session_burst or _env_int("ICFES_SESSION_BURST", 5)
+
+        self._cond = threading.Condition()
+        self._bucket = TokenBucket(self.rate, self.burst) if self.rate > 0 else None
+        self.batch = batch
+        self._sessions = {}
+        self._in_flight = 0
+        self._waiting = 0
+        self._wait_times = deque(maxlen=window)
+        self.admitted = 0
+        self.queued = 0
+        self.peak_waiting = 0
+        self.rejected = {QUEUE_FULL: 0, WAIT_TIMEOUT: 0, SESSION_QUOTA: 0}
+
+    def check_session(self, session_id):
+        """Descuenta un token de la cubeta de la sesión; lanza ``AdmissionRejected`` si no queda"""
+        now = time.monotonic()
+        with self._cond:
+            bucket = self._sessions.get(session_id)
+            if bucket is None:
+                if len(self._sessions) >= 10000:
+                    self._prune_sessions(now)
+                bucket = self._sessions[session_id] = TokenBucket(self.session_rate, self.session_burst)
+            if bucket.try_take(now):
+                return
+            self.rejected[SESSION_QUOTA] += 1
+            retry_after = bucket.time_to_token()
+        raise AdmissionRejected(
+            SESSION_QUOTA, retry_after,
+            f"Demasiadas solicitudes seguidas desde esta sesión; intenta de nuevo en {max(retry_after, 1):.0f} s.",
+        )
+
+    def _prune_sessions(self, now):
+        # Una cubeta que ya se habría rellenado por completo no guarda estado útil
+        for session_id, bucket in list(self._sessions.items()):
+            bucket.refill(now)
+            if bucket.tokens >= bucket.burst:
+                del self._sessions[session_id]
+
+    def admit(self, kind):
+        """Permiso para una llamada de tipo ``kind`` (etiqueta de métricas)"""
+        if kind in EXEMPT_KINDS:
+            return contextlib.nullcontext()
+        if kind in BATCH_KINDS and self.batch is not None:
+            return self.batch.acquire()
+        return self.acquire(self.max_wait if kind in INTERACTIVE_KINDS else None)
+
+    def acquire(self, max_wait=None):
+        """Espera un token y un cupo; devuelve un ``Permit`` o lanza ``AdmissionRejected``.
+
+        ``max_wait=None`` espera sin límite (salvo que la cola esté llena).
+        """
+        started = time.monotonic()
+        deadline = None if max_wait is None else started + max_wait
+        with self._cond:
+            self._refill(started)
+            if not self._can_admit():
+                if self._waiting >= self.max_queue:
+                    self.rejected[QUEUE_FULL] += 1
+                    raise AdmissionRejected(
+                        QUEUE_FULL, self._time_to_token(),
+                        "El servidor de predicción está saturado; intenta de nuevo en unos segundos.",
+                    )
+                self._wait_for_turn(deadline, max_wait)
+            if self._bucket is not None:
+                self._bucket.tokens -= 1
+            self._in_flight += 1
+            self.admitted += 1
+            self._wait_times.append(time.monotonic() - started)
+        return Permit(self)
+
+    def _wait_for_turn(self, deadline, max_wait):
+        # Se llama con el lock tomado; vuelve cuando ``_can_admit`` es cierto
+        self.queued += 1
+        self._waiting += 1
+        self.peak_waiting = max(self.peak_waiting, self._waiting)
+        try:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if self._can_admit():
+                    return
+                # Sin tokens se duerme hasta el siguiente; sin cupo, hasta que alguien libere uno
+                timeout = self._time_to_token() if not self._has_token() else None
+                if deadline is not None:
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self.rejected[WAIT_TIMEOUT] += 1
+                        raise AdmissionRejected(
+                            WAIT_TIMEOUT, self._time_to_token(),
+                            f"Hay demasiadas predicciones en curso; se esperó {max_wait:g} s sin turno. "
+                            "Intenta de nuevo en unos segundos.",
+                        )
+                    timeout = remaining if timeout is None else min(timeout, remaining)
+                self._cond.wait(timeout)
+        finally:
+            self._waiting -= 1
+
+    def _refill(self, now):
+        if self._bucket is not None:
+            self._bucket.refill(now)
+
+    def _has_token(self):
+        return self._bucket is None or self._bucket.tokens >= 1
+
+    def _time_to_token(self):
+        return self._bucket.time_to_token() if self._bucket is not None else 0.0
+
+    def _can_admit(self):
+        return self._in_flight < self.max_concurrent and self._has_token()
+
+    def release(self):
+        with self._cond:
+            self._in_flight -= 1
+            # A todos: el aviso no debe perderse en un hilo que ya venció su espera
+            self._cond.notify_all()
+
+    def stats(self):
+        batch = self.batch.stats() if self.batch is not None else None
+        with self._cond:
+            waits = sorted(self._wait_times)
+            return {
+                "rate_per_second": self.rate,
+                "burst": self.burst,
+                "max_concurrent": self.max_concurrent,
+                "in_flight": self._in_flight,
+                "waiting": self._waiting,
+                "peak_waiting": self.peak_waiting,
+                "admitted": self.admitted,
+                "queued": self.queued,
+                "rejected": dict(self.rejected),
+                "wait_p50_seconds": waits[len(waits) // 2] if waits else None,
+                "wait_p95_seconds": waits[min(len(waits) - 1, int(0.95 * len(waits)))] if waits else None,
+                "wait_max_seconds": waits[-1] if waits else None,
+                "sessions_tracked": len(self._sessions),
+                "batch": batch,
+            }
+
+
+def batch_controller():
+    """Presupuesto de las llamadas por lotes: por defecto solo un tope de concurrencia, sin límite de tasa.
+
+    Con los valores por defecto, 8 interactivas + 12 por lotes llenan justo
+    el pool de conexiones (ICFES_POOL_MAXSIZE=20).
+    """
+    return AdmissionController(
+        rate=_env_float("ICFES_BATCH_RATE", 0.0),
+        burst=_env_int("ICFES_BATCH_BURST", 1),
+        max_concurrent=_env_int("ICFES_BATCH_MAX_CONCURRENT", 12),
+        max_queue=_env_int("ICFES_BATCH_MAX_QUEUE", 1000),
+    )
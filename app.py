@@ -1,29 +1,48 @@
 import streamlit as st
-import numpy as np
-import pandas as pd
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+import os
+import threading
+import time
 import warnings
 from pathlib import Path
-from PIL import Image
-import requests
-import json
+from html_components import apple_card, badge_card_section, feature_grid, feature_importance_section, metric_card, status_card, style_block
+from image_pipeline import build_variants, resolve_image_path, responsive_img_html
+from prediction_client import PredictionClient, build_payload
+from admission_control import AdmissionController, AdmissionRejected, batch_controller
+from prediction_cache import PredictionCache
+from shared_store import open_shared_store
+from endpoint_monitor import EndpointMonitor, WARM, WARMING, COLD
+from endpoint_pool import EndpointPool
+from prediction_jobs import endpoint_secondary, local_secondary, make_executor, submit_prediction
+from circuit_breaker import OPEN, CircuitBreaker
+from hedged_requests import HedgePolicy, Hedger
+from live_prediction import LiveDebouncer, LiveStats
+from request_coalescer import RequestCoalescer
+from prediction_metrics import PredictionMetrics, start_metrics_server
+from rerun_profiler import RerunProfiler
+from session_memory import ADMIN_MODE, DEBUG_MODE, ERROR, OK, PredictionRecord, measure_session, session_state_usage
+# pandas, numpy, Pillow y los módulos que dependen de ellos (local_model, attributions,
+# batch_prediction, mlruns_index) se importan en la sección que los usa: así el arranque
+# y el primer render no pagan su costo de importación
 warnings.filterwarnings('ignore')
 
 
+@st.cache_resource(show_spinner=False, max_entries=8)
+def get_image_variants(path, mtime):
+    """Variantes responsive de una imagen, generadas una vez por proceso; ``mtime`` invalida la caché"""
+    return build_variants(path)
+
+
 def load_image(image_path):
-    """Carga una imagen de forma segura con múltiples intentos de ruta"""
-    possible_paths = [
-        image_path,
-        Path(image_path),
-        Path(__file__).parent / image_path,
-        Path.cwd() / image_path,
-    ]
-    
-    for path in possible_paths:
+    """Carga una imagen de forma segura con múltiples intentos de ruta y devuelve sus variantes"""
+    path = resolve_image_path(image_path)
+    if path is not None:
         try:
-            if Path(path).exists():
-                return Image.open(path)
+            return get_image_variants(str(path), path.stat().st_mtime)
         except Exception as e:
-            continue
+            # El archivo existe pero no se pudo procesar (imagen corrupta, error de Pillow...)
+            st.error(f"⚠️ **Image could not be loaded:** `{path}`\n\n{type(e).__name__}: {e}")
+            return None
     
     st.error(f"""
     ⚠️ **Image not found:** `{image_path}`
@@ -40,6 +59,192 @@ def load_image(image_path):
     return None
 
 
+@st.cache_resource
+def get_prediction_metrics():
+    """Métricas de latencia y errores del proceso; con ICFES_METRICS_PORT se exponen en /metrics"""
+    metrics = PredictionMetrics()
+    metrics_port = os.environ.get("ICFES_METRICS_PORT")
+    if metrics_port:
+        start_metrics_server(metrics, int(metrics_port))
+    return metrics
+
+
+@st.cache_resource
+def get_endpoint_pool():
+    """Réplicas del endpoint (ICFES_ENDPOINTS_FILE o ICFES_API_URLS) con su latencia y expulsiones"""
+    return EndpointPool()
+
+
+@st.cache_resource
+def get_admission_controller():
+    """Límite de tasa y de concurrencia de las llamadas salientes (None si ICFES_ADMISSION_ENABLED=0)"""
+    if os.environ.get("ICFES_ADMISSION_ENABLED", "1").lower() in ("0", "false", "no"):
+        return None
+    return AdmissionController(batch=batch_controller())
+
+
+@st.cache_resource
+def get_prediction_client():
+    """Cliente de predicción único por proceso, compartido por todas las sesiones"""
+    return PredictionClient(metrics=get_prediction_metrics(), pool=get_endpoint_pool(), admission=get_admission_controller())
+
+
+@st.cache_resource
+def get_shared_store():
+    """Almacén de resultados y salud compartido entre réplicas de la app (None si ICFES_SHARED_STORE está vacía)"""
+    return open_shared_store()
+
+
+@st.cache_resource
+def get_prediction_cache():
+    """Caché de resultados única por proceso, compartida por todas las sesiones"""
+    return PredictionCache(shared=get_shared_store())
+
+
+@st.cache_resource
+def get_local_model():
+    """Ensamble de árboles exportado para puntuar en proceso (None si no hay archivo)"""
+    from local_model import load_local_model
+
+    return load_local_model()
+
+
+@st.cache_resource
+def get_contribution_explainer():
+    """Aportes por feature con el ensamble local (None si no hay modelo local)"""
+    model = get_local_model()
+    if model is None:
+        return None
+    from attributions import ContributionExplainer
+
+    return ContributionExplainer(model)
+
+
+@st.cache_resource
+def get_sensitivity_explorer():
+    """Barridos "qué pasa si" con caché por payload base, compartidos por todas las sesiones"""
+    from sensitivity import SensitivityExplorer
+
+    return SensitivityExplorer(client=get_prediction_client(), ensemble=get_local_model())
+
+
+@st.cache_resource
+def get_circuit_breaker():
+    """Circuit breaker del endpoint remoto, compartido por todas las sesiones"""
+    return CircuitBreaker()
+
+
+@st.cache_resource
+def get_hedger():
+    """Duplica las peticiones lentas hacia un backend secundario (None si no hay o está desactivado).
+
+    El secundario es ICFES_SECONDARY_API_URL si está definida y, si no, el modelo local.
+    """
+    if os.environ.get("ICFES_HEDGE_ENABLED", "1").lower() in ("0", "false", "no"):
+        return None
+    secondary_url = os.environ.get("ICFES_SECONDARY_API_URL")
+    if secondary_url:
+        secondary = endpoint_secondary(get_prediction_client(), get_prediction_cache(), secondary_url)
+        return Hedger(HedgePolicy(get_prediction_metrics()), secondary, secondary_url)
+    model = get_local_model()
+    if model is None:
+        return None
+    return Hedger(HedgePolicy(get_prediction_metrics()), local_secondary(model), "modelo local")
+
+
+@st.cache_resource
+def get_endpoint_monitor():
+    """Monitor de salud del endpoint, uno por proceso (no por sesión)"""
+    return EndpointMonitor(get_prediction_client(), breaker=get_circuit_breaker(), shared=get_shared_store())
+
+
+@st.cache_resource
+def get_prediction_executor():
+    """Executor compartido que corre las predicciones fuera del hilo del script"""
+    return make_executor(get_prediction_client().pool_maxsize)
+
+
+@st.cache_resource
+def get_request_coalescer():
+    """Agrupa peticiones idénticas en vuelo de todas las sesiones en una sola llamada"""
+    return RequestCoalescer()
+
+
+@st.cache_resource
+def get_live_stats():
+    """Contadores del modo en vivo (cambios de entrada vs. peticiones enviadas) del proceso"""
+    return LiveStats()
+
+
+@st.cache_resource
+def get_prediction_history():
+    """Historial de predicciones en SQLite con escritor en segundo plano (None salvo que se defina ICFES_HISTORY_PATH)"""
+    from prediction_history import DEFAULT_HISTORY_PATH, PredictionHistory
+
+    if not DEFAULT_HISTORY_PATH:
+        return None
+    return PredictionHistory()
+
+
+@st.cache_resource
+def get_rerun_profiler():
+    """Mediciones de tiempo de script y bytes por rerun, compartidas por el proceso"""
+    return RerunProfiler()
+
+
+# Tabla de respaldo cuando no hay un file store local de MLflow
+FALLBACK_MODELS = {
+    'Modelo': ['Gradient Boosting', 'Random Forest', 'XGBoost', 'Linear Regression'],
+    'R² Score': [0.952, 0.938, 0.945, 0.812],
+    'RMSE': [12.3, 14.2, 13.1, 22.5],
+    'Tiempo (s)': [2.3, 1.8, 2.1, 0.5]
+}
+
+
+@st.cache_resource
+def get_mlruns_index():
+    """Índice persistente de los runs en mlruns/ (None si no hay file store local)"""
+    from mlruns_index import DEFAULT_MLRUNS_DIR, MlrunsIndex
+
+    if not Path(DEFAULT_MLRUNS_DIR).is_dir():
+        return None
+    return MlrunsIndex()
+
+
+@st.cache_resource(max_entries=2)
+def get_models_table(generation):
+    """Tabla de comparación estilizada, reconstruida solo cuando cambia el índice.
+
+    El ``Styler`` se comparte entre sesiones y Streamlit lo recalcula al
+    dibujarlo, por eso se devuelve con un lock para serializar ese paso.
+    """
+    import pandas as pd
+
+    index = get_mlruns_index()
+    df_models = index.frame() if index is not None else pd.DataFrame(FALLBACK_MODELS)
+    styler = (
+        df_models.style.highlight_max(subset=['R² Score'], color='rgba(0, 113, 227, 0.2)')
+                       .highlight_min(subset=['RMSE', 'Tiempo (s)'], color='rgba(0, 113, 227, 0.2)')
+                       .format({'R² Score': '{:.3f}', 'RMSE': '{:.1f}', 'Tiempo (s)': '{:.1f}'}, na_rep='—')
+                       .set_uuid(f"models-{generation}")
+    )
+    return styler, threading.Lock()
+
+
+# Texto bajo el puntaje según quién respondió
+RECORD_SOURCE_CAPTIONS = {
+    "secondary": "Respondió el backend secundario: el principal tardó más de lo habitual",
+    "local": "Predicción generada por el modelo local",
+    "shared": "Predicción calculada por otra réplica de la app",
+}
+
+# Intervalo con el que el cuadro de resultado revisa si terminó la predicción
+PREDICTION_POLL_SECONDS = 0.5
+
+# Intervalo con el que el modo en vivo revisa si ya pasó el debounce
+LIVE_POLL_SECONDS = 0.2
+
+
 # Configuración de la página
 st.set_page_config(
     page_title="Proyecto ICFES - MLOps",
@@ -48,9 +253,11 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-# CSS personalizado estilo Apple
-st.markdown("""
-<style>
+rerun_profiler = get_rerun_profiler()
+app_run = rerun_profiler.start()
+
+# CSS personalizado estilo Apple; se minifica una sola vez con style_block
+APP_CSS = """
     @import url('https://fonts.googleapis.com/css2?family=SF+Pro+Display:wght@300;400;500;600;700&display=swap');
     
     * {
@@ -447,8 +654,15 @@ st.markdown("""
             padding: 3rem 5%;
         }
     }
-</style>
-""", unsafe_allow_html=True)
+
+    .component-stack {
+        display: flex;
+        flex-direction: column;
+        gap: 1rem;
+    }
+"""
+
+st.markdown(style_block(APP_CSS), unsafe_allow_html=True)
 
 # Hero Section
 st.markdown("""
@@ -475,46 +689,13 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # SECCIÓN: MLOPS
-st.markdown("""
-<div class="feature-grid">
-    <div class="feature-item">
-        <span class="feature-icon">📊</span>
-        <div class="feature-name">MLflow</div>
-        <div class="feature-desc">Tracking de experimentos y registro de modelos</div>
-        <div style="margin-top: 1rem;">
-            <span class="ios-badge">Tracking</span>
-            <span class="ios-badge">Registry</span>
-        </div>
-    </div>
-    <div class="feature-item">
-        <span class="feature-icon">🗄️</span>
-        <div class="feature-name">DVC</div>
-        <div class="feature-desc">Versionamiento de datos y reproducibilidad</div>
-        <div style="margin-top: 1rem;">
-            <span class="ios-badge">Data Version</span>
-            <span class="ios-badge">Pipeline</span>
-        </div>
-    </div>
-    <div class="feature-item">
-        <span class="feature-icon">🔄</span>
-        <div class="feature-name">Apache Airflow</div>
-        <div class="feature-desc">Orquestación y automatización de pipelines</div>
-        <div style="margin-top: 1rem;">
-            <span class="ios-badge">Automation</span>
-            <span class="ios-badge">Scheduling</span>
-        </div>
-    </div>
-    <div class="feature-item">
-        <span class="feature-icon">🚀</span>
-        <div class="feature-name">FastAPI</div>
-        <div class="feature-desc">API REST de alto rendimiento</div>
-        <div style="margin-top: 1rem;">
-            <span class="ios-badge">API</span>
-            <span class="ios-badge">Docker</span>
-        </div>
-    </div>
-</div>
-""", unsafe_allow_html=True)
+mlops_tools = (
+    ("📊", "MLflow", "Tracking de experimentos y registro de modelos", ("Tracking", "Registry")),
+    ("🗄️", "DVC", "Versionamiento de datos y reproducibilidad", ("Data Version", "Pipeline")),
+    ("🔄", "Apache Airflow", "Orquestación y automatización de pipelines", ("Automation", "Scheduling")),
+    ("🚀", "FastAPI", "API REST de alto rendimiento", ("API", "Docker")),
+)
+st.markdown(feature_grid(mlops_tools), unsafe_allow_html=True)
 
 # SECCIÓN DE PREDICCIÓN - API INTERACTIVA
 st.markdown('<div class="content-section section-dark">', unsafe_allow_html=True)
@@ -522,226 +703,770 @@ st.markdown('<div class="section-title">Prueba el Modelo en Vivo</div>', unsafe_
 st.markdown('<div class="section-subtitle">Ingresa los puntajes de cada área y obtén la predicción del puntaje global ICFES</div>', unsafe_allow_html=True)
 
 # Inicializar session state para el resultado
-if 'prediction_result' not in st.session_state:
-    st.session_state.prediction_result = None
-if 'prediction_error' not in st.session_state:
-    st.session_state.prediction_error = None
-if 'api_response_raw' not in st.session_state:
-    st.session_state.api_response_raw = None
+if 'prediction_record' not in st.session_state:
+    st.session_state.prediction_record = None
+if 'prediction_job' not in st.session_state:
+    st.session_state.prediction_job = None
+if 'live_debouncer' not in st.session_state:
+    st.session_state.live_debouncer = LiveDebouncer()
 
-col1, col2 = st.columns([1, 1])
+prediction_client = get_prediction_client()
+endpoint_pool = get_endpoint_pool()
+prediction_cache = get_prediction_cache()
+local_model = get_local_model()
+endpoint_monitor = get_endpoint_monitor()
 
-with col1:
-    st.markdown("""
-    <div class="apple-card">
-        <div class="card-title" style="font-size: 1.5rem;">Features de Entrada</div>
-        <div style="color: #86868b; font-size: 0.9375rem; margin-bottom: 1.5rem;">
-            Ingresa los puntajes de cada área evaluada
-        </div>
-    </div>
-    """, unsafe_allow_html=True)
-    
-    # Inputs con valores por defecto - usando los nombres correctos para la API
-    ingles = st.number_input(
-        "🌍 Puntaje de Inglés",
-        min_value=0,
-        max_value=100,
-        value=65,
-        step=1,
-        help="Ingresa el puntaje obtenido en Inglés (0-100)",
-        key="ingles_input"
-    )
-    
-    comunicacion = st.number_input(
-        "✍️ Comunicación Escrita",
-        min_value=0,
-        max_value=100,
-        value=70,
-        step=1,
-        help="Ingresa el puntaje obtenido en Comunicación Escrita (0-100)",
-        key="comunicacion_input"
-    )
-    
-    competencias = st.number_input(
-        "🤝 Competencias Ciudadanas",
-        min_value=0,
-        max_value=100,
-        value=68,
-        step=1,
-        help="Ingresa el puntaje obtenido en Competencias Ciudadanas (0-100)",
-        key="competencias_input"
-    )
-    
-    lectura = st.number_input(
-        "📖 Lectura Crítica",
-        min_value=0,
-        max_value=100,
-        value=72,
-        step=1,
-        help="Ingresa el puntaje obtenido en Lectura Crítica (0-100)",
-        key="lectura_input"
-    )
-    
-    razonamiento = st.number_input(
-        "🔢 Razonamiento Cuantitativo",
-        min_value=0,
-        max_value=100,
-        value=75,
-        step=1,
-        help="Ingresa el puntaje obtenido en Razonamiento Cuantitativo (0-100)",
-        key="razonamiento_input"
+# Calentar el endpoint una vez por sesión, al abrirla
+if 'endpoint_warmup_sent' not in st.session_state:
+    endpoint_monitor.request_warmup()
+    st.session_state.endpoint_warmup_sent = True
+
+def set_prediction_record(payload, record):
+    """Muestra ``record`` como resultado de la sesión y lo encola en el historial (sin esperar la escritura)"""
+    st.session_state.prediction_record = record
+    history = get_prediction_history()
+    if history is not None:
+        endpoint = record.replica
+        if record.source == "secondary":
+            endpoint = get_hedger().secondary_name
+        history.record(payload, record, endpoint)
+
+
+def collect_finished_prediction():
+    """Aplica al session state el resultado de la predicción en segundo plano si ya terminó"""
+    job = st.session_state.prediction_job
+    if job is None or not job.done():
+        return False
+    set_prediction_record(job.payload, job.outcome())
+    st.session_state.prediction_job = None
+    return True
+
+
+def discard_pending_prediction():
+    """Descarta la predicción en segundo plano cuando un clic nuevo se resuelve al instante"""
+    job = st.session_state.prediction_job
+    if job is not None:
+        job.cancel()
+        st.session_state.prediction_job = None
+
+
+def check_session_quota():
+    """Cuota de predicciones remotas de esta sesión: None si hay cupo, el rechazo si no"""
+    admission = get_admission_controller()
+    if admission is None:
+        return None
+    try:
+        admission.check_session(get_script_run_ctx().session_id)
+    except AdmissionRejected as e:
+        return e
+    return None
+
+
+def submit_remote_prediction(payload):
+    """Envía la predicción en segundo plano; reemplaza a la que siga en vuelo"""
+    st.session_state.prediction_job = submit_prediction(
+        get_prediction_executor(),
+        get_request_coalescer(),
+        prediction_client,
+        prediction_cache,
+        endpoint_monitor,
+        payload,
+        previous_job=st.session_state.prediction_job,
+        breaker=get_circuit_breaker(),
+        hedger=get_hedger(),
     )
 
-with col2:
-    st.markdown("""
-    <div class="apple-card">
-        <div class="card-title" style="font-size: 1.5rem;">Variable Objetivo</div>
-        <div style="color: #86868b; font-size: 0.9375rem; margin-bottom: 1.5rem;">
-            Predicción del rendimiento académico total
-        </div>
-    </div>
-    """, unsafe_allow_html=True)
-    
+
+def schedule_live_prediction(payload, backend):
+    """Modo en vivo: registra el cambio de entrada y resuelve al instante lo que no va a la red.
+
+    La predicción remota de una entrada anterior que siga en vuelo se descarta
+    en cuanto la entrada cambia, para no mostrar un resultado obsoleto; la
+    nueva petición sale cuando la entrada lleva el debounce sin cambios.
+    """
+    live = st.session_state.live_debouncer
+    key = (backend, tuple(payload.values()))
+    pending_before = live.pending is not None
+    if not live.observe(key, payload):
+        return
+    job = st.session_state.prediction_job
+    get_live_stats().record_change(debounced=pending_before, cancelled=job is not None and not job.done())
+    discard_pending_prediction()
+
+    if backend == "local":
+        live.take()
+        local_started = time.perf_counter()
+        set_prediction_record(payload, PredictionRecord(
+            score=local_model.predict_payload(payload), latency=time.perf_counter() - local_started, source="local"
+        ))
+        get_live_stats().record_resolution("local")
+        return
+    cached_result = prediction_cache.get(payload)
+    if cached_result is not None:
+        live.take()
+        set_prediction_record(payload, PredictionRecord.from_result(cached_result, latency=0.0, source="cache"))
+        get_live_stats().record_resolution("cache")
+
+
+def fire_due_live_prediction():
+    """Envía la entrada en espera del modo en vivo si ya pasó el debounce"""
+    live = st.session_state.live_debouncer
+    if not live.due():
+        return
+    rejection = check_session_quota()
+    if rejection is not None:
+        # Sin cuota no se muestra un error: la entrada espera a que se libere un turno
+        live.postpone(max(rejection.retry_after, LIVE_POLL_SECONDS))
+        return
+    submit_remote_prediction(live.take())
+    get_live_stats().record_resolution("remote")
+
+
+def pending_prediction_card():
+    """Cuadro mientras hay una predicción en curso o en espera del debounce; se refresca solo hasta que termina.
+
+    El resultado se dibuja aquí mismo, sin rerun completo: reenviar el CSS y
+    las secciones estáticas en cada predicción anularía el aislamiento del
+    fragmento. El sondeo se detiene en el siguiente rerun del formulario, que
+    ya no registra este fragmento; hasta entonces cada ciclo solo redibuja el cuadro.
+    """
+    fire_due_live_prediction()
+    collect_finished_prediction()
+    if st.session_state.prediction_job is None and st.session_state.live_debouncer.pending is None:
+        render_prediction_card()
+        return
+    if st.session_state.get("live_mode") and st.session_state.prediction_record is not None:
+        # En vivo se mantiene el último puntaje mientras llega el de la entrada nueva
+        render_prediction_card()
+        st.caption("⏳ Actualizando con la entrada nueva...")
+        return
+    st.markdown(status_card("⏳", "Procesando predicción..."), unsafe_allow_html=True)
+
+
+def render_prediction_card():
+    """Cuadro de resultado con el último registro de predicción de la sesión"""
     # CONTENIDO DINÁMICO - TODOS LOS ESTADOS EN EL MISMO CUADRO
-    if st.session_state.prediction_result:
-        # Buscar el valor de predicted_score específicamente
-        prediction_value = None
-        
-        # Buscar en diferentes claves posibles
-        prediction_keys = ['predicted_score', 'r_Copy to clipboard', 'puntaje_global', 'PUNT_GLOBAL', 'prediction', 'score', 'result']
+    record = st.session_state.prediction_record
+    if record is None:
+        # ESTADO INICIAL - Mismo cuadro que se transforma con el resultado
+        card = status_card("🎯", 'Ingresa los puntajes y haz clic en<br>"Realizar Predicción"', faded=True)
+    elif record.status == OK:
+        caption = RECORD_SOURCE_CAPTIONS.get(record.source, "Predicción generada por el modelo")
+        if record.replica and len(endpoint_pool) > 1:
+            caption += f" · réplica {record.replica}"
+        card = metric_card(f"{float(record.score):.0f}", "Puntaje Global ICFES", caption)
+    elif record.status == ERROR:
+        card = status_card("⚠️", "Error en la predicción", record.error, tone="error")
+    else:
+        card = status_card(
+            "⚠️", "No se pudo obtener la predicción",
+            "La respuesta de la API no contiene el valor de predicción", tone="warning",
+        )
+    st.markdown(card, unsafe_allow_html=True)
+
+
+def render_prediction_form():
+    """Inputs, backend, endpoint, botón y cuadro de resultado de la predicción"""
+    collect_finished_prediction()
+    col1, col2 = st.columns([1, 1])
+    
+    with col1:
+        st.markdown(apple_card("Features de Entrada", "Ingresa los puntajes de cada área evaluada"), unsafe_allow_html=True)
+    
+        # Inputs con valores por defecto - usando los nombres correctos para la API
+        ingles = st.number_input(
+            "🌍 Puntaje de Inglés",
+            min_value=0,
+            max_value=100,
+            value=65,
+            step=1,
+            help="Ingresa el puntaje obtenido en Inglés (0-100)",
+            key="ingles_input"
+        )
+    
+        comunicacion = st.number_input(
+            "✍️ Comunicación Escrita",
+            min_value=0,
+            max_value=100,
+            value=70,
+            step=1,
+            help="Ingresa el puntaje obtenido en Comunicación Escrita (0-100)",
+            key="comunicacion_input"
+        )
+    
+        competencias = st.number_input(
+            "🤝 Competencias Ciudadanas",
+            min_value=0,
+            max_value=100,
+            value=68,
+            step=1,
+            help="Ingresa el puntaje obtenido en Competencias Ciudadanas (0-100)",
+            key="competencias_input"
+        )
+    
+        lectura = st.number_input(
+            "📖 Lectura Crítica",
+            min_value=0,
+            max_value=100,
+            value=72,
+            step=1,
+            help="Ingresa el puntaje obtenido en Lectura Crítica (0-100)",
+            key="lectura_input"
+        )
+    
+        razonamiento = st.number_input(
+            "🔢 Razonamiento Cuantitativo",
+            min_value=0,
+            max_value=100,
+            value=75,
+            step=1,
+            help="Ingresa el puntaje obtenido en Razonamiento Cuantitativo (0-100)",
+            key="razonamiento_input"
+        )
         
-        for key in prediction_keys:
-            if key in st.session_state.prediction_result:
-                prediction_value = st.session_state.prediction_result[key]
-                break
+    with col2:
+        st.markdown(apple_card("Variable Objetivo", "Predicción del rendimiento académico total"), unsafe_allow_html=True)
         
-        if prediction_value is not None:
-            # MOSTRAR SOLO EL NÚMERO DE LA PREDICCIÓN EN EL CUADRO PRINCIPAL
-            st.markdown(f"""
-            <div class="apple-card" style="background: linear-gradient(135deg, rgba(0, 113, 227, 0.15) 0%, rgba(0, 113, 227, 0.05) 100%); border-color: rgba(0, 113, 227, 0.3);">
-                <div style="text-align: center; padding: 2rem 0;">
-                    <div style="font-size: 4rem; font-weight: 700; color: #0071e3; margin-bottom: 1rem;">
-                        {float(prediction_value):.0f}
-                    </div>
-                    <div style="font-size: 1.25rem; color: #f5f5f7; font-weight: 500; margin-bottom: 0.5rem;">
-                        Puntaje Global ICFES
-                    </div>
-                    <div style="font-size: 0.875rem; color: #86868b;">
-                        Predicción generada por el modelo
-                    </div>
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
+        # El cuadro se reserva aquí y se llena después de procesar el botón
+        card_slot = st.container()
+    
+    # Botón de predicción centrado
+    st.markdown('<div style="margin: 2rem 0;">', unsafe_allow_html=True)
+    
+    # Selección del backend: API remota o modelo local en proceso
+    backend_options = ["remote", "local"] if local_model is not None else ["remote"]
+    prediction_backend = st.radio(
+        "⚙️ Backend de predicción",
+        backend_options,
+        format_func=lambda option: "API remota" if option == "remote" else "Modelo local",
+        horizontal=True,
+        key="prediction_backend",
+        help="El modelo local requiere el ensamble exportado en ICFES_LOCAL_MODEL_PATH",
+    )
+
+    # Configuración del endpoint - AHORA NO EDITABLE
+    endpoint_col, status_col = st.columns([4, 1])
+    with endpoint_col:
+        if len(endpoint_pool) > 1:
+            st.text_input(
+                "🔗 Réplicas del Endpoint de Predicción",
+                value=", ".join(endpoint_pool.urls),
+                help="Cada predicción va a la réplica con menor latencia reciente y menos llamadas en curso",
+                key="api_endpoint",
+                disabled=True
+            )
         else:
-            # Si no encontramos el valor de predicción, mostrar mensaje de error
-            st.markdown(f"""
-            <div class="apple-card" style="background: rgba(255, 204, 0, 0.1); border-color: rgba(255, 204, 0, 0.3);">
-                <div style="text-align: center; padding: 2rem;">
-                    <div style="font-size: 3rem; margin-bottom: 1rem;">⚠️</div>
-                    <div style="color: #ffcc00; font-size: 1.125rem; font-weight: 500;">
-                        No se pudo obtener la predicción
-                    </div>
-                    <div style="color: #86868b; font-size: 0.875rem; margin-top: 0.5rem;">
-                        La respuesta de la API no contiene el valor de predicción
-                    </div>
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
-    
-    elif st.session_state.prediction_error:
+            st.text_input(
+                "🔗 URL del Endpoint de Predicción",
+                value=prediction_client.endpoint,
+                help="Endpoint configurado para realizar las predicciones",
+                key="api_endpoint",
+                disabled=True  # Esto hace que no se pueda editar
+            )
+    with status_col:
+        endpoint_state = endpoint_monitor.state()
+        endpoint_labels = {
+            WARM: ("🟢", "Activo"),
+            WARMING: ("🟡", "Iniciando"),
+            COLD: ("🔵", "En reposo"),
+        }
+        status_icon, status_text = endpoint_labels.get(endpoint_state, ("⚪", "Sin datos"))
         st.markdown(f"""
-        <div class="apple-card" style="background: rgba(255, 59, 48, 0.1); border-color: rgba(255, 59, 48, 0.3);">
-            <div style="text-align: center; padding: 2rem;">
-                <div style="font-size: 3rem; margin-bottom: 1rem;">⚠️</div>
-                <div style="color: #ff3b30; font-size: 1.125rem; font-weight: 500;">
-                    Error en la predicción
-                </div>
-                <div style="color: #86868b; font-size: 0.875rem; margin-top: 0.5rem;">
-                    {st.session_state.prediction_error}
-                </div>
-            </div>
+        <div style="padding-top: 2rem; color: #86868b; font-size: 0.9375rem;">
+            {status_icon} {status_text}
         </div>
         """, unsafe_allow_html=True)
-    
+
+    local_hint = " Puedes usar el modelo local mientras tanto." if local_model is not None else ""
+    circuit_breaker = get_circuit_breaker()
+    if circuit_breaker.state() == OPEN and prediction_backend == "remote":
+        st.warning(
+            "🔌 El servidor de predicción falló varias veces seguidas; las predicciones remotas se "
+            f"rechazan de inmediato durante {circuit_breaker.retry_in():.0f} s más.{local_hint}"
+        )
+    elif endpoint_state in (WARMING, COLD) and prediction_backend == "remote":
+        st.warning(f"⏳ El servidor de predicción se está iniciando; la primera predicción puede tardar hasta un minuto.{local_hint}")
+
+    # Preparar datos para el endpoint en el formato correcto
+    payload = build_payload(ingles, comunicacion, competencias, lectura, razonamiento)
+
+    # Modo en vivo: la predicción sigue a las entradas, con debounce para no saturar el endpoint
+    live_mode = st.toggle(
+        "⚡ Predicción en vivo",
+        key="live_mode",
+        help="Actualiza el puntaje al cambiar las entradas; la petición sale cuando dejan de cambiar",
+    )
+    if live_mode:
+        schedule_live_prediction(payload, prediction_backend)
     else:
-        # ESTADO INICIAL - Mismo cuadro que se transforma con el resultado
-        st.markdown("""
-        <div class="apple-card" style="background: rgba(255, 255, 255, 0.02);">
-            <div style="text-align: center; padding: 3rem 1rem;">
-                <div style="font-size: 3rem; margin-bottom: 1rem; opacity: 0.3;">🎯</div>
-                <div style="color: #86868b; font-size: 1rem;">
-                    Ingresa los puntajes y haz clic en<br>"Realizar Predicción"
-                </div>
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
+        st.session_state.live_debouncer.reset()
+
+    if st.button("🚀 Realizar Predicción", use_container_width=False, key="predict_button"):
+    
+        # Con el backend local se puntúa en proceso, sin red ni caché
+        if prediction_backend == "local":
+            discard_pending_prediction()
+            local_started = time.perf_counter()
+            local_score = local_model.predict_payload(payload)
+            set_prediction_record(payload, PredictionRecord(
+                score=local_score, latency=time.perf_counter() - local_started, source="local"
+            ))
+        else:
+            # Si el mismo payload ya se predijo, responder desde la caché sin ir a la red
+            cached_result = prediction_cache.get(payload)
+            if cached_result is not None:
+                discard_pending_prediction()
+                set_prediction_record(payload, PredictionRecord.from_result(cached_result, latency=0.0, source="cache"))
+            else:
+                # Clics repetidos por encima de la cuota de la sesión se rechazan sin encolar nada
+                rejection = check_session_quota()
+                if rejection is not None:
+                    st.warning(f"🚦 {rejection}")
+                else:
+                    # Enviar la petición en segundo plano; un clic nuevo reemplaza a la que siga en vuelo
+                    submit_remote_prediction(payload)
+    
+    # Recoger también una predicción que haya terminado durante esta ejecución
+    collect_finished_prediction()
+    with card_slot:
+        if st.session_state.live_debouncer.pending is not None:
+            st.fragment(run_every=LIVE_POLL_SECONDS)(pending_prediction_card)()
+        elif st.session_state.prediction_job is not None:
+            st.fragment(run_every=PREDICTION_POLL_SECONDS)(pending_prediction_card)()
+        else:
+            render_prediction_card()
 
-# Botón de predicción centrado
-st.markdown('<div style="margin: 2rem 0;">', unsafe_allow_html=True)
+        # Aportes de cada área al puntaje para la entrada actual (modelo local, en caché por payload)
+        contribution_explainer = get_contribution_explainer()
+        if contribution_explainer is not None:
+            from attributions import contribution_bars
 
-# Configuración del endpoint - AHORA NO EDITABLE
-st.text_input(
-    "🔗 URL del Endpoint de Predicción",
-    value="https://proyecto-icfes-pv4t.onrender.com/predict/",
-    help="Endpoint configurado para realizar las predicciones",
-    key="api_endpoint",
-    disabled=True  # Esto hace que no se pueda editar
-)
+            explanation = contribution_explainer.explain_payload(payload)
+            st.markdown(feature_importance_section(
+                "Aporte por Área",
+                contribution_bars(explanation["contributions"]),
+                subtitle=f"Puntos sobre la base del modelo ({explanation['base']:.0f}) para la entrada actual",
+            ), unsafe_allow_html=True)
+
+    render_sensitivity_explorer(payload, prediction_backend)
 
-if st.button("🚀 Realizar Predicción", use_container_width=False, key="predict_button"):
-    with st.spinner("Procesando predicción..."):
+
+def render_sensitivity_explorer(payload, prediction_backend):
+    """Curvas o mapa de calor del puntaje al variar una o dos áreas con las demás fijas.
+
+    El barrido se calcula solo al pulsar el botón; en los reruns siguientes
+    se muestra si ya está en la caché del explorador para la entrada actual.
+    """
+    if not st.toggle("🔍 Explorador qué pasa si", key="sensitivity_enabled",
+                     help="Barre las áreas de 0 a 100 con las demás en los valores actuales, en una sola petición por lotes"):
+        return
+    from attributions import FEATURE_LABELS
+    from prediction_client import FEATURE_COLUMNS
+
+    explorer = get_sensitivity_explorer()
+    backends = explorer.backends()
+    if not backends:
+        st.caption(
+            "El barrido necesita un endpoint de lotes (ICFES_BATCH_API_URL) o el modelo local exportado: "
+            "sin ellos serían cientos de peticiones por barrido."
+        )
+        return
+    backend = prediction_backend if prediction_backend in backends else backends[0]
+    if backend != prediction_backend:
+        st.caption("Sin endpoint de lotes (ICFES_BATCH_API_URL) el barrido usa el modelo local.")
+    label = lambda feature: FEATURE_LABELS.get(feature, feature)
+    sweep_mode = st.radio(
+        "Barrido", ["1d", "2d"], horizontal=True, key="sensitivity_mode",
+        format_func=lambda option: "Curvas (un área)" if option == "1d" else "Mapa de calor (dos áreas)",
+    )
+    if sweep_mode == "1d":
+        features = st.multiselect(
+            "Áreas a variar", FEATURE_COLUMNS, default=[FEATURE_COLUMNS[-1]],
+            format_func=label, key="sensitivity_features",
+        )
+        if not features:
+            return
+        run_sweep = lambda compute: explorer.sweep(payload, features, backend, compute=compute)
+    else:
+        x_col, y_col = st.columns(2)
+        with x_col:
+            feature_x = st.selectbox("Eje X", FEATURE_COLUMNS, index=4, format_func=label, key="sensitivity_x")
+        with y_col:
+            feature_y = st.selectbox("Eje Y", FEATURE_COLUMNS, index=3, format_func=label, key="sensitivity_y")
+        if feature_x == feature_y:
+            st.caption("Elige dos áreas distintas")
+            return
+        run_sweep = lambda compute: explorer.sweep_2d(payload, feature_x, feature_y, backend, compute=compute)
+
+    sweep = run_sweep(False)
+    if sweep is None:
+        if not st.button("📈 Calcular barrido", key="sensitivity_run"):
+            st.caption("El barrido no se recalcula solo al cambiar las entradas: pulsa el botón para calcularlo.")
+            return
         try:
-            # Preparar datos para el endpoint en el formato correcto
-            payload = {
-                "MOD_INGLES_PNAL": float(ingles),
-                "MOD_COMUNI_ESCRITA_PNAL": float(comunicacion),
-                "MOD_COMPETEN_CIUDADA_PNAL": float(competencias),
-                "MOD_LECTURA_CRITICA_PNAL": float(lectura),
-                "MOD_RAZONA_CUANTITATIVO_PNAL": float(razonamiento)
-            }
-            
-            # Realizar petición al endpoint
-            response = requests.post(
-                "https://proyecto-icfes-pv4t.onrender.com/predict/",  # URL fija
-                json=payload,
-                headers={"Content-Type": "application/json"},
-                timeout=30
-            )
-            
-            # Guardar respuesta raw para debugging
-            st.session_state.api_response_raw = f"Status: {response.status_code}\nHeaders: {dict(response.headers)}\nBody: {response.text}"
-            
-            if response.status_code == 200:
-                try:
-                    result = response.json()
-                    st.session_state.prediction_result = result
-                    st.session_state.prediction_error = None
-                    st.success("✅ Predicción realizada exitosamente")
-                except json.JSONDecodeError:
-                    st.session_state.prediction_error = f"La API devolvió una respuesta no JSON: {response.text}"
-                    st.session_state.prediction_result = None
-            else:
-                error_message = f"Error {response.status_code}: {response.text}"
-                st.session_state.prediction_error = error_message
-                st.session_state.prediction_result = None
-            
-            st.rerun()
-                
-        except requests.exceptions.ConnectionError:
-            error_message = "No se pudo conectar con la API. Verifica que el servidor esté ejecutándose."
-            st.session_state.prediction_error = error_message
-            st.session_state.prediction_result = None
-            st.error(f"❌ {error_message}")
-        except requests.exceptions.Timeout:
-            error_message = "La solicitud tardó demasiado tiempo. Intenta nuevamente."
-            st.session_state.prediction_error = error_message
-            st.session_state.prediction_result = None
-            st.error(f"⏱️ {error_message}")
+            with st.spinner("Calculando barrido..."):
+                sweep = run_sweep(True)
         except Exception as e:
-            error_message = f"Error inesperado: {str(e)}"
-            st.session_state.prediction_error = error_message
-            st.session_state.prediction_result = None
-            st.error(f"❌ {error_message}")
+            st.warning(f"No se pudo calcular el barrido: {e}")
+            return
+    if sweep_mode == "1d":
+        st.line_chart(sweep["frame"], x_label="Puntaje del área", y_label="Puntaje global")
+    else:
+        import altair as alt
+
+        heatmap = alt.Chart(sweep["frame"]).mark_rect().encode(
+            x=alt.X("x:O", title=label(feature_x)),
+            y=alt.Y("y:O", title=label(feature_y), sort="descending"),
+            color=alt.Color("PUNT_GLOBAL:Q", title="Puntaje global", scale=alt.Scale(scheme="blues")),
+            tooltip=[alt.Tooltip("x:O", title=label(feature_x)), alt.Tooltip("y:O", title=label(feature_y)),
+                     alt.Tooltip("PUNT_GLOBAL:Q", title="Puntaje global", format=".1f")],
+        )
+        st.altair_chart(heatmap, use_container_width=True)
+    source = "modelo local" if backend == "local" else "una petición por lotes"
+    st.caption(f"{sweep['points']} puntos · {source} · {sweep['seconds'] * 1000:.0f} ms al calcularse")
+
+
+@st.fragment
+def prediction_section():
+    """Formulario de predicción: los cambios en sus widgets solo re-ejecutan este fragmento"""
+    with rerun_profiler.measure_fragment():
+        render_prediction_form()
+
+
+prediction_section()
+
+# Ventanas de tiempo del filtro del historial, en segundos
+HISTORY_PERIODS = {"Todo": None, "Última hora": 3600, "Últimas 24 h": 86400, "Últimos 7 días": 7 * 86400}
+
+
+def reset_history_cursor():
+    st.session_state.history_cursors = []
+
+
+def older_history_page(last_id):
+    st.session_state.history_cursors.append(last_id)
+
+
+def newer_history_page():
+    st.session_state.history_cursors.pop()
+
+
+def render_history_panel(history):
+    """Página del historial con cursor por id: cada página es una consulta acotada por índice"""
+    if 'history_cursors' not in st.session_state:
+        reset_history_cursor()
+    filter_col, input_col, size_col = st.columns([2, 2, 1])
+    with filter_col:
+        period = st.selectbox("Periodo", list(HISTORY_PERIODS), key="history_period", on_change=reset_history_cursor)
+    with input_col:
+        only_current = st.checkbox("Solo la entrada actual", key="history_only_current", on_change=reset_history_cursor)
+    with size_col:
+        page_size = st.selectbox("Filas", [25, 50, 100], key="history_page_size", on_change=reset_history_cursor)
+
+    cursors = st.session_state.history_cursors
+    since = time.time() - HISTORY_PERIODS[period] if HISTORY_PERIODS[period] else None
+    inputs = None
+    if only_current:
+        inputs = build_payload(*(st.session_state.get(key, 0) for key in (
+            "ingles_input", "comunicacion_input", "competencias_input", "lectura_input", "razonamiento_input",
+        )))
+    rows = history.page(before_id=cursors[-1] if cursors else None, limit=page_size, since=since, inputs=inputs)
+    for row in rows:
+        row["ts"] = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(row["ts"]))
+
+    if rows:
+        st.dataframe(rows, use_container_width=True, hide_index=True)
+    else:
+        st.caption("Sin predicciones registradas para este filtro")
+    newer_col, page_col, older_col = st.columns([1, 2, 1])
+    with newer_col:
+        st.button("⬅️ Más recientes", key="history_newer", disabled=not cursors, on_click=newer_history_page)
+    with page_col:
+        st.caption(f"Página {len(cursors) + 1}")
+    with older_col:
+        st.button("Más antiguas ➡️", key="history_older", disabled=len(rows) < page_size,
+                  on_click=older_history_page, args=(rows[-1]["id"] if rows else None,))
+    st.json(history.stats())
+
+
+def render_admin_panels():
+    """Paneles de diagnóstico del servidor; solo con ICFES_ADMIN=1 porque exponen el estado de todas las sesiones"""
+    with st.expander("🗂️ Historial de predicciones"):
+        prediction_history = get_prediction_history()
+        if prediction_history is not None:
+            render_history_panel(prediction_history)
+        else:
+            st.caption("Historial desactivado: define ICFES_HISTORY_PATH para activarlo")
+
+    with st.expander("📡 Uso del pool de conexiones"):
+        st.json(prediction_client.pool_stats())
+
+    with st.expander("🩺 Salud del endpoint"):
+        st.json(endpoint_monitor.stats())
+
+    with st.expander("⚖️ Réplicas del endpoint"):
+        st.caption("Costo = latencia EWMA × (llamadas en curso + 1); las réplicas con fallos seguidos salen un tiempo de la rotación")
+        st.dataframe(endpoint_pool.stats(), use_container_width=True)
+
+    with st.expander("🔌 Circuit breaker y hedging"):
+        st.json(get_circuit_breaker().stats())
+        hedger = get_hedger()
+        if hedger is not None:
+            st.json(hedger.stats())
+        else:
+            st.caption("Sin backend secundario: define ICFES_SECONDARY_API_URL o exporta el modelo local")
+
+    with st.expander("🚦 Control de admisión"):
+        admission = get_admission_controller()
+        if admission is not None:
+            st.caption(
+                f"{admission.rate:g} llamadas/s (ráfagas de {admission.burst}), {admission.max_concurrent} en vuelo; "
+                f"por sesión {admission.session_rate:g}/s (ráfagas de {admission.session_burst}); "
+                f"las interactivas esperan turno hasta {admission.max_wait:g} s. "
+                f"Los lotes van aparte: {admission.batch.max_concurrent} en vuelo"
+                + (f", {admission.batch.rate:g} llamadas/s" if admission.batch.rate > 0 else ", sin límite de tasa")
+            )
+            st.json(admission.stats())
+        else:
+            st.caption("Desactivado (ICFES_ADMISSION_ENABLED=0)")
+
+    with st.expander("🗃️ Caché de predicciones"):
+        st.json(prediction_cache.stats())
+        if st.session_state.get("sensitivity_enabled"):
+            st.caption("Barridos de sensibilidad")
+            st.json(get_sensitivity_explorer().stats())
+
+    with st.expander("🌐 Almacén compartido entre réplicas"):
+        shared_store = get_shared_store()
+        if shared_store is not None:
+            st.caption("Resultados y salud del endpoint compartidos; una sola réplica llama al endpoint por entrada a la vez")
+            st.json(shared_store.stats())
+        else:
+            st.caption("Sin almacén compartido: define ICFES_SHARED_STORE (ruta de SQLite o URL redis://)")
+
+    with st.expander("⚡ Predicción en vivo"):
+        st.caption("requests_saved: cambios de entrada que no generaron una petición (debounce, caché o modelo local)")
+        st.json(get_live_stats().stats())
+
+    with st.expander("🔗 Peticiones agrupadas (single-flight)"):
+        st.json(get_request_coalescer().stats())
+
+    with st.expander("🧠 Memoria de sesiones"):
+        current_record = st.session_state.prediction_record
+        if current_record is not None:
+            replica_note = f" · réplica: {current_record.replica}" if current_record.replica else ""
+            st.caption(f"Origen: {current_record.source}{replica_note} · latencia: {current_record.latency or 0:.3f} s · {current_record.nbytes()} bytes")
+            if DEBUG_MODE and current_record.diagnostic:
+                st.code(current_record.diagnostic, language="text")
+        if st.button("Medir session state", key="session_memory_button"):
+            current_bytes, current_unmeasured = measure_session(st.session_state.to_dict())
+            st.caption(f"Sesión actual: {current_bytes} bytes ({current_unmeasured} claves sin medir)")
+            st.json(session_state_usage())
+
+    with st.expander("⏱️ Costo por rerun"):
+        st.caption("app: ejecución completa del script · fragment: rerun parcial del formulario de predicción")
+        rerun_summary = rerun_profiler.summary()
+        if rerun_summary:
+            st.dataframe(rerun_summary, use_container_width=True)
+
+    with st.expander("📈 Métricas del endpoint"):
+        prediction_metrics = get_prediction_metrics()
+        metrics_summary = prediction_metrics.summary()
+        if metrics_summary:
+            st.dataframe(metrics_summary, use_container_width=True)
+        else:
+            st.caption("Aún no hay llamadas registradas")
+        prometheus_text = prediction_metrics.to_prometheus()
+        st.code(prometheus_text, language="text")
+        st.download_button("⬇️ Exportar (formato Prometheus)", prometheus_text, file_name="metrics.prom", mime="text/plain", key="metrics_download")
+
+    if local_model is not None:
+        with st.expander("🧪 Paridad modelo local vs API remota"):
+            parity_samples = st.number_input("Muestras", min_value=1, max_value=1000, value=50, step=10, key="parity_samples")
+            if st.button("Comparar", key="parity_button"):
+                from local_model import parity_check
+
+                with st.spinner("Comparando predicciones..."):
+                    st.json(parity_check(local_model, prediction_client, n_samples=int(parity_samples)))
+
+
+if ADMIN_MODE:
+    render_admin_panels()
+
+# PREDICCIÓN POR LOTES
+st.markdown('<div class="section-subtitle">Predicción por lotes: sube un archivo CSV o Parquet con las cinco columnas MOD_*_PNAL</div>', unsafe_allow_html=True)
+
+batch_file = st.file_uploader("📂 Archivo de estudiantes", type=["csv", "parquet"], key="batch_file")
+batch_streaming = st.toggle(
+    "🌊 Modo streaming (archivos grandes)",
+    key="batch_streaming",
+    help="Lee y puntúa el archivo por chunks y escribe los resultados a disco: la memoria no crece con el tamaño del archivo",
+)
+batch_server_file = None
+if batch_streaming:
+    from streaming_batch import data_files
+
+    server_files = data_files()
+    if server_files:
+        batch_server_file = st.selectbox(
+            "🗄️ O un archivo del servidor (ICFES_BATCH_DATA_DIR)", [None, *server_files],
+            format_func=lambda name: "—" if name is None else name, key="batch_server_file",
+        )
+batch_col1, batch_col2 = st.columns(2)
+with batch_col1:
+    batch_chunk_size = st.number_input("Filas por chunk", min_value=1, max_value=100000, value=500, step=100, key="batch_chunk_size")
+with batch_col2:
+    batch_workers = st.number_input("Workers concurrentes", min_value=1, max_value=prediction_client.pool_maxsize, value=min(8, prediction_client.pool_maxsize), step=1, key="batch_workers")
+batch_explainer = get_contribution_explainer()
+batch_contributions = batch_explainer is not None and not batch_streaming and st.checkbox(
+    "🧩 Calcular aportes por área (modelo local)",
+    key="batch_contributions",
+    help=f"Agrega columnas APORTE_* por fila; límite de {batch_explainer.budget:.0f} s por lote" if batch_explainer is not None else None,
+)
+
+def run_streaming_batch(handle, name):
+    """Puntúa el archivo en streaming con estadísticas en vivo y ofrece el CSV resultante"""
+    from streaming_batch import OUTPUT_TTL_SECONDS, new_output_path, stream_score
+
+    progress_bar = st.progress(0.0, text="Procesando en streaming...")
+    metrics_slot = st.empty()
+    histogram_slot = st.empty()
+    last_draw = [0.0]
+
+    def show_stats(stats, fraction, rows_per_second, force=False):
+        # Se redibuja como mucho dos veces por segundo para no saturar al navegador con deltas
+        now = time.perf_counter()
+        if not force and now - last_draw[0] < 0.5:
+            return
+        last_draw[0] = now
+        progress_bar.progress(min(fraction, 1.0), text=f"{stats.count:,} filas puntuadas · {rows_per_second:,.0f} filas/s")
+        with metrics_slot.container():
+            count_col, mean_col, std_col, failed_col = st.columns(4)
+            count_col.metric("Filas", f"{stats.count:,}")
+            mean_col.metric("Media", f"{stats.mean:.1f}" if stats.mean is not None else "—")
+            std_col.metric("Desv. estándar", f"{stats.std:.1f}" if stats.std is not None else "—")
+            failed_col.metric("Fallidas / inválidas", f"{stats.failed:,} / {stats.invalid:,}")
+        histogram_slot.bar_chart(stats.histogram_frame(), x_label="Puntaje global", y_label="Estudiantes")
+
+    output_path = new_output_path()
+    use_local = st.session_state.get("prediction_backend", "remote") == "local"
+    try:
+        stats, run = stream_score(
+            handle, name, output_path,
+            client=prediction_client, ensemble=local_model if use_local else None,
+            max_in_flight=int(batch_workers), request_rows=int(batch_chunk_size),
+            progress_callback=show_stats,
+        )
+    except Exception as e:
+        output_path.unlink(missing_ok=True)
+        st.error(f"❌ No se pudo procesar el archivo: {str(e)}")
+        return
+    show_stats(stats, 1.0, run["rows_per_second"], force=True)
+    st.success(
+        f"✅ {run['rows']:,} filas en {run['seconds']:.1f} s ({run['rows_per_second']:,.0f} filas/s, "
+        f"{stats.failed:,} fallidas, {stats.invalid:,} inválidas)"
+    )
+    if run["output_bytes"] <= STREAM_DOWNLOAD_MAX_BYTES:
+        with open(run["output_path"], "rb") as result_file:
+            st.download_button("⬇️ Descargar resultados", result_file, file_name="predicciones_icfes.csv",
+                               mime="text/csv", key="batch_download")
+        # El botón ya copió el archivo en memoria: no hace falta conservarlo en disco
+        output_path.unlink(missing_ok=True)
+    else:
+        st.info(
+            f"📁 Resultados ({run['output_bytes'] / 1e6:,.0f} MB) guardados en el servidor: `{run['output_path']}`. "
+            f"Se borran pasadas {OUTPUT_TTL_SECONDS / 3600:g} h."
+        )
+
+
+# Tamaño máximo del CSV de resultados que se ofrece para descarga (la descarga pasa por memoria)
+STREAM_DOWNLOAD_MAX_BYTES = int(os.environ.get("ICFES_STREAM_DOWNLOAD_MAX_MB", "200")) * 1_000_000
+
+if batch_streaming and (batch_file is not None or batch_server_file) and st.button("📦 Procesar lote", key="batch_button"):
+    if batch_server_file:
+        from streaming_batch import DATA_DIR
+
+        with open(Path(DATA_DIR) / batch_server_file, "rb") as server_handle:
+            run_streaming_batch(server_handle, batch_server_file)
+    else:
+        run_streaming_batch(batch_file, batch_file.name)
+
+elif not batch_streaming and batch_file is not None and st.button("📦 Procesar lote", key="batch_button"):
+    from attributions import CONTRIBUTION_PREFIX, contribution_bars
+    from batch_prediction import read_upload, score_dataframe, score_dataframe_local, validate_features
+
+    try:
+        batch_df = read_upload(batch_file)
+    except Exception as e:
+        batch_df = None
+        st.error(f"❌ No se pudo leer el archivo: {str(e)}")
+
+    if batch_df is not None:
+        batch_features, invalid_rows, batch_errors = validate_features(batch_df)
+        for message in batch_errors:
+            st.warning(f"⚠️ {message}")
+
+        if batch_features is not None:
+            valid_features = batch_features[~invalid_rows]
+            if invalid_rows.any():
+                st.info(f"Se omiten {int(invalid_rows.sum())} filas inválidas de {len(batch_features)}")
+
+            progress_bar = st.progress(0.0, text="Procesando lote...")
+
+            def update_progress(done, total, rows_per_second):
+                progress_bar.progress(done / total, text=f"{done}/{total} filas · {rows_per_second:,.0f} filas/s")
+
+            if len(valid_features):
+                if st.session_state.get("prediction_backend", "remote") == "local":
+                    batch_results, batch_stats = score_dataframe_local(
+                        valid_features,
+                        local_model,
+                        progress_callback=update_progress,
+                    )
+                else:
+                    batch_results, batch_stats = score_dataframe(
+                        valid_features,
+                        prediction_client,
+                        chunk_size=int(batch_chunk_size),
+                        max_workers=int(batch_workers),
+                        progress_callback=update_progress,
+                    )
+                st.success(
+                    f"✅ {batch_stats['rows']} filas en {batch_stats['seconds']:.1f} s "
+                    f"({batch_stats['rows_per_second']:,.0f} filas/s, {batch_stats['failed_rows']} fallidas)"
+                )
+                if batch_contributions:
+                    progress_bar.progress(0.0, text="Calculando aportes por área...")
+                    batch_attributions, attribution_stats = batch_explainer.explain_frame(
+                        valid_features, progress_callback=update_progress
+                    )
+                    batch_results = batch_results.join(batch_attributions)
+                    mode = f"{attribution_stats['workers']} procesos" if attribution_stats["process_pool"] else "en proceso"
+                    st.caption(
+                        f"Aportes de {attribution_stats['attributed_rows']}/{attribution_stats['rows']} filas "
+                        f"en {attribution_stats['seconds']:.1f} s ({mode})"
+                    )
+                    if not attribution_stats["complete"]:
+                        st.warning(
+                            f"⏱️ Se alcanzó el límite de {attribution_stats['budget_seconds']:.0f} s; "
+                            "las filas sin atribuir quedan vacías en las columnas APORTE_*"
+                        )
+                    mean_contributions = batch_attributions.abs().mean().rename(
+                        lambda column: column.removeprefix(CONTRIBUTION_PREFIX)
+                    )
+                    st.markdown(feature_importance_section(
+                        "Aporte medio por Área",
+                        contribution_bars(mean_contributions.to_dict()),
+                        subtitle="Promedio del aporte absoluto en las filas del archivo",
+                    ), unsafe_allow_html=True)
+                st.dataframe(batch_results.head(1000), use_container_width=True)
+                st.download_button(
+                    "⬇️ Descargar resultados",
+                    batch_results.to_csv(index=False).encode("utf-8"),
+                    file_name="predicciones_icfes.csv",
+                    mime="text/csv",
+                    key="batch_download",
+                )
 
 st.markdown('</div>', unsafe_allow_html=True)
 st.markdown('</div>', unsafe_allow_html=True)
@@ -755,32 +1480,14 @@ st.markdown('</div>', unsafe_allow_html=True)
 st.markdown('<div class="content-section section-light">', unsafe_allow_html=True)
 
 # Importancia de features
-st.markdown("""
-<div class="apple-card">
-    <div class="card-title" style="font-size: 1.5rem;">Importancia de Features</div>
-</div>
-""", unsafe_allow_html=True)
-
-features = [
+features = (
     ("Razonamiento Cuantitativo", 32),
     ("Lectura Crítica", 28),
     ("Inglés", 22),
     ("Competencias Ciudadanas", 11),
-    ("Comunicación Escrita", 7)
-]
-
-for feature, importance in features:
-    st.markdown(f"""
-    <div class="apple-card" style="padding: 1.25rem; margin: 0.5rem 0;">
-        <div style="display: flex; justify-content: space-between; margin-bottom: 0.75rem;">
-            <span style="font-weight: 500; color: #f5f5f7;">{feature}</span>
-            <span style="color: #0071e3; font-weight: 600;">{importance}%</span>
-        </div>
-        <div class="ios-progress">
-            <div class="ios-progress-fill" style="width: {importance}%;"></div>
-        </div>
-    </div>
-    """, unsafe_allow_html=True)
+    ("Comunicación Escrita", 7),
+)
+st.markdown(feature_importance_section("Importancia de Features", features), unsafe_allow_html=True)
 
 # Comparación de modelos
 st.markdown("""
@@ -789,20 +1496,14 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-models_data = {
-    'Modelo': ['Gradient Boosting', 'Random Forest', 'XGBoost', 'Linear Regression'],
-    'R² Score': [0.952, 0.938, 0.945, 0.812],
-    'RMSE': [12.3, 14.2, 13.1, 22.5],
-    'Tiempo (s)': [2.3, 1.8, 2.1, 0.5]
-}
-df_models = pd.DataFrame(models_data)
-
-st.dataframe(
-    df_models.style.highlight_max(subset=['R² Score'], color='rgba(0, 113, 227, 0.2)')
-                  .highlight_min(subset=['RMSE', 'Tiempo (s)'], color='rgba(0, 113, 227, 0.2)')
-                  .format({'R² Score': '{:.3f}', 'RMSE': '{:.1f}', 'Tiempo (s)': '{:.1f}'}),
-    use_container_width=True
-)
+mlruns_index = get_mlruns_index()
+if mlruns_index is not None:
+    mlruns_index.refresh()
+models_styler, models_lock = get_models_table(mlruns_index.generation if mlruns_index is not None else None)
+with models_lock:
+    st.dataframe(models_styler, use_container_width=True)
+if mlruns_index is not None:
+    st.caption(f"{mlruns_index.stats()['runs']} runs indexados desde {mlruns_index.mlruns_dir}")
 
 
 # SECCIÓN: METODOLOGÍA
@@ -846,34 +1547,28 @@ st.markdown('<div class="content-section section-light">', unsafe_allow_html=Tru
 st.markdown('<div class="section-title">Stack Tecnológico</div>', unsafe_allow_html=True)
 st.markdown('<div class="section-subtitle">Construido con las herramientas más modernas del ecosistema ML</div>', unsafe_allow_html=True)
 
-tech_categories = {
-    "Machine Learning": ["Python 3.9+", "Scikit-learn", "Pandas", "NumPy"],
-    "MLOps": ["MLflow", "DVC",],
-    "API & Deployment": ["FastAPI","Docker"],
-    "Testing": ["Pytest", "GitHub Actions"]
-}
-
-for category, techs in tech_categories.items():
-    st.markdown(f"""
-    <div class="apple-card">
-        <div style="font-size: 1.25rem; font-weight: 600; color: #f5f5f7; margin-bottom: 1rem;">
-            {category}
-        </div>
-        <div style="display: flex; flex-wrap: wrap; gap: 0.5rem;">
-            {"".join([f'<span class="ios-badge">{tech}</span>' for tech in techs])}
-        </div>
-    </div>
-    """, unsafe_allow_html=True)
+tech_categories = (
+    ("Machine Learning", ("Python 3.9+", "Scikit-learn", "Pandas", "NumPy")),
+    ("MLOps", ("MLflow", "DVC")),
+    ("API & Deployment", ("FastAPI", "Docker")),
+    ("Testing", ("Pytest", "GitHub Actions")),
+)
+st.markdown(badge_card_section(tech_categories), unsafe_allow_html=True)
 
 st.markdown('</div>', unsafe_allow_html=True)
 # DISTRIBUCION DE 
 st.markdown('<div class="content-section section-dark" id="documentacion">', unsafe_allow_html=True)
 st.markdown('<div class="section-title">Distribución de archivos</div>', unsafe_allow_html=True)
 
-# Cargar imagen con efecto premium
-pipeline_img = load_image("archivos.png")
-if pipeline_img:
-    st.image(pipeline_img, use_container_width=True)
+# Cargar imagen con efecto premium: variante responsive y carga diferida al hacer scroll
+pipeline_variants = load_image("archivos.png")
+if pipeline_variants:
+    if pipeline_variants[-1]["url"] and st.get_option("server.enableStaticServing"):
+        st.markdown(responsive_img_html(pipeline_variants, alt="Distribución de archivos"), unsafe_allow_html=True)
+    else:
+        # Sin static serving se envía la variante intermedia en lugar del PNG original
+        fallback_variant = min(pipeline_variants, key=lambda variant: abs(variant["width"] - 960))
+        st.image(fallback_variant["data"], use_container_width=True)
     st.markdown('</div>', unsafe_allow_html=True)
 
 
@@ -927,3 +1622,4 @@ curl -X POST "http://localhost:8000/predict" \\
 
 st.markdown('</div>', unsafe_allow_html=True)
 
+rerun_profiler.finish(app_run)
@@ -0,0 +1,208 @@
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+
+import numpy as np
+
+from local_model import ROW_BLOCK, TreeEnsemble
+from prediction_cache import PredictionCache
+from prediction_client import FEATURE_COLUMNS, MODEL_VERSION, _env_float, _env_int
+
+
+# Tiempo máximo para atribuir un lote completo; las filas que no alcancen quedan en NaN
+BUDGET_SECONDS = _env_float("ICFES_ATTRIBUTION_BUDGET", 30.0)
+
+# Procesos para lotes grandes; 0 usa un proceso por CPU
+POOL_WORKERS = _env_int("ICFES_ATTRIBUTION_WORKERS", 0) or os.cpu_count() or 1
+
+# Filas que se miden en proceso para estimar si el lote cabe en el presupuesto
+CALIBRATION_ROWS = 2048
+
+POOL_CHUNK_ROWS = ROW_BLOCK * 2
+
+FEATURE_LABELS = dict(zip(FEATURE_COLUMNS, (
+    "Inglés",
+    "Comunicación Escrita",
+    "Competencias Ciudadanas",
+    "Lectura Crítica",
+    "Razonamiento Cuantitativo",
+)))
+
+CONTRIBUTION_PREFIX = "APORTE_"
+
+_worker_ensemble = None
+
+
+def _init_worker(arrays):
+    global _worker_ensemble
+    _worker_ensemble = TreeEnsemble(**arrays)
+
+
+def _worker_contributions(X):
+    return _worker_ensemble.contributions(X)
+
+
+def _ensemble_arrays(ensemble):
+    return {
+        "feature": ensemble.feature,
+        "threshold": ensemble.threshold,
+        "left": ensemble.left,
+        "right": ensemble.right,
+        "value": ensemble.value,
+        "init": ensemble.init,
+        "learning_rate": ensemble.learning_rate,
+        "feature_names": ensemble.feature_names,
+    }
+
+
+def contribution_bars(contributions, unit="pts"):
+    """Argumentos de ``feature_bar`` para un dict ``{feature: aporte}``.
+
+    El ancho es relativo al mayor aporte absoluto y las barras se ordenan
+    de mayor a menor impacto; los aportes negativos se marcan como tales.
+    """
+    largest = max((abs(value) for value in contributions.values()), default=0.0) or 1.0
+    ordered = sorted(contributions.items(), key=lambda item: abs(item[1]), reverse=True)
+    return tuple(
+        (FEATURE_LABELS.get(feature, feature), abs(value) / largest * 100, f"{value:+.1f} {unit}", value < 0)
+        for feature, value in ordered
+    )
+
+
+class ContributionExplainer:
+    """Aportes por feature de las predicciones del ensamble local.
+
+    ``explain_payload`` atribuye el input actual y guarda el resultado en una
+    caché por payload (misma llave que la caché de predicciones).
+    ``explain_matrix`` atribuye lotes grandes dentro de ``budget`` segundos:
+    mide unas filas en proceso y, si la estimación no cabe, reparte el resto
+    en un pool de procesos que se crea la primera vez que hace falta.
+    """
+
+    def __init__(self, ensemble, budget=BUDGET_SECONDS, workers=POOL_WORKERS, cache=None):
+        self.ensemble = ensemble
+        self.budget = budget
+        self.workers = max(1, workers)
+        self.cache = cache or PredictionCache(model_version=f"{MODEL_VERSION}|contrib")
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def explain_payload(self, payload):
+        """Devuelve ``{"base": valor_base, "contributions": {feature: aporte}}``"""
+        cached = self.cache.get(payload)
+        if cached is not None:
+            return cached
+        row = [[float(payload[column]) for column in self.ensemble.feature_names]]
+        values = self.ensemble.contributions(row)[0]
+        result = {
+            "base": self.ensemble.expected_value,
+            "contributions": dict(zip(self.ensemble.feature_names, values.tolist())),
+        }
+        self.cache.put(payload, result)
+        return result
+
+    def _get_pool(self):
+        with self._pool_lock:
+            if self._pool is None:
+                # spawn: no se hace fork de un proceso con hilos (servidor de Streamlit)
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(_ensemble_arrays(self.ensemble),),
+                )
+            return self._pool
+
+    def explain_matrix(self, X, progress_callback=None):
+        """Aportes ``(n, n_features)`` de un arreglo de filas y estadísticas de la corrida"""
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        total = X.shape[0]
+        out = np.full((total, len(self.ensemble.feature_names)), np.nan)
+        started = time.perf_counter()
+        deadline = started + self.budget
+        done = 0
+
+        def report(rows):
+            nonlocal done
+            done += rows
+            if progress_callback is not None:
+                elapsed = time.perf_counter() - started
+                progress_callback(done, total, done / elapsed if elapsed > 0 else 0.0)
+
+        calibration = min(total, CALIBRATION_ROWS)
+        out[:calibration] = self.ensemble.contributions(X[:calibration])
+        report(calibration)
+        rows_per_second = calibration / max(time.perf_counter() - started, 1e-9)
+        remaining = total - calibration
+        estimate = remaining / rows_per_second
+        use_pool = self.workers > 1 and estimate > deadline - time.perf_counter()
+
+        if remaining and not use_pool:
+            for start in range(calibration, total, ROW_BLOCK):
+                if time.perf_counter() >= deadline:
+                    break
+                out[start:start + ROW_BLOCK] = self.ensemble.contributions(X[start:start + ROW_BLOCK])
+                report(min(ROW_BLOCK, total - start))
+        elif remaining:
+            pool = self._get_pool()
+            pending = {
+                pool.submit(_worker_contributions, X[start:start + POOL_CHUNK_ROWS]): start
+                for start in range(calibration, total, POOL_CHUNK_ROWS)
+            }
+            failed = []
+            while pending:
+                finished, _ = wait(pending, timeout=max(deadline - time.perf_counter(), 0), return_when=FIRST_COMPLETED)
+                if not finished:
+                    break
+                for future in finished:
+                    start = pending.pop(future)
+                    try:
+                        block = future.result()
+                    except BrokenProcessPool:
+                        failed.append(start)
+                        continue
+                    out[start:start + len(block)] = block
+                    report(len(block))
+            for future in pending:
+                future.cancel()
+            if failed:
+                # Si el pool se rompe (p. ej. un worker murió) se sigue en proceso
+                self.close()
+                for start in sorted(failed):
+                    if time.perf_counter() >= deadline:
+                        break
+                    out[start:start + POOL_CHUNK_ROWS] = self.ensemble.contributions(X[start:start + POOL_CHUNK_ROWS])
+                    report(min(POOL_CHUNK_ROWS, total - start))
+
+        elapsed = time.perf_counter() - started
+        computed = int((~np.isnan(out[:, 0])).sum())
+        stats = {
+            "rows": total,
+            "attributed_rows": computed,
+            "complete": computed == total,
+            "seconds": elapsed,
+            "budget_seconds": self.budget,
+            "estimated_seconds_in_process": calibration / rows_per_second + estimate,
+            "process_pool": use_pool,
+            "workers": self.workers if use_pool else 1,
+        }
+        return out, stats
+
+    def explain_frame(self, features, progress_callback=None):
+        """Columnas ``APORTE_<feature>`` para un DataFrame validado de features"""
+        import pandas as pd
+
+        values, stats = self.explain_matrix(
+            features[self.ensemble.feature_names].to_numpy(dtype=np.float64), progress_callback
+        )
+        columns = [CONTRIBUTION_PREFIX + name for name in self.ensemble.feature_names]
+        return pd.DataFrame(values, columns=columns, index=features.index), stats
+
+    def close(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
@@ -0,0 +1,151 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from prediction_client import FEATURE_COLUMNS, extract_prediction
+
+
+MIN_SCORE = 0
+MAX_SCORE = 100
+
+
+def read_upload(uploaded_file):
+    """Lee un archivo CSV o Parquet subido desde Streamlit"""
+    suffix = Path(getattr(uploaded_file, "name", str(uploaded_file))).suffix.lower()
+    if suffix == ".parquet":
+        return pd.read_parquet(uploaded_file)
+    return pd.read_csv(uploaded_file)
+
+
+def validate_features(df):
+    """Valida las cinco columnas de entrada de forma vectorizada.
+
+    Devuelve ``(features, invalid_mask, errors)``: ``features`` es un DataFrame
+    float64 con solo las columnas del modelo, ``invalid_mask`` marca las filas
+    con valores faltantes, no numéricos o fuera del rango 0-100 y ``errors``
+    es una lista de mensajes para mostrar al usuario.
+    """
+    missing = [column for column in FEATURE_COLUMNS if column not in df.columns]
+    if missing:
+        return None, None, [f"Faltan columnas requeridas: {', '.join(missing)}"]
+
+    features = df[FEATURE_COLUMNS].apply(pd.to_numeric, errors="coerce").astype("float64")
+    is_nan = features.isna()
+    out_of_range = (features < MIN_SCORE) | (features > MAX_SCORE)
+    invalid_mask = (is_nan | out_of_range).any(axis=1)
+
+    errors = []
+    for column in FEATURE_COLUMNS:
+        n_nan = int(is_nan[column].sum())
+        n_range = int(out_of_range[column].sum())
+        if n_nan:
+            errors.append(f"{column}: {n_nan} valores vacíos o no numéricos")
+        if n_range:
+            errors.append(f"{column}: {n_range} valores fuera del rango {MIN_SCORE}-{MAX_SCORE}")
+    return features, invalid_mask, errors
+
+
+def iter_chunks(features, chunk_size):
+    """Genera ``(inicio, chunk)`` sobre las filas del DataFrame"""
+    for start in range(0, len(features), chunk_size):
+        yield start, features.iloc[start:start + chunk_size]
+
+
+def score_chunk(client, chunk):
+    """Puntúa un chunk y devuelve ``(predicciones, errores)`` alineados por fila"""
+    if client.batch_endpoint:
+        # Una petición por chunk, en el formato de ``ICFES_WIRE_FORMAT`` (JSON por defecto)
+        try:
+            scores = client.score_batch(chunk[FEATURE_COLUMNS].to_numpy(dtype=np.float64))
+        except Exception as e:
+            return [None] * len(chunk), [str(e)] * len(chunk)
+        return [None if np.isnan(score) else float(score) for score in scores], [None] * len(chunk)
+
+    payloads = chunk.to_dict(orient="records")
+    # Sin endpoint de lotes: una petición por fila sobre las conexiones keep-alive del pool
+    predictions, errors = [], []
+    for payload in payloads:
+        try:
+            response = client.predict(payload, kind="batch")
+            if response.status_code == 200:
+                value = extract_prediction(response.json())
+                predictions.append(value)
+                errors.append(None if value is not None else "Respuesta sin valor de predicción")
+            else:
+                predictions.append(None)
+                errors.append(f"Error {response.status_code}")
+        except Exception as e:
+            predictions.append(None)
+            errors.append(str(e))
+    return predictions, errors
+
+
+def score_dataframe(features, client, chunk_size=500, max_workers=8, progress_callback=None):
+    """Puntúa ``features`` por chunks desde un pool de hilos acotado.
+
+    ``progress_callback(filas_procesadas, total, filas_por_segundo)`` se llama
+    desde el hilo que invoca la función, por lo que puede usar widgets de
+    Streamlit. Devuelve el DataFrame de resultados (mismo índice que
+    ``features``) y un dict con las estadísticas de throughput.
+    """
+    total = len(features)
+    predictions = np.full(total, np.nan)
+    errors = np.full(total, None, dtype=object)
+    started = time.perf_counter()
+    done = 0
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="icfes-batch") as executor:
+        futures = {
+            executor.submit(score_chunk, client, chunk): (start, len(chunk))
+            for start, chunk in iter_chunks(features, chunk_size)
+        }
+        for future in as_completed(futures):
+            start, size = futures[future]
+            chunk_predictions, chunk_errors = future.result()
+            predictions[start:start + size] = [np.nan if value is None else float(value) for value in chunk_predictions]
+            errors[start:start + size] = chunk_errors
+            done += size
+            if progress_callback is not None:
+                elapsed = time.perf_counter() - started
+                progress_callback(done, total, done / elapsed if elapsed > 0 else 0.0)
+
+    elapsed = time.perf_counter() - started
+    results = features.copy()
+    results["PREDICCION_PUNT_GLOBAL"] = predictions
+    results["ERROR"] = errors
+    stats = {
+        "rows": total,
+        "failed_rows": int(pd.isna(predictions).sum()),
+        "seconds": elapsed,
+        "rows_per_second": total / elapsed if elapsed > 0 else 0.0,
+    }
+    return results, stats
+
+
+def score_dataframe_local(features, ensemble, chunk_size=50000, progress_callback=None):
+    """Puntúa ``features`` con el ensamble local en proceso, sin red"""
+    total = len(features)
+    predictions = np.empty(total, dtype=np.float64)
+    values = features[ensemble.feature_names].to_numpy(dtype=np.float64)
+    started = time.perf_counter()
+    for start in range(0, total, chunk_size):
+        predictions[start:start + chunk_size] = ensemble.predict(values[start:start + chunk_size])
+        if progress_callback is not None:
+            done = min(start + chunk_size, total)
+            elapsed = time.perf_counter() - started
+            progress_callback(done, total, done / elapsed if elapsed > 0 else 0.0)
+
+    elapsed = time.perf_counter() - started
+    results = features.copy()
+    results["PREDICCION_PUNT_GLOBAL"] = predictions
+    results["ERROR"] = None
+    stats = {
+        "rows": total,
+        "failed_rows": 0,
+        "seconds": elapsed,
+        "rows_per_second": total / elapsed if elapsed > 0 else 0.0,
+    }
+    return results, stats
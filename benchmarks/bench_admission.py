@@ -0,0 +1,96 @@
+"""Benchmark del control de admisión (``admission_control``) ante una ráfaga de sesiones.
+
+``--sessions`` sesiones hacen clic ``--clicks`` veces cada una, con entradas
+distintas (sin caché ni agrupación), contra el stub con ``--latency`` de
+respuesta. Se compara sin límite y con el ``AdmissionController`` configurado:
+
+- ``al servidor``: peticiones que llegaron al stub.
+- ``pico en vuelo``: llamadas simultáneas máximas hacia el servidor.
+- ``rechazos``: por cuota de sesión, cola llena o espera vencida.
+- ``espera p95``: tiempo en la cola de las llamadas admitidas.
+- ``latencia p95``: de los clics que obtuvieron puntaje.
+
+Uso: python benchmarks/bench_admission.py [--sessions 40] [--clicks 10] [--latency 0.2]
+"""
+import argparse
+import random
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from admission_control import AdmissionController, AdmissionRejected  # noqa: E402
+from prediction_cache import PredictionCache  # noqa: E402
+from prediction_client import PredictionClient, build_payload  # noqa: E402
+from prediction_jobs import call_endpoint  # noqa: E402
+from session_memory import OK  # noqa: E402
+from stub_server import StubConfig, StubServer  # noqa: E402
+
+
+def run(stub, sessions, clicks, admission):
+    client = PredictionClient(endpoint=stub.url, pool_maxsize=sessions, admission=admission)
+    cache = PredictionCache()
+    latencies, outcomes, lock = [], {"ok": 0, "limiter": 0, "error": 0}, threading.Lock()
+    requests_before = stub.config.requests
+
+    def session(session_id):
+        rng = random.Random(session_id)
+        for _ in range(clicks):
+            time.sleep(rng.uniform(0.0, 0.1))
+            if admission is not None:
+                try:
+                    admission.check_session(session_id)
+                except AdmissionRejected:
+                    with lock:
+                        outcomes["limiter"] += 1
+                    continue
+            record = call_endpoint(client, cache, build_payload(*(rng.uniform(0, 100) for _ in range(5))))
+            with lock:
+                if record.status == OK:
+                    outcomes["ok"] += 1
+                    latencies.append(record.latency)
+                else:
+                    outcomes["limiter" if record.source == "limiter" else "error"] += 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=session, args=(index,)) for index in range(sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    peak = client.pool_stats()["peak_in_flight"]
+    client.close()
+    return {
+        "upstream": stub.config.requests - requests_before,
+        "peak": peak,
+        "outcomes": outcomes,
+        "latency_p95": latencies[int(0.95 * (len(latencies) - 1))] if latencies else float("nan"),
+        "elapsed": elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del control de admisión")
+    parser.add_argument("--sessions", type=int, default=40)
+    parser.add_argument("--clicks", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    with StubServer(StubConfig(latency=args.latency)) as stub:
+        for label, admission in (("sin límite", None), ("con admisión", AdmissionController())):
+            result = run(stub, args.sessions, args.clicks, admission)
+            print(f"{label}: {result['upstream']} al servidor · pico en vuelo {result['peak']} · "
+                  f"{result['outcomes']} · latencia p95 {result['latency_p95'] * 1000:.0f} ms · {result['elapsed']:.1f} s")
+            if admission is not None:
+                stats = admission.stats()
+                print(f"  encoladas {stats['queued']} · rechazos {stats['rejected']} · "
+                      f"espera p95 {stats['wait_p95_seconds'] * 1000:.0f} ms · máx {stats['wait_max_seconds'] * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""Benchmark headless de app.py con AppTest contra el stub de ``/predict/``.
+
+Escenarios:
+
+- ``first_load``: primera ejecución de una sesión nueva.
+- ``input_change``: cambiar un número de entrada y re-ejecutar.
+- ``prediction_click``: clic en "Realizar Predicción" con un payload nuevo
+  (sin caché) y sondeo hasta que llega el resultado.
+- ``error_path``: igual que el anterior, pero el stub responde siempre 500.
+
+Por ejecución se registra el tiempo de script, los deltas emitidos (elementos)
+y sus bytes; una pasada extra por escenario mide asignaciones con tracemalloc
+(va aparte porque tracemalloc altera los tiempos). Cada escenario corre en un
+proceso nuevo con su propio stub. AppTest siempre re-ejecuta el script completo,
+así que ``input_change`` mide un rerun completo y no uno de fragmento.
+
+Uso:
+    python benchmarks/bench_app.py [--iterations 10] [--latency 0.05] [--failure-rate 0]
+                                   [--output benchmarks/results/<rev>.json] [--baseline otro.json]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+APP = ROOT / "app.py"
+SCENARIOS = ("first_load", "input_change", "prediction_click", "error_path")
+
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+
+def _distribution(values):
+    values = sorted(value for value in values if value is not None)
+    if not values:
+        return None
+    return {
+        "median": statistics.median(values),
+        "p95": values[min(len(values) - 1, int(round(0.95 * (len(values) - 1))))],
+        "min": values[0],
+        "max": values[-1],
+    }
+
+
+# --- Proceso hijo: corre un escenario -------------------------------------------------
+
+class DeltaCounter:
+    """Cuenta los deltas y sus bytes envolviendo ``ScriptRunContext.enqueue``"""
+
+    def __init__(self):
+        from streamlit.runtime.scriptrunner_utils.script_run_context import ScriptRunContext
+
+        self.count = 0
+        self.bytes = 0
+        original = ScriptRunContext.enqueue
+        counter = self
+
+        def counting_enqueue(ctx, msg):
+            if msg.HasField("delta"):
+                counter.count += 1
+                counter.bytes += msg.ByteSize()
+            return original(ctx, msg)
+
+        ScriptRunContext.enqueue = counting_enqueue
+
+    def reset(self):
+        self.count, self.bytes = 0, 0
+
+
+def _measured_run(at, counter, trace):
+    import tracemalloc
+
+    counter.reset()
+    if trace:
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    at.run()
+    elapsed = time.perf_counter() - started
+    sample = {"script_s": elapsed, "deltas": counter.count, "delta_bytes": counter.bytes}
+    if trace:
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        sample["peak_alloc_bytes"] = peak - before
+        sample["retained_alloc_bytes"] = current - before
+    if at.exception:
+        sample["exception"] = str(at.exception[0].value)[:200]
+    return sample
+
+
+def _new_session():
+    from streamlit.testing.v1 import AppTest
+
+    return AppTest.from_file(str(APP), default_timeout=120)
+
+
+def _wait_for_result(at, timeout):
+    """Re-ejecuta la app (como el sondeo del fragmento) hasta que hay registro de predicción"""
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        record = at.session_state["prediction_record"] if "prediction_record" in at.session_state else None
+        if record is not None:
+            return time.perf_counter() - started, record.status
+        time.sleep(0.02)
+        at.run()
+    return None, None
+
+
+def run_child(scenario, iterations, result_timeout):
+    counter = DeltaCounter()
+    samples = []
+    for iteration in range(iterations + 1):
+        trace = iteration == iterations
+        if scenario == "first_load":
+            at = _new_session()
+            sample = _measured_run(at, counter, trace)
+        elif scenario == "input_change":
+            at = _new_session().run()
+            at.number_input(key="ingles_input").set_value(iteration % 101)
+            sample = _measured_run(at, counter, trace)
+        else:
+            at = _new_session().run()
+            # Payload distinto en cada iteración para no responder desde la caché
+            at.number_input(key="ingles_input").set_value(iteration % 101)
+            at.number_input(key="comunicacion_input").set_value((iteration // 101) % 101)
+            at.button(key="predict_button").click()
+            sample = _measured_run(at, counter, trace)
+            sample["time_to_result_s"], sample["status"] = _wait_for_result(at, result_timeout)
+        sample["traced"] = trace
+        sample["cold_process"] = iteration == 0
+        samples.append(sample)
+    print(json.dumps(samples))
+
+
+# --- Proceso padre: stub, subprocesos y resumen ---------------------------------------
+
+def summarize(samples):
+    timed = [sample for sample in samples if not sample["traced"]]
+    traced = [sample for sample in samples if sample["traced"]]
+    warm = [sample for sample in timed if not sample["cold_process"]] or timed
+    summary = {
+        "iterations": len(timed),
+        "script_s": _distribution(sample["script_s"] for sample in warm),
+        "cold_script_s": timed[0]["script_s"] if timed else None,
+        "deltas": statistics.median(sample["deltas"] for sample in timed),
+        "delta_bytes": statistics.median(sample["delta_bytes"] for sample in timed),
+        "peak_alloc_bytes": traced[0].get("peak_alloc_bytes") if traced else None,
+        "retained_alloc_bytes": traced[0].get("retained_alloc_bytes") if traced else None,
+        "exceptions": sum(1 for sample in samples if "exception" in sample),
+    }
+    if any("time_to_result_s" in sample for sample in timed):
+        summary["time_to_result_s"] = _distribution(sample.get("time_to_result_s") for sample in timed)
+        summary["statuses"] = sorted({sample.get("status") or "timeout" for sample in timed})
+    return summary
+
+
+def run_scenario(scenario, args):
+    from stub_server import StubConfig, StubServer
+
+    failure_rate = 1.0 if scenario == "error_path" else args.failure_rate
+    config = StubConfig(args.latency, args.jitter, failure_rate, args.non_json_rate, args.seed)
+    env = {key: value for key, value in os.environ.items() if not key.startswith("ICFES_")}
+    with StubServer(config) as stub:
+        env["ICFES_API_URL"] = stub.url
+        if args.local_model:
+            env["ICFES_LOCAL_MODEL_PATH"] = args.local_model
+        completed = subprocess.run(
+            [sys.executable, __file__, "--child", scenario, "--iterations", str(args.iterations),
+             "--result-timeout", str(args.result_timeout)],
+            cwd=ROOT, env=env, capture_output=True, text=True, timeout=args.scenario_timeout,
+        )
+    if completed.returncode != 0:
+        raise SystemExit(f"{scenario} falló:\n{completed.stderr[-2000:]}")
+    samples = json.loads(completed.stdout.strip().splitlines()[-1])
+    summary = summarize(samples)
+    summary["stub"] = {"requests": config.requests, "failure_rate": failure_rate}
+    return summary, samples
+
+
+def _git_rev():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(current, baseline):
+    """Cambio relativo de la mediana de tiempo de script y de los bytes por escenario"""
+    print(f"\n{'escenario':<18} {'script (base→actual)':>26} {'bytes (base→actual)':>24}")
+    for scenario, summary in current["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(scenario)
+        if not base or not base.get("script_s") or not summary.get("script_s"):
+            continue
+        before, after = base["script_s"]["median"], summary["script_s"]["median"]
+        change = (after - before) / before * 100 if before else 0.0
+        print(f"{scenario:<18} {before * 1000:>9.1f} → {after * 1000:>7.1f} ms ({change:+5.1f}%) "
+              f"{base['delta_bytes']:>9.0f} → {summary['delta_bytes']:>8.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark headless de app.py")
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--latency", type=float, default=0.05, help="latencia del stub en segundos")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--non-json-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--local-model", help="ruta a un ensamble .npz para activar el backend local")
+    parser.add_argument("--result-timeout", type=float, default=60.0)
+    parser.add_argument("--scenario-timeout", type=float, default=900.0)
+    parser.add_argument("--output", help="archivo JSON de salida (por defecto benchmarks/results/<rev>.json)")
+    parser.add_argument("--baseline", help="JSON de una corrida anterior para comparar")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.iterations, args.result_timeout)
+        return
+
+    import streamlit
+
+    rev = _git_rev()
+    result = {
+        "meta": {
+            "git_rev": rev,
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "streamlit": streamlit.__version__,
+            "iterations": args.iterations,
+            "stub": {"latency": args.latency, "jitter": args.jitter,
+                     "failure_rate": args.failure_rate, "non_json_rate": args.non_json_rate},
+        },
+        "scenarios": {},
+        "samples": {},
+    }
+    for scenario in args.scenarios.split(","):
+        summary, samples = run_scenario(scenario, args)
+        result["scenarios"][scenario] = summary
+        result["samples"][scenario] = samples
+        script = summary["script_s"]
+        line = (f"{scenario:<18} script {script['median'] * 1000:7.1f} ms (p95 {script['p95'] * 1000:.1f}) · "
+                f"{summary['deltas']:.0f} deltas · {summary['delta_bytes'] / 1024:.1f} KB · "
+                f"pico {summary['peak_alloc_bytes'] / 1024 / 1024:.1f} MB")
+        if summary.get("time_to_result_s"):
+            line += f" · resultado en {summary['time_to_result_s']['median'] * 1000:.0f} ms {summary['statuses']}"
+        print(line)
+
+    output = Path(args.output) if args.output else ROOT / "benchmarks" / "results" / f"{rev or 'local'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2), encoding="utf-8")
+    print(f"resultados en {output}")
+
+    if args.baseline:
+        compare(result, json.loads(Path(args.baseline).read_text(encoding="utf-8")))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Benchmark del historial de predicciones (``prediction_history``).
+
+Se mide:
+
+- ``record_us``: lo que tarda ``record`` en el camino de la petición (solo encolar).
+- ``rows_per_second``: filas escritas por segundo por el hilo escritor en lotes.
+- Consultas de página sobre la tabla llena: primera página, una página
+  profunda por cursor, el mismo salto con ``OFFSET`` como referencia, y los
+  filtros por tupla de entradas y por periodo.
+
+Uso: python benchmarks/bench_history.py [--rows 1000000] [--page 50] [--path /tmp/history.sqlite]
+"""
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from prediction_client import build_payload  # noqa: E402
+from prediction_history import COLUMNS, PredictionHistory  # noqa: E402
+from session_memory import PredictionRecord  # noqa: E402
+
+
+def timed(function, repeat=20):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del historial de predicciones")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--page", type=int, default=50)
+    parser.add_argument("--path", help="archivo SQLite (por defecto uno temporal)")
+    args = parser.parse_args()
+
+    path = args.path or str(Path(tempfile.mkdtemp()) / "history.sqlite")
+    # Cola del tamaño de la carga para medir el rendimiento del escritor sin descartes
+    history = PredictionHistory(path, queue_size=args.rows + 1)
+    rng = random.Random(0)
+    payloads = [build_payload(*(rng.randint(0, 100) for _ in range(5))) for _ in range(1000)]
+    record = PredictionRecord(score=300.0, latency=0.05, source="remote", replica="127.0.0.1:8000")
+
+    record_samples = []
+    started = time.perf_counter()
+    for index in range(args.rows):
+        call_started = time.perf_counter()
+        history.record(payloads[index % len(payloads)], record, "127.0.0.1:8000")
+        record_samples.append(time.perf_counter() - call_started)
+    enqueue_s = time.perf_counter() - started
+    history.flush()
+    total_s = time.perf_counter() - started
+    record_samples.sort()
+    print(f"record: mediana {statistics.median(record_samples) * 1e6:.1f} µs · "
+          f"p99 {record_samples[int(0.99 * (len(record_samples) - 1))] * 1e6:.1f} µs · "
+          f"encolar {args.rows} filas en {enqueue_s:.2f} s")
+    stats = history.stats()
+    print(f"escritor: {stats['written'] / total_s:,.0f} filas/s · {stats['batches']} lotes · {stats['dropped']} descartadas")
+
+    middle_id = stats["rows"] // 2
+    reader = history._reader
+    offset_sql = f"SELECT {', '.join(COLUMNS)} FROM predictions ORDER BY id DESC LIMIT ? OFFSET ?"
+    print(f"primera página:            {timed(lambda: history.page(limit=args.page)):8.3f} ms")
+    print(f"página a mitad (cursor):   {timed(lambda: history.page(before_id=middle_id, limit=args.page)):8.3f} ms")
+    print(f"página a mitad (OFFSET):   {timed(lambda: reader.execute(offset_sql, (args.page, middle_id)).fetchall(), 5):8.3f} ms")
+    print(f"filtro por entrada:        {timed(lambda: history.page(limit=args.page, inputs=payloads[7])):8.3f} ms")
+    print(f"filtro última hora:        {timed(lambda: history.page(limit=args.page, since=time.time() - 3600)):8.3f} ms")
+    print(f"stats:                     {timed(history.stats):8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
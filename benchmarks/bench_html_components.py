@@ -0,0 +1,150 @@
+"""Micro-benchmark de html_components contra las f-strings que tenía app.py.
+
+Compara, por rerun, el tiempo de generar el HTML de las secciones estáticas
+(CSS, importancia de features, stack técnico y cuadro de resultado), los bytes
+de HTML y los bytes de los deltas que Streamlit enviaría al navegador.
+
+Uso: python benchmarks/bench_html_components.py [--repeat 2000]
+"""
+import argparse
+import ast
+import sys
+import timeit
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg  # noqa: E402
+
+from html_components import (  # noqa: E402
+    badge_card_section,
+    feature_importance_section,
+    metric_card,
+    style_block,
+)
+
+
+FEATURES = (
+    ("Razonamiento Cuantitativo", 32),
+    ("Lectura Crítica", 28),
+    ("Inglés", 22),
+    ("Competencias Ciudadanas", 11),
+    ("Comunicación Escrita", 7),
+)
+
+TECH_CATEGORIES = (
+    ("Machine Learning", ("Python 3.9+", "Scikit-learn", "Pandas", "NumPy")),
+    ("MLOps", ("MLflow", "DVC")),
+    ("API & Deployment", ("FastAPI", "Docker")),
+    ("Testing", ("Pytest", "GitHub Actions")),
+)
+
+
+def load_app_css():
+    """Lee la constante APP_CSS de app.py sin ejecutar la app"""
+    tree = ast.parse((ROOT / "app.py").read_text(encoding="utf-8"))
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(getattr(target, "id", None) == "APP_CSS" for target in node.targets):
+            return ast.literal_eval(node.value)
+    raise SystemExit("APP_CSS no encontrado en app.py")
+
+
+def legacy_render(css, score):
+    """Markdown generado por rerun con las f-strings anteriores: un elemento por bloque"""
+    bodies = [f"\n<style>{css}</style>\n", """
+<div class="apple-card">
+    <div class="card-title" style="font-size: 1.5rem;">Importancia de Features</div>
+</div>
+"""]
+    for feature, importance in FEATURES:
+        bodies.append(f"""
+    <div class="apple-card" style="padding: 1.25rem; margin: 0.5rem 0;">
+        <div style="display: flex; justify-content: space-between; margin-bottom: 0.75rem;">
+            <span style="font-weight: 500; color: #f5f5f7;">{feature}</span>
+            <span style="color: #0071e3; font-weight: 600;">{importance}%</span>
+        </div>
+        <div class="ios-progress">
+            <div class="ios-progress-fill" style="width: {importance}%;"></div>
+        </div>
+    </div>
+    """)
+    for category, techs in TECH_CATEGORIES:
+        bodies.append(f"""
+    <div class="apple-card">
+        <div style="font-size: 1.25rem; font-weight: 600; color: #f5f5f7; margin-bottom: 1rem;">
+            {category}
+        </div>
+        <div style="display: flex; flex-wrap: wrap; gap: 0.5rem;">
+            {"".join([f'<span class="ios-badge">{tech}</span>' for tech in techs])}
+        </div>
+    </div>
+    """)
+    bodies.append(f"""
+            <div class="apple-card" style="background: linear-gradient(135deg, rgba(0, 113, 227, 0.15) 0%, rgba(0, 113, 227, 0.05) 100%); border-color: rgba(0, 113, 227, 0.3);">
+                <div style="text-align: center; padding: 2rem 0;">
+                    <div style="font-size: 4rem; font-weight: 700; color: #0071e3; margin-bottom: 1rem;">
+                        {float(score):.0f}
+                    </div>
+                    <div style="font-size: 1.25rem; color: #f5f5f7; font-weight: 500; margin-bottom: 0.5rem;">
+                        Puntaje Global ICFES
+                    </div>
+                    <div style="font-size: 0.875rem; color: #86868b;">
+                        Predicción generada por el modelo
+                    </div>
+                </div>
+            </div>
+            """)
+    return bodies
+
+
+def component_render(css, score):
+    """Markdown generado por rerun con los componentes memoizados"""
+    return [
+        style_block(css),
+        feature_importance_section("Importancia de Features", FEATURES),
+        badge_card_section(TECH_CATEGORIES),
+        metric_card(f"{float(score):.0f}", "Puntaje Global ICFES", "Predicción generada por el modelo"),
+    ]
+
+
+def delta_bytes(bodies):
+    """Bytes serializados de los deltas de markdown que se enviarían al navegador"""
+    total = 0
+    for body in bodies:
+        msg = ForwardMsg()
+        msg.delta.new_element.markdown.body = body
+        msg.delta.new_element.markdown.allow_html = True
+        total += msg.ByteSize()
+    return total
+
+
+def measure(name, render, css, repeat):
+    bodies = render(css, 287.4)
+    seconds = min(timeit.repeat(lambda: render(css, 287.4), number=repeat, repeat=5)) / repeat
+    return {
+        "variant": name,
+        "render_us": seconds * 1e6,
+        "elements": len(bodies),
+        "html_bytes": sum(len(body.encode("utf-8")) for body in bodies),
+        "delta_bytes": delta_bytes(bodies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    css = load_app_css()
+    rows = [
+        measure("f-strings", legacy_render, css, args.repeat),
+        measure("componentes", component_render, css, args.repeat),
+    ]
+    print(f"{'variante':<12} {'render µs':>10} {'elementos':>10} {'HTML bytes':>11} {'delta bytes':>12}")
+    for row in rows:
+        print(f"{row['variant']:<12} {row['render_us']:>10.2f} {row['elements']:>10} {row['html_bytes']:>11} {row['delta_bytes']:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Benchmark del almacén compartido entre réplicas (``shared_store``).
+
+Arranca ``--replicas`` procesos a la vez, cada uno con su caché en memoria
+vacía, y todos piden las mismas ``--payloads`` entradas (en distinto orden)
+contra el stub con ``--latency`` de respuesta. Se compara sin almacén y con
+el almacén SQLite compartido:
+
+- ``al servidor``: peticiones de predicción que llegaron al stub.
+- ``sondeos``: sondeos de calentamiento enviados al arrancar.
+- ``p95``: latencia de las predicciones vista por las réplicas.
+
+Uso: python benchmarks/bench_shared_store.py [--replicas 6] [--payloads 50] [--latency 0.2]
+"""
+import argparse
+import multiprocessing
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+
+def replica(url, store_path, start_at, payloads, seed, results):
+    from endpoint_monitor import EndpointMonitor
+    from prediction_cache import PredictionCache
+    from prediction_client import PredictionClient, build_payload
+    from prediction_jobs import execute_remote_prediction
+    from shared_store import open_shared_store
+
+    store = open_shared_store(store_path) if store_path else None
+    client = PredictionClient(endpoint=url)
+    cache = PredictionCache(shared=store)
+    order = list(range(payloads))
+    random.Random(seed).shuffle(order)
+    time.sleep(max(0.0, start_at - time.time()))
+
+    monitor = EndpointMonitor(client, shared=store)
+    latencies = []
+    for index in order:
+        payload = build_payload(index, 50, 50, 50, 50)
+        started = time.perf_counter()
+        if cache.get(payload) is None:
+            execute_remote_prediction(client, cache, monitor, payload)
+        latencies.append(time.perf_counter() - started)
+    results.put({"latencies": latencies, "probes": monitor.stats()["probes"]})
+
+
+def run(stub, replicas, payloads, store_path):
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    before = stub.config.requests
+    start_at = time.time() + 3.0
+    processes = [
+        context.Process(target=replica, args=(stub.url, store_path, start_at, payloads, seed, results))
+        for seed in range(replicas)
+    ]
+    for process in processes:
+        process.start()
+    outputs = [results.get(timeout=300) for _ in processes]
+    for process in processes:
+        process.join()
+    latencies = sorted(latency for output in outputs for latency in output["latencies"])
+    probes = sum(output["probes"] for output in outputs)
+    return {
+        "upstream": stub.config.requests - before - probes,
+        "probes": probes,
+        "p95": latencies[int(0.95 * (len(latencies) - 1))],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del almacén compartido entre réplicas")
+    parser.add_argument("--replicas", type=int, default=6)
+    parser.add_argument("--payloads", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    from stub_server import StubConfig, StubServer
+
+    with StubServer(StubConfig(latency=args.latency)) as stub:
+        for label, store_path in (("sin almacén", None), ("SQLite compartido", tempfile.mktemp(suffix=".sqlite"))):
+            result = run(stub, args.replicas, args.payloads, store_path)
+            print(f"{label}: {result['upstream']} al servidor ({args.replicas * args.payloads} pedidas) · "
+                  f"{result['probes']} sondeos · p95 {result['p95'] * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Benchmark de arranque en frío de app.py.
+
+Cada medición corre en un proceso nuevo para que ningún módulo esté ya
+importado. Se mide:
+
+- ``import_s``: importar Streamlit y los imports de nivel superior de app.py.
+- ``first_element_s``: desde el inicio del proceso hasta el primer elemento
+  enviado al navegador en una ejecución headless con ``AppTest``.
+- ``first_run_s``: lo que tarda la primera ejecución completa del script.
+- ``heavy_modules``: cuáles de numpy, pandas y PIL quedaron importados tras
+  los imports de nivel superior.
+
+Uso: python benchmarks/bench_startup.py [--runs 5] [--json startup.json]
+"""
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+APP = ROOT / "app.py"
+HEAVY_MODULES = ("numpy", "pandas", "PIL")
+
+
+def top_level_imports():
+    """Código de los imports de nivel superior de app.py"""
+    source = APP.read_text(encoding="utf-8")
+    tree = ast.parse(source)
+    nodes = [node for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+    return "\n".join(ast.get_source_segment(source, node) for node in nodes)
+
+
+CHILD = r"""
+import json, sys, time
+started = time.perf_counter()
+sys.path.insert(0, {root!r})
+exec(compile({imports!r}, "app-imports", "exec"))
+import_s = time.perf_counter() - started
+heavy = [name for name in {heavy!r} if name in sys.modules]
+
+from streamlit.runtime.scriptrunner_utils.script_run_context import ScriptRunContext
+from streamlit.testing.v1 import AppTest
+
+first_element = []
+original_enqueue = ScriptRunContext.enqueue
+
+def timed_enqueue(self, msg):
+    if not first_element and msg.HasField("delta"):
+        first_element.append(time.perf_counter() - started)
+    return original_enqueue(self, msg)
+
+ScriptRunContext.enqueue = timed_enqueue
+run_started = time.perf_counter()
+at = AppTest.from_file({app!r}, default_timeout=120).run()
+first_run_s = time.perf_counter() - run_started
+print(json.dumps({{
+    "import_s": import_s,
+    "first_element_s": first_element[0] if first_element else None,
+    "first_run_s": first_run_s,
+    "total_s": time.perf_counter() - started,
+    "exception": bool(at.exception),
+    "heavy_modules": heavy,
+}}))
+"""
+
+
+def run_once(env):
+    code = CHILD.format(root=str(ROOT), imports=top_level_imports(), heavy=HEAVY_MODULES, app=str(APP))
+    completed = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, timeout=300
+    )
+    if completed.returncode != 0:
+        raise SystemExit(completed.stderr)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Arranque en frío de app.py")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", help="ruta donde guardar los resultados")
+    parser.add_argument("--api-url", default="http://127.0.0.1:9/predict/",
+                        help="endpoint para la prueba; por defecto uno inalcanzable, sin red")
+    args = parser.parse_args()
+
+    env = dict(os.environ, ICFES_API_URL=args.api_url)
+    samples = []
+    for _ in range(args.runs):
+        sample = run_once(env)
+        samples.append(sample)
+        print(f"import {sample['import_s']:.3f} s · primer elemento {sample['first_element_s']:.3f} s · "
+              f"primera ejecución {sample['first_run_s']:.3f} s · módulos pesados: {', '.join(sample['heavy_modules']) or '-'}")
+
+    summary = {
+        key: statistics.median(sample[key] for sample in samples)
+        for key in ("import_s", "first_element_s", "first_run_s", "total_s")
+    }
+    summary["runs"] = args.runs
+    summary["heavy_modules"] = samples[-1]["heavy_modules"]
+    summary["git_rev"] = subprocess.run(
+        ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True
+    ).stdout.strip() or None
+    summary["timestamp"] = time.time()
+    print("mediana:", json.dumps(summary))
+    if args.json:
+        Path(args.json).write_text(json.dumps({"summary": summary, "samples": samples}, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Benchmark de memoria del modo streaming frente al lote en memoria.
+
+Genera archivos CSV sintéticos de varios tamaños y puntúa cada uno en un
+proceso nuevo contra el stub local (endpoint de lotes, formato float32):
+
+- ``streaming``: ``stream_score`` por chunks con resultados a disco.
+- ``memoria``: ``read_upload`` + ``score_dataframe`` (el modo por lotes de siempre).
+
+Se reporta el pico de memoria residente del proceso (``ru_maxrss``) y las
+filas por segundo. En streaming el pico debe quedar plano al crecer el archivo.
+
+Uso: python benchmarks/bench_streaming.py [--rows 200000,1000000,3000000] [--modes streaming,memoria]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+FEATURE_COLUMNS = [
+    "MOD_INGLES_PNAL",
+    "MOD_COMUNI_ESCRITA_PNAL",
+    "MOD_COMPETEN_CIUDADA_PNAL",
+    "MOD_LECTURA_CRITICA_PNAL",
+    "MOD_RAZONA_CUANTITATIVO_PNAL",
+]
+
+CHILD = r"""
+import json, resource, sys, time
+sys.path.insert(0, {root!r}); sys.path.insert(0, {benchmarks!r})
+from stub_server import StubConfig, StubServer
+from prediction_client import PredictionClient
+
+stub = StubServer(StubConfig()).start()
+client = PredictionClient(endpoint=stub.url, batch_endpoint=stub.batch_url, wire_format="f32")
+started = time.perf_counter()
+if {mode!r} == "streaming":
+    from streaming_batch import stream_score
+    with open({path!r}, "rb") as handle:
+        stats, run = stream_score(handle, {path!r}, {output!r}, client=client, max_in_flight=4, request_rows=5000)
+    rows = run["rows"]
+else:
+    from batch_prediction import read_upload, score_dataframe, validate_features
+    features, invalid, _ = validate_features(read_upload({path!r}))
+    results, _ = score_dataframe(features[~invalid], client, chunk_size=5000, max_workers=4)
+    results.to_csv({output!r}, index=False)
+    rows = len(results)
+print(json.dumps({{"rows": rows, "seconds": time.perf_counter() - started,
+                  "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}}))
+"""
+
+
+def write_csv(path, rows, chunk=500_000):
+    rng = np.random.default_rng(0)
+    with open(path, "w", encoding="utf-8") as handle:
+        handle.write(",".join(["ID_ESTUDIANTE", *FEATURE_COLUMNS]) + "\n")
+        for start in range(0, rows, chunk):
+            size = min(chunk, rows - start)
+            values = np.round(rng.uniform(0, 100, size=(size, 5)), 1)
+            ids = np.arange(start, start + size)
+            np.savetxt(handle, np.column_stack([ids, values]), fmt=["%d"] + ["%.1f"] * 5, delimiter=",")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de memoria del modo streaming")
+    parser.add_argument("--rows", default="200000,1000000,3000000")
+    parser.add_argument("--modes", default="streaming,memoria")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp())
+    print(f"{'filas':>10} {'MB archivo':>11} {'modo':<10} {'pico RSS MB':>12} {'filas/s':>10}")
+    for rows in (int(value) for value in args.rows.split(",")):
+        path = workdir / f"estudiantes_{rows}.csv"
+        write_csv(path, rows)
+        for mode in args.modes.split(","):
+            code = CHILD.format(root=str(ROOT), benchmarks=str(ROOT / "benchmarks"), mode=mode,
+                                path=str(path), output=str(workdir / f"out_{mode}_{rows}.csv"))
+            completed = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=ROOT)
+            if completed.returncode != 0:
+                raise SystemExit(completed.stderr[-2000:])
+            result = json.loads(completed.stdout.strip().splitlines()[-1])
+            print(f"{rows:>10,} {os.path.getsize(path) / 1e6:>11.0f} {mode:<10} {result['peak_rss_mb']:>12.0f} "
+                  f"{result['rows'] / result['seconds']:>10,.0f}")
+        path.unlink()
+
+
+if __name__ == "__main__":
+    main()
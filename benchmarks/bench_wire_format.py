@@ -0,0 +1,92 @@
+"""Benchmark del formato de los lotes: JSON vs Arrow IPC vs float32 empaquetado.
+
+Por combinación de formato y compresión se mide, por chunk:
+
+- ``encode_ms``: serializar y comprimir la petición en el cliente.
+- ``decode_ms``: lo que le cuesta al servidor descomprimir y leer las filas.
+- ``request_B/row`` y ``response_B/row``: bytes en el cable por fila.
+- ``rows/s``: puntuar todo el archivo contra el stub local con ``score_batch``
+  (una petición por chunk, secuencial, sin latencia simulada).
+
+También se comprueba que las predicciones coinciden con las de JSON (hasta
+la precisión de float32).
+
+Uso: python benchmarks/bench_wire_format.py [--rows 100000] [--chunk 1000]
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import wire_format  # noqa: E402
+from prediction_client import PredictionClient  # noqa: E402
+from stub_server import StubConfig, StubServer  # noqa: E402
+
+
+def combinations():
+    formats = ["json", "f32"] + (["arrow"] if wire_format.has_arrow() else [])
+    encodings = [wire_format.IDENTITY, wire_format.GZIP] + ([wire_format.ZSTD] if wire_format.has_zstd() else [])
+    return [(name, encoding) for name in formats for encoding in encodings]
+
+
+def median_ms(function, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del formato de los lotes")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--chunk", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    # Puntajes con un decimal, como los de un archivo real de resultados
+    values = np.round(rng.uniform(0, 100, size=(args.rows, 5)), 1)
+    chunk = values[:args.chunk]
+    if not wire_format.has_zstd():
+        print("(sin el paquete zstandard: se omite zstd)")
+
+    print(f"{'formato':<16} {'encode ms':>10} {'decode ms':>10} {'req B/fila':>11} {'resp B/fila':>12} {'filas/s':>10} {'máx |Δ|':>9}")
+    baseline = None
+    with StubServer(StubConfig()) as stub:
+        for name, encoding in combinations():
+            content_type = wire_format.resolve_format(name)
+            encode = lambda: wire_format.compress(wire_format.encode_rows(chunk, content_type), encoding)
+            body = encode()
+            encode_ms = median_ms(encode, args.repeat)
+            decode_ms = median_ms(
+                lambda: wire_format.decode_rows(wire_format.decompress(body, encoding), content_type), args.repeat
+            )
+            response = wire_format.encode_predictions(chunk @ np.array((1.0, 0.8, 1.0, 1.1, 1.1)), content_type)
+            # El stub comprime con gzip las respuestas de más de 1 KB
+            response_bytes = len(wire_format.compress(response, wire_format.GZIP)) if len(response) > 1024 else len(response)
+
+            client = PredictionClient(endpoint=stub.url, batch_endpoint=stub.batch_url, wire_format=name, wire_encoding=encoding)
+            started = time.perf_counter()
+            predictions = np.concatenate([
+                client.score_batch(values[start:start + args.chunk]) for start in range(0, args.rows, args.chunk)
+            ])
+            rows_per_second = args.rows / (time.perf_counter() - started)
+            client.close()
+            if baseline is None:
+                baseline = predictions
+            max_diff = float(np.max(np.abs(predictions - baseline)))
+
+            print(f"{name + '+' + encoding:<16} {encode_ms:>10.3f} {decode_ms:>10.3f} {len(body) / len(chunk):>11.1f} "
+                  f"{response_bytes / len(chunk):>12.1f} {rows_per_second:>10,.0f} {max_diff:>9.4f}")
+
+
+if __name__ == "__main__":
+    main()
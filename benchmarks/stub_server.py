@@ -0,0 +1,188 @@
+"""Servidor local que imita el endpoint ``/predict/`` para los benchmarks.
+
+Responde ``{"predicted_score": valor}`` a un payload y ``{"predictions": [...]}``
+a una lista de payloads, con latencia y tasas de falla configurables:
+
+- ``latency``/``jitter``: segundos de espera por petición (uniforme en ±jitter).
+- ``failure_rate``: fracción de respuestas HTTP 500.
+- ``non_json_rate``: fracción de respuestas 200 con HTML en lugar de JSON.
+- ``json_only``: responde 415 a los lotes columnares (Arrow o float32), como
+  un servidor que solo entiende JSON.
+
+Los lotes columnares se responden en el formato del header ``Accept`` y las
+respuestas de más de 1 KB se comprimen con gzip si el cliente lo acepta.
+
+Uso independiente: python benchmarks/stub_server.py --port 18080 --latency 0.05
+"""
+import argparse
+import gzip
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import wire_format  # noqa: E402
+
+# Pesos aproximados del puntaje global: las cinco áreas suman hasta 500 puntos
+WEIGHTS = (1.0, 0.8, 1.0, 1.1, 1.1)
+
+
+def stub_score(payload):
+    values = list(payload.values())[:len(WEIGHTS)]
+    return round(sum(weight * float(value) for weight, value in zip(WEIGHTS, values)), 4)
+
+
+class StubConfig:
+    def __init__(self, latency=0.0, jitter=0.0, failure_rate=0.0, non_json_rate=0.0, seed=0, json_only=False):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.non_json_rate = non_json_rate
+        self.json_only = json_only
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.rows = 0
+
+    def draw(self):
+        """Devuelve ``(espera, desenlace)`` para una petición"""
+        with self._lock:
+            self.requests += 1
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+            roll = self._random.random()
+        if roll < self.failure_rate:
+            return delay, "failure"
+        if roll < self.failure_rate + self.non_json_rate:
+            return delay, "non_json"
+        return delay, "ok"
+
+
+def make_handler(config):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers y cuerpo salen en escrituras separadas: sin TCP_NODELAY el ACK retardado suma ~40 ms
+        disable_nagle_algorithm = True
+
+        def _send(self, status, body, content_type="application/json"):
+            data = body.encode("utf-8") if isinstance(body, str) else body
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            if len(data) > 1024 and "gzip" in self.headers.get("Accept-Encoding", ""):
+                data = gzip.compress(data, compresslevel=1)
+                self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            raw = self.rfile.read(length)
+            content_type = self.headers.get("Content-Type", wire_format.JSON).split(";")[0].strip()
+            delay, outcome = config.draw()
+            time.sleep(delay)
+            if content_type != wire_format.JSON:
+                if config.json_only or content_type not in (wire_format.ARROW, wire_format.F32):
+                    self._send(415, json.dumps({"detail": f"stub: formato no soportado {content_type}"}))
+                    return
+                self._columnar(raw, content_type, outcome)
+                return
+            body = json.loads(wire_format.decompress(raw, self.headers.get("Content-Encoding")) or b"null")
+            if outcome == "failure":
+                self._send(500, json.dumps({"detail": "stub: falla simulada"}))
+            elif outcome == "non_json":
+                self._send(200, "<html><body>stub: respuesta no JSON</body></html>", "text/html")
+            elif isinstance(body, list):
+                with config._lock:
+                    config.rows += len(body)
+                self._send(200, json.dumps({"predictions": [stub_score(payload) for payload in body]}))
+            else:
+                with config._lock:
+                    config.rows += 1
+                self._send(200, json.dumps({"predicted_score": stub_score(body)}))
+
+        def _columnar(self, raw, content_type, outcome):
+            if outcome != "ok":
+                self._send(500, json.dumps({"detail": "stub: falla simulada"}))
+                return
+            columns = self.headers.get(wire_format.COLUMNS_HEADER)
+            values = wire_format.decode_rows(
+                wire_format.decompress(raw, self.headers.get("Content-Encoding")), content_type,
+                columns.split(",") if columns else None,
+            )
+            with config._lock:
+                config.rows += len(values)
+            scores = (values @ WEIGHTS).round(4)
+            accept = self.headers.get("Accept", "")
+            response_type = content_type if content_type in accept else wire_format.JSON
+            self._send(200, wire_format.encode_predictions(scores, response_type), response_type)
+
+        def do_GET(self):
+            self._send(200, json.dumps({"status": "ok"}))
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+
+class StubServer:
+    """Servidor stub en un hilo daemon; ``url``/``batch_url`` apuntan a él"""
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.config = config or StubConfig()
+        self._server = ThreadingHTTPServer((host, port), make_handler(self.config))
+        self._server.daemon_threads = True
+        self.host, self.port = self._server.server_address[:2]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="icfes-stub", daemon=True)
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}/predict/"
+
+    @property
+    def batch_url(self):
+        return f"http://{self.host}:{self.port}/predict/batch/"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub local del endpoint /predict/")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18080)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--non-json-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json-only", action="store_true", help="rechaza con 415 los lotes columnares")
+    args = parser.parse_args()
+    config = StubConfig(args.latency, args.jitter, args.failure_rate, args.non_json_rate, args.seed, args.json_only)
+    server = StubServer(config, args.host, args.port).start()
+    print(f"stub escuchando en {server.url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
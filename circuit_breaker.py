@@ -0,0 +1,107 @@
+import threading
+import time
+
+from prediction_client import _env_float, _env_int
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Circuit breaker del endpoint remoto, compartido por todas las sesiones.
+
+    Tras ``failure_threshold`` fallos consecutivos se abre y las llamadas se
+    rechazan de inmediato durante ``reset_timeout`` segundos. Pasado ese
+    tiempo queda semiabierto: deja pasar hasta ``half_open_calls`` llamadas de
+    prueba (un sondeo del monitor o una predicción real). Si la prueba sale
+    bien el circuito se cierra; si falla, se vuelve a abrir. Una prueba que
+    no llegó a salir (rechazada por el control de admisión) se devuelve con
+    ``release_trial`` para que el circuito no quede semiabierto sin pruebas.
+    """
+
+    def __init__(self, failure_threshold=None, reset_timeout=None, half_open_calls=1):
+        self.failure_threshold = failure_threshold or _env_int("ICFES_BREAKER_FAILURES", 5)
+        self.reset_timeout = reset_timeout or _env_float("ICFES_BREAKER_RESET", 30.0)
+        self.half_open_calls = half_open_calls
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = None
+        self._trials = 0
+        self.times_opened = 0
+        self.rejected = 0
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """Registra ``callback()`` para cuando el circuito se abre"""
+        self._listeners.append(callback)
+
+    def _refresh(self, now):
+        if self._state == OPEN and now - self._opened_at >= self.reset_timeout:
+            self._state = HALF_OPEN
+            self._trials = 0
+
+    def allow(self):
+        """True si la llamada puede ir al endpoint; cuenta como prueba si está semiabierto"""
+        with self._lock:
+            self._refresh(time.monotonic())
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and self._trials < self.half_open_calls:
+                self._trials += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def release_trial(self):
+        """Devuelve la prueba de una llamada admitida por ``allow`` que no llegó al endpoint"""
+        with self._lock:
+            if self._state == HALF_OPEN and self._trials > 0:
+                self._trials -= 1
+
+    def record_success(self):
+        with self._lock:
+            self._state = CLOSED
+            self._consecutive_failures = 0
+            self._trials = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._consecutive_failures += 1
+            opened = self._state == HALF_OPEN or (
+                self._state == CLOSED and self._consecutive_failures >= self.failure_threshold
+            )
+            if opened:
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self.times_opened += 1
+        if opened:
+            for callback in self._listeners:
+                callback()
+
+    def state(self):
+        with self._lock:
+            self._refresh(time.monotonic())
+            return self._state
+
+    def retry_in(self):
+        """Segundos hasta que el circuito admita una prueba (0 si ya la admite)"""
+        with self._lock:
+            if self._state != OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def stats(self):
+        state, retry_in = self.state(), self.retry_in()
+        with self._lock:
+            return {
+                "state": state,
+                "consecutive_failures": self._consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "reset_timeout_seconds": self.reset_timeout,
+                "times_opened": self.times_opened,
+                "rejected_calls": self.rejected,
+                "retry_in_seconds": retry_in,
+            }
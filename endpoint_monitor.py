@@ -0,0 +1,290 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from circuit_breaker import OPEN
+from prediction_client import _env_float, build_payload
+from shared_store import LEASE_MARGIN_SECONDS
+
+
+WARM = "warm"
+WARMING = "warming"
+COLD = "cold"
+UNKNOWN = "unknown"
+
+# Payload de calentamiento: los valores por defecto del formulario
+WARMUP_PAYLOAD = build_payload(65, 70, 68, 72, 75)
+
+# Cada cuánto se publica y se relee la salud en el almacén compartido entre réplicas
+SHARED_HEALTH_SECONDS = _env_float("ICFES_SHARED_HEALTH_SECONDS", 5.0)
+
+
+def _best_state(states):
+    states = set(states)
+    return next((state for state in (WARM, WARMING, COLD) if state in states), UNKNOWN)
+
+
+class ReplicaHealth:
+    """Salud de una réplica del endpoint vista por este proceso"""
+
+    def __init__(self, url, name):
+        self.url = url
+        self.name = name
+        self.last_success_at = None
+        self.last_probe_at = None
+        self.last_latency = None
+        self.last_error = None
+        self.probes = 0
+        self.cold_starts = 0
+        self.adopted = 0
+        self.published_at = 0.0
+        self.synced_at = 0.0
+
+    def state(self, now, idle_timeout, probing):
+        recent_success = self.last_success_at is not None and now - self.last_success_at <= idle_timeout
+        failed_since = self.last_probe_at is not None and (
+            self.last_success_at is None or self.last_probe_at > self.last_success_at
+        )
+        if recent_success and not failed_since:
+            return WARM
+        if probing:
+            return WARMING
+        if self.last_probe_at is None:
+            return UNKNOWN
+        return COLD
+
+
+class EndpointMonitor:
+    """Monitor de salud del endpoint, uno por proceso de servidor.
+
+    Un hilo daemon sondea cada réplica del endpoint cada ``interval``
+    segundos para que los servicios de Render no lleguen a dormirse, y
+    ``request_warmup`` adelanta un sondeo cuando se abre una sesión nueva.
+    Los sondeos van a la URL de cada réplica sin pasar por el balanceo del
+    ``EndpointPool``, que mandaría todos a la réplica más barata y dejaría
+    las demás frías. Una réplica se considera fría si no hubo respuesta
+    exitosa suya en los últimos ``idle_timeout`` segundos; el endpoint está
+    activo si alguna réplica lo está.
+
+    Con un ``breaker`` abierto el siguiente sondeo se adelanta al momento en
+    que el circuito admite pruebas, y su resultado lo cierra o lo reabre.
+
+    Con ``shared`` (ver ``shared_store``) las réplicas de la app publican sus
+    respuestas exitosas, por réplica del endpoint, y adoptan las de las
+    demás: una réplica recién arrancada ve el endpoint caliente sin
+    sondearlo, y entre réplicas que arrancan a la vez solo una envía el
+    sondeo de calentamiento a cada réplica del endpoint.
+    """
+
+    def __init__(self, client, interval=None, idle_timeout=None, slow_threshold=None, probe_timeout=None, breaker=None,
+                 shared=None):
+        self.client = client
+        self.breaker = breaker
+        self.shared = shared
+        endpoints = [(replica.url, replica.name) for replica in client.pool.replicas] if client.pool is not None else [
+            (client.endpoint, None)
+        ]
+        self.replicas = [ReplicaHealth(url, name) for url, name in endpoints]
+        self.interval = interval or _env_float("ICFES_PROBE_INTERVAL", 240.0)
+        self.idle_timeout = idle_timeout or _env_float("ICFES_IDLE_TIMEOUT", 600.0)
+        self.slow_threshold = slow_threshold or _env_float("ICFES_COLD_LATENCY", 5.0)
+        # El sondeo espera más que una predicción normal para completar el arranque en frío
+        self.probe_timeout = (client.timeout[0], probe_timeout or _env_float("ICFES_PROBE_TIMEOUT", 120.0))
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._rescheduled = False
+        self._probing = False
+
+        if breaker is not None:
+            breaker.add_listener(self._reschedule)
+
+        self._thread = threading.Thread(target=self._run, name="icfes-endpoint-monitor", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            self.probe()
+            self._wait_next_probe()
+
+    def _wait_next_probe(self):
+        """Espera al siguiente sondeo; si el circuito se abrió mientras tanto, recalcula la espera"""
+        while True:
+            self._rescheduled = False
+            self._wake.wait(self._next_probe_delay())
+            self._wake.clear()
+            if not self._rescheduled:
+                return
+
+    def _reschedule(self):
+        self._rescheduled = True
+        self._wake.set()
+
+    def _next_probe_delay(self):
+        if self.breaker is not None and self.breaker.state() == OPEN:
+            return min(self.interval, max(self.breaker.retry_in(), 0.5))
+        return self.interval
+
+    def request_warmup(self):
+        """Adelanta un sondeo salvo que el endpoint ya esté caliente o calentándose"""
+        if self.state() not in (WARM, WARMING):
+            self._wake.set()
+
+    def _shared_key(self, health):
+        return f"health:{health.url}"
+
+    def _health(self, replica):
+        """Salud de la réplica de nombre ``replica``; la primera si es None (sin pool o URL explícita)"""
+        for health in self.replicas:
+            if health.name == replica:
+                return health
+        return self.replicas[0]
+
+    def probe(self):
+        """Sondea todas las réplicas en paralelo y actualiza su estado.
+
+        Con almacén compartido y el circuito cerrado, el sondeo de cada
+        réplica es un get-or-compute: si otra réplica de la app la sondeó
+        hace menos de ``interval`` segundos (o lo está haciendo) se adopta
+        su resultado. El circuito registra un éxito si alguna réplica
+        respondió y un fallo si todas las sondeadas fallaron.
+        """
+        with self._lock:
+            if self._probing:
+                return
+            self._probing = True
+        try:
+            use_shared = self.shared is not None and (self.breaker is None or self.breaker.state() != OPEN)
+            with ThreadPoolExecutor(max_workers=len(self.replicas), thread_name_prefix="icfes-probe") as executor:
+                outcomes = list(executor.map(lambda health: self._probe_replica(health, use_shared), self.replicas))
+            probed = [ok for ok in outcomes if ok is not None]
+            if self.breaker is not None and probed:
+                if any(outcomes):
+                    self.breaker.record_success()
+                else:
+                    self.breaker.record_failure()
+        finally:
+            with self._lock:
+                self._probing = False
+
+    def _probe_replica(self, health, use_shared):
+        """True/False según el sondeo propio, o None si se adoptó el de otra réplica de la app"""
+        if not use_shared:
+            return self._probe_once(health) is not None
+        outcome = []
+
+        def compute():
+            snapshot = self._probe_once(health)
+            outcome.append(snapshot is not None)
+            return snapshot
+
+        # El lease cubre un arranque en frío completo: si venciera antes, otra réplica sondearía a la vez
+        lease_seconds = self.client.max_call_seconds(self.probe_timeout) + LEASE_MARGIN_SECONDS
+        snapshot, _ = self.shared.get_or_compute(
+            self._shared_key(health), compute, ttl=min(self.interval, self.idle_timeout),
+            lease_seconds=lease_seconds,
+        )
+        if not outcome:
+            self._adopt(health, snapshot)
+            return None
+        return outcome[0]
+
+    def _probe_once(self, health):
+        """Sondeo real a la URL de la réplica; devuelve la instantánea a compartir si fue exitoso"""
+        started = time.perf_counter()
+        try:
+            # URL explícita: no pasa por EndpointPool.acquire
+            response = self.client.predict(WARMUP_PAYLOAD, endpoint=health.url, timeout=self.probe_timeout, kind="probe")
+            ok = response.status_code == 200
+            error = None if ok else f"Error {response.status_code}"
+        except Exception as e:
+            ok, error = False, str(e)
+        latency = time.perf_counter() - started
+        self._record(health, latency, ok, error, publish=False)
+        with self._lock:
+            health.probes += 1
+            success_at = health.last_success_at
+        return self._snapshot(success_at, latency) if ok else None
+
+    def _snapshot(self, success_at, latency):
+        return {"last_success_at": success_at, "latency": latency, "owner": self.shared.owner if self.shared else None}
+
+    def _adopt(self, health, snapshot):
+        """Toma como propia la última respuesta exitosa de la réplica que vio otra réplica de la app"""
+        if not snapshot:
+            return
+        with self._lock:
+            if health.last_success_at is not None and health.last_success_at >= snapshot["last_success_at"]:
+                return
+            health.last_success_at = snapshot["last_success_at"]
+            health.last_probe_at = max(health.last_probe_at or 0.0, snapshot["last_success_at"])
+            health.last_latency = snapshot["latency"]
+            health.last_error = None
+            health.adopted += 1
+
+    def observe(self, latency, ok, error=None, replica=None):
+        """Registra el resultado de una predicción real servida por ``replica`` (nombre del pool)"""
+        self._record(self._health(replica), latency, ok, error, publish=True)
+
+    def _record(self, health, latency, ok, error, publish):
+        now = time.time()
+        with self._lock:
+            health.last_probe_at = now
+            health.last_latency = latency
+            health.last_error = error
+            if ok:
+                if latency >= self.slow_threshold:
+                    health.cold_starts += 1
+                health.last_success_at = now
+            publish = publish and ok and self.shared is not None and time.monotonic() - health.published_at >= SHARED_HEALTH_SECONDS
+            if publish:
+                health.published_at = time.monotonic()
+        if publish:
+            # Una predicción real también cuenta como sondeo para las demás réplicas de la app
+            self.shared.set(self._shared_key(health), self._snapshot(now, latency), min(self.interval, self.idle_timeout))
+
+    def _sync_shared(self):
+        """Relee la salud publicada por otras réplicas de la app, como mucho cada ``SHARED_HEALTH_SECONDS``"""
+        for health in self.replicas:
+            with self._lock:
+                if time.monotonic() - health.synced_at < SHARED_HEALTH_SECONDS:
+                    continue
+                health.synced_at = time.monotonic()
+            self._adopt(health, self.shared.get(self._shared_key(health)))
+
+    def replica_states(self):
+        """Estado de cada réplica del endpoint como ``{nombre o URL: estado}``"""
+        if self.shared is not None:
+            self._sync_shared()
+        now = time.time()
+        with self._lock:
+            return {health.name or health.url: health.state(now, self.idle_timeout, self._probing) for health in self.replicas}
+
+    def state(self):
+        """Estado del endpoint: el mejor entre sus réplicas, porque el pool envía el tráfico a las que responden"""
+        return _best_state(self.replica_states().values())
+
+    def stats(self):
+        states = self.replica_states()
+        now = time.time()
+        with self._lock:
+            return {
+                "state": _best_state(states.values()),
+                "probes": sum(health.probes for health in self.replicas),
+                "cold_starts": sum(health.cold_starts for health in self.replicas),
+                "adopted_from_other_replicas": sum(health.adopted for health in self.replicas),
+                "interval_seconds": self.interval,
+                "replicas": [
+                    {
+                        "replica": health.name or health.url,
+                        "state": states[health.name or health.url],
+                        "last_latency_seconds": health.last_latency,
+                        "seconds_since_success": now - health.last_success_at if health.last_success_at else None,
+                        "last_error": health.last_error,
+                        "probes": health.probes,
+                        "cold_starts": health.cold_starts,
+                        "adopted_from_other_replicas": health.adopted,
+                    }
+                    for health in self.replicas
+                ],
+            }
@@ -0,0 +1,163 @@
+import json
+import math
+import os
+import random
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from prediction_client import DEFAULT_ENDPOINT, _env_float, _env_int
+
+
+def replica_name(url):
+    """Nombre corto de una réplica: host[:puerto] de su URL"""
+    return urlsplit(url).netloc or url
+
+
+def load_endpoints():
+    """Réplicas del endpoint de predicción como lista de ``(url, nombre)``.
+
+    En orden de prioridad:
+
+    - ``ICFES_ENDPOINTS_FILE``: archivo JSON con una lista de URLs o de objetos
+      ``{"url": ..., "name": ...}``; también se acepta texto con una URL por línea.
+    - ``ICFES_API_URLS``: URLs separadas por comas.
+    - ``ICFES_API_URL`` (o el endpoint por defecto) como réplica única.
+    """
+    config_file = os.environ.get("ICFES_ENDPOINTS_FILE")
+    if config_file:
+        text = Path(config_file).read_text(encoding="utf-8")
+        try:
+            entries = json.loads(text)
+        except json.JSONDecodeError:
+            entries = [line.strip() for line in text.splitlines() if line.strip() and not line.lstrip().startswith("#")]
+    else:
+        entries = [url.strip() for url in os.environ.get("ICFES_API_URLS", "").split(",") if url.strip()]
+
+    endpoints = []
+    for entry in entries:
+        if isinstance(entry, dict):
+            endpoints.append((entry["url"], entry.get("name") or replica_name(entry["url"])))
+        else:
+            endpoints.append((entry, replica_name(entry)))
+    return endpoints or [(DEFAULT_ENDPOINT, replica_name(DEFAULT_ENDPOINT))]
+
+
+class Replica:
+    """Estado de una réplica: latencia EWMA, llamadas en curso y expulsión"""
+
+    def __init__(self, url, name):
+        self.url = url
+        self.name = name
+        self.ewma = None
+        self.updated_at = None
+        self.in_flight = 0
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.times_ejected = 0
+        self.last_failure_at = 0.0
+        self.requests = 0
+        self.failures = 0
+
+    def ejected(self, now):
+        return now < self.ejected_until
+
+
+class EndpointPool:
+    """Balanceo del lado del cliente entre réplicas del endpoint, uno por proceso.
+
+    Cada petición va a la réplica disponible con menor costo estimado:
+    latencia EWMA multiplicada por las llamadas en curso más una. Una
+    réplica sin mediciones cuesta 0, así que recibe tráfico de inmediato, y
+    la EWMA pierde peso con los segundos sin tráfico (``decay``) para que
+    una réplica que estuvo lenta vuelva a probarse.
+
+    Expulsión pasiva: tras ``eject_failures`` fallos consecutivos (red,
+    timeout, 5xx o respuesta no JSON) la réplica sale de la rotación por
+    ``eject_seconds`` multiplicado por las veces que ya fue expulsada, hasta
+    ``max_eject_seconds``. Tras ``eject_reset_seconds`` sirviendo sin fallos
+    desde que volvió a la rotación, la cuenta de expulsiones vuelve a cero.
+    Nunca se expulsa la última réplica disponible: ese caso lo resuelve el
+    circuit breaker.
+    """
+
+    def __init__(self, endpoints=None, alpha=None, decay=None, eject_failures=None, eject_seconds=None,
+                 max_eject_seconds=None, eject_reset_seconds=None):
+        self.replicas = [Replica(url, name) for url, name in (endpoints or load_endpoints())]
+        self.alpha = alpha or _env_float("ICFES_EWMA_ALPHA", 0.3)
+        self.decay = decay or _env_float("ICFES_EWMA_DECAY", 60.0)
+        self.eject_failures = eject_failures or _env_int("ICFES_EJECT_FAILURES", 3)
+        self.eject_seconds = eject_seconds or _env_float("ICFES_EJECT_SECONDS", 30.0)
+        self.max_eject_seconds = max_eject_seconds or _env_float("ICFES_MAX_EJECT_SECONDS", 300.0)
+        self.eject_reset_seconds = eject_reset_seconds or _env_float("ICFES_EJECT_RESET_SECONDS", 600.0)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.replicas)
+
+    @property
+    def urls(self):
+        return [replica.url for replica in self.replicas]
+
+    def _cost(self, replica, now):
+        if replica.ewma is None:
+            return 0.0
+        weight = math.exp(-(now - replica.updated_at) / self.decay)
+        return replica.ewma * weight * (replica.in_flight + 1)
+
+    def acquire(self):
+        """Elige la réplica para una petición y la marca como en curso"""
+        now = time.monotonic()
+        with self._lock:
+            available = [replica for replica in self.replicas if not replica.ejected(now)]
+            if not available:
+                # Todas expulsadas: se usa la que vuelve primero
+                available = [min(self.replicas, key=lambda replica: replica.ejected_until)]
+            # A igual costo gana la de menos llamadas en curso; los empates restantes se sortean
+            keys = [(self._cost(replica, now), replica.in_flight) for replica in available]
+            best = min(keys)
+            replica = random.choice([replica for replica, key in zip(available, keys) if key == best])
+            replica.in_flight += 1
+            replica.requests += 1
+            return replica
+
+    def release(self, replica, latency, healthy):
+        """Registra el desenlace de una petición a ``replica``"""
+        now = time.monotonic()
+        with self._lock:
+            replica.in_flight -= 1
+            if healthy:
+                replica.consecutive_failures = 0
+                replica.ewma = latency if replica.ewma is None else self.alpha * latency + (1 - self.alpha) * replica.ewma
+                replica.updated_at = now
+                if replica.times_ejected and now - max(replica.last_failure_at, replica.ejected_until) >= self.eject_reset_seconds:
+                    replica.times_ejected = 0
+                return
+            replica.failures += 1
+            replica.consecutive_failures += 1
+            replica.last_failure_at = now
+            others_available = any(
+                other is not replica and not other.ejected(now) for other in self.replicas
+            )
+            if replica.consecutive_failures >= self.eject_failures and others_available:
+                replica.times_ejected += 1
+                replica.ejected_until = now + min(self.eject_seconds * replica.times_ejected, self.max_eject_seconds)
+                replica.consecutive_failures = 0
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "replica": replica.name,
+                    "url": replica.url,
+                    "ewma_ms": round(replica.ewma * 1000, 1) if replica.ewma is not None else None,
+                    "in_flight": replica.in_flight,
+                    "requests": replica.requests,
+                    "failures": replica.failures,
+                    "ejected_for_s": round(replica.ejected_until - now, 1) if replica.ejected(now) else 0.0,
+                    "times_ejected": replica.times_ejected,
+                }
+                for replica in self.replicas
+            ]
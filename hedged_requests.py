@@ -0,0 +1,97 @@
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from prediction_client import _env_float, _env_int
+from session_memory import ERROR
+
+
+class HedgePolicy:
+    """Plazo adaptativo para duplicar una petición lenta.
+
+    El plazo es el cuantil ``quantile`` de las latencias recientes de
+    ``kind`` en ``PredictionMetrics``, acotado entre ``min_delay`` y
+    ``max_delay``. Con menos de ``min_samples`` latencias se usa ``default_delay``.
+    """
+
+    def __init__(self, metrics, kind="prediction", quantile=None, min_delay=None, max_delay=None,
+                 default_delay=None, min_samples=None):
+        self.metrics = metrics
+        self.kind = kind
+        self.quantile = quantile or _env_float("ICFES_HEDGE_QUANTILE", 0.95)
+        self.min_delay = min_delay or _env_float("ICFES_HEDGE_MIN_DELAY", 0.25)
+        self.max_delay = max_delay or _env_float("ICFES_HEDGE_MAX_DELAY", 10.0)
+        self.default_delay = default_delay or _env_float("ICFES_HEDGE_DEFAULT_DELAY", 3.0)
+        self.min_samples = min_samples or _env_int("ICFES_HEDGE_MIN_SAMPLES", 20)
+
+    def delay(self):
+        observed = self.metrics.latency_quantile(self.kind, self.quantile, self.min_samples) if self.metrics else None
+        if observed is None:
+            return self.default_delay
+        return min(max(observed, self.min_delay), self.max_delay)
+
+
+class Hedger:
+    """Envía un duplicado a un backend secundario si el primario no responde a tiempo.
+
+    ``secondary`` recibe el payload y devuelve un ``PredictionRecord`` (otra
+    URL o el modelo local). Gana la primera respuesta sin error; la llamada
+    perdedora termina en segundo plano y su resultado se descarta.
+    """
+
+    def __init__(self, policy, secondary, secondary_name, max_workers=None):
+        self.policy = policy
+        self.secondary = secondary
+        self.secondary_name = secondary_name
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or _env_int("ICFES_HEDGE_WORKERS", 32), thread_name_prefix="icfes-hedge"
+        )
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.hedged = 0
+        self.secondary_wins = 0
+        self.failovers = 0
+
+    def run(self, primary, payload):
+        """Ejecuta ``primary()`` y, si pasa el plazo, también ``secondary(payload)``"""
+        delay = self.policy.delay()
+        with self._lock:
+            self.calls += 1
+        first = self._executor.submit(primary)
+        done, _ = wait([first], timeout=delay)
+        if done:
+            return first.result()
+
+        with self._lock:
+            self.hedged += 1
+        second = self._executor.submit(self.secondary, payload)
+        pending, fallback = {first, second}, None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                record = future.result()
+                if record.status != ERROR:
+                    if future is second:
+                        with self._lock:
+                            self.secondary_wins += 1
+                    return record
+                # Se prefiere el error del primario, que es el que ve el usuario normalmente
+                if fallback is None or future is first:
+                    fallback = record
+        return fallback
+
+    def failover(self, payload):
+        """Con el circuito abierto se va directo al secundario"""
+        with self._lock:
+            self.failovers += 1
+        return self.secondary(payload)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "secondary": self.secondary_name,
+                "hedge_delay_seconds": self.policy.delay(),
+                "calls": self.calls,
+                "hedged": self.hedged,
+                "secondary_wins": self.secondary_wins,
+                "failovers": self.failovers,
+            }
@@ -0,0 +1,179 @@
+import functools
+import html
+import re
+from string import Template
+
+
+# Plantillas compiladas una sola vez al importar el módulo. Todo el HTML sale en
+# una sola línea: una línea en blanco cortaría el bloque HTML de st.markdown.
+_CARD = Template('<div class="apple-card"$style>$body</div>')
+_CARD_TITLE = Template('<div class="card-title" style="font-size: 1.5rem;">$title</div>')
+_CARD_SUBTITLE = Template('<div style="color: #86868b; font-size: 0.9375rem; margin-bottom: 1.5rem;">$text</div>')
+_BADGE = Template('<span class="ios-badge">$label</span>')
+_FEATURE_BAR = Template(
+    '<div class="apple-card" style="padding: 1.25rem; margin: 0.5rem 0;">'
+    '<div style="display: flex; justify-content: space-between; margin-bottom: 0.75rem;">'
+    '<span style="font-weight: 500; color: #f5f5f7;">$label</span>'
+    '<span style="color: $color; font-weight: 600;">$value</span>'
+    '</div>'
+    '<div class="ios-progress"><div class="ios-progress-fill" style="width: $width%;$fill"></div></div>'
+    '</div>'
+)
+_BADGE_CARD = Template(
+    '<div class="apple-card">'
+    '<div style="font-size: 1.25rem; font-weight: 600; color: #f5f5f7; margin-bottom: 1rem;">$title</div>'
+    '<div style="display: flex; flex-wrap: wrap; gap: 0.5rem;">$badges</div>'
+    '</div>'
+)
+_FEATURE_ITEM = Template(
+    '<div class="feature-item">'
+    '<span class="feature-icon">$icon</span>'
+    '<div class="feature-name">$name</div>'
+    '<div class="feature-desc">$description</div>'
+    '<div style="margin-top: 1rem;">$badges</div>'
+    '</div>'
+)
+_METRIC_CARD = Template(
+    '<div class="apple-card" style="background: linear-gradient(135deg, rgba(0, 113, 227, 0.15) 0%, '
+    'rgba(0, 113, 227, 0.05) 100%); border-color: rgba(0, 113, 227, 0.3);">'
+    '<div style="text-align: center; padding: 2rem 0;">'
+    '<div style="font-size: 4rem; font-weight: 700; color: #0071e3; margin-bottom: 1rem;">$value</div>'
+    '<div style="font-size: 1.25rem; color: #f5f5f7; font-weight: 500; margin-bottom: 0.5rem;">$label</div>'
+    '<div style="font-size: 0.875rem; color: #86868b;">$caption</div>'
+    '</div></div>'
+)
+_STATUS_CARD = Template(
+    '<div class="apple-card" style="$card_style">'
+    '<div style="text-align: center; padding: $padding;">'
+    '<div style="font-size: 3rem; margin-bottom: 1rem;$icon_style">$icon</div>'
+    '<div style="$title_style">$title</div>'
+    '$detail'
+    '</div></div>'
+)
+_STATUS_DETAIL = Template('<div style="color: #86868b; font-size: 0.875rem; margin-top: 0.5rem;">$text</div>')
+
+# Tonos de los cuadros de estado: (estilo del cuadro, estilo del título)
+STATUS_TONES = {
+    "neutral": ("background: rgba(255, 255, 255, 0.02);", "color: #86868b; font-size: 1rem;"),
+    "warning": (
+        "background: rgba(255, 204, 0, 0.1); border-color: rgba(255, 204, 0, 0.3);",
+        "color: #ffcc00; font-size: 1.125rem; font-weight: 500;",
+    ),
+    "error": (
+        "background: rgba(255, 59, 48, 0.1); border-color: rgba(255, 59, 48, 0.3);",
+        "color: #ff3b30; font-size: 1.125rem; font-weight: 500;",
+    ),
+}
+
+_CSS_COMMENTS = re.compile(r"/\*.*?\*/", re.S)
+_CSS_SPACES = re.compile(r"\s+")
+_CSS_PUNCTUATION = re.compile(r"\s*([{};,>])\s*")
+
+
+def _text(value):
+    # Sin saltos de línea: una línea en blanco cortaría el bloque HTML
+    return html.escape(" ".join(str(value).split()), quote=False)
+
+
+@functools.lru_cache(maxsize=None)
+def style_block(css):
+    """Minifica una hoja de estilos una vez y la devuelve envuelta en ``<style>``"""
+    css = _CSS_COMMENTS.sub("", css)
+    css = _CSS_SPACES.sub(" ", css)
+    css = _CSS_PUNCTUATION.sub(r"\1", css).replace(": ", ":")
+    return f"<style>{css.strip()}</style>"
+
+
+@functools.lru_cache(maxsize=256)
+def apple_card(title, subtitle=None, body="", style=None):
+    """Cuadro ``apple-card`` con título, subtítulo opcional y cuerpo HTML ya renderizado"""
+    content = _CARD_TITLE.substitute(title=_text(title))
+    if subtitle:
+        content += _CARD_SUBTITLE.substitute(text=_text(subtitle))
+    return _CARD.substitute(style=f' style="{style}"' if style else "", body=content + body)
+
+
+@functools.lru_cache(maxsize=256)
+def badge_row(labels):
+    """Fila de ``ios-badge``; ``labels`` es una tupla para poder memoizar"""
+    return "".join(_BADGE.substitute(label=_text(label)) for label in labels)
+
+
+@functools.lru_cache(maxsize=256)
+def badge_card(title, labels):
+    return _BADGE_CARD.substitute(title=_text(title), badges=badge_row(tuple(labels)))
+
+
+@functools.lru_cache(maxsize=1024)
+def feature_bar(label, value, display=None, negative=False):
+    """Barra ``ios-progress`` con etiqueta; ``value`` es el ancho en porcentaje (0-100).
+
+    ``display`` reemplaza el texto ``value%`` y ``negative`` pinta la barra en rojo.
+    """
+    width = min(max(float(value), 0.0), 100.0)
+    return _FEATURE_BAR.substitute(
+        label=_text(label),
+        value=_text(display) if display is not None else f"{value:g}%",
+        color="#ff3b30" if negative else "#0071e3",
+        width=f"{width:.4g}",
+        fill=" background: #ff3b30;" if negative else "",
+    )
+
+
+@functools.lru_cache(maxsize=64)
+def feature_item(icon, name, description, labels):
+    return _FEATURE_ITEM.substitute(
+        icon=icon, name=_text(name), description=_text(description), badges=badge_row(tuple(labels))
+    )
+
+
+@functools.lru_cache(maxsize=1024)
+def metric_card(value, label, caption):
+    """Cuadro destacado con un valor grande, como el puntaje predicho"""
+    return _METRIC_CARD.substitute(value=_text(value), label=_text(label), caption=_text(caption))
+
+
+@functools.lru_cache(maxsize=256)
+def status_card(icon, title, detail=None, tone="neutral", faded=False):
+    """Cuadro de estado centrado (inicial, en curso, advertencia o error)"""
+    card_style, title_style = STATUS_TONES[tone]
+    neutral = tone == "neutral"
+    return _STATUS_CARD.substitute(
+        card_style=card_style,
+        padding="3rem 1rem" if neutral else "2rem",
+        icon_style=" opacity: 0.3;" if faded else "",
+        icon=icon,
+        # El título neutral admite <br>, por eso no se escapa
+        title=title if neutral else _text(title),
+        title_style=title_style,
+        detail=_STATUS_DETAIL.substitute(text=_text(detail)) if detail else "",
+    )
+
+
+def stack(*parts):
+    """Une varios componentes en un solo bloque con la misma separación que los elementos de Streamlit"""
+    return '<div class="component-stack">' + "".join(parts) + "</div>"
+
+
+@functools.lru_cache(maxsize=64)
+def feature_importance_section(title, features, subtitle=None):
+    """Título y barras como un único bloque HTML; ``features`` son tuplas de argumentos de ``feature_bar``.
+
+    La caché es acotada: además de la sección fija se llama con los aportes
+    de cada entrada y de cada archivo, que no se repiten.
+    """
+    return stack(apple_card(title, subtitle), *(feature_bar(*feature) for feature in features))
+
+
+@functools.lru_cache(maxsize=None)
+def badge_card_section(categories):
+    """Una tarjeta de badges por categoría; ``categories`` es una tupla de ``(título, etiquetas)``"""
+    return stack(*(badge_card(title, tuple(labels)) for title, labels in categories))
+
+
+@functools.lru_cache(maxsize=None)
+def feature_grid(items):
+    """Grilla ``feature-grid``; ``items`` es una tupla de ``(icono, nombre, descripción, etiquetas)``"""
+    return '<div class="feature-grid">' + "".join(
+        feature_item(icon, name, description, tuple(labels)) for icon, name, description, labels in items
+    ) + "</div>"
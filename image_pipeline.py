@@ -0,0 +1,90 @@
+import io
+from pathlib import Path
+
+
+# Anchos de las variantes responsive; el navegador elige según el layout con srcset
+VARIANT_WIDTHS = (480, 960, 1600)
+
+# Las variantes se escriben en static/ para que Streamlit las sirva en app/static/
+STATIC_DIR = Path(__file__).parent / "static"
+VARIANTS_SUBDIR = "img"
+
+
+def resolve_image_path(image_path):
+    """Busca la imagen en las rutas candidatas; devuelve un ``Path`` o None"""
+    possible_paths = [
+        Path(image_path),
+        Path(__file__).parent / image_path,
+        Path.cwd() / image_path,
+    ]
+    for path in possible_paths:
+        try:
+            if path.exists():
+                return path.resolve()
+        except OSError:
+            continue
+    return None
+
+
+def _encode(image, fmt):
+    buffer = io.BytesIO()
+    if fmt == "webp":
+        image.save(buffer, format="WEBP", quality=82, method=6)
+    else:
+        image.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+
+def build_variants(path, widths=VARIANT_WIDTHS, static_dir=STATIC_DIR):
+    """Genera una vez las variantes redimensionadas de ``path``.
+
+    Cada variante se codifica en WebP (o PNG optimizado si Pillow no soporta
+    WebP) y se escribe en ``static/img``. Devuelve una lista de dicts con
+    ``width``, ``url`` (ruta servida por Streamlit) y ``data`` (bytes).
+    """
+    # Pillow se importa solo cuando hay que generar variantes (una vez por proceso)
+    from PIL import Image, features
+
+    path = Path(path)
+    fmt = "webp" if features.check("webp") else "png"
+    out_dir = Path(static_dir) / VARIANTS_SUBDIR
+    try:
+        out_dir.mkdir(parents=True, exist_ok=True)
+        writable = True
+    except OSError:
+        writable = False
+
+    variants = []
+    with Image.open(path) as original:
+        original.load()
+        for width in sorted(set(min(width, original.width) for width in widths)):
+            height = round(original.height * width / original.width)
+            resized = original if width == original.width else original.resize((width, height), Image.LANCZOS)
+            data = _encode(resized, fmt)
+            name = f"{path.stem}-{width}.{fmt}"
+            if writable:
+                try:
+                    (out_dir / name).write_bytes(data)
+                except OSError:
+                    writable = False
+            variants.append({
+                "width": width,
+                "height": height,
+                "url": f"app/static/{VARIANTS_SUBDIR}/{name}" if writable else None,
+                "data": data,
+                "mime": f"image/{fmt}",
+            })
+    return variants
+
+
+def responsive_img_html(variants, alt="", sizes="100vw"):
+    """``<img>`` con srcset y carga diferida: el navegador baja solo la variante
+    que le sirve y únicamente cuando la sección entra en pantalla"""
+    largest = variants[-1]
+    srcset = ", ".join(f"{variant['url']} {variant['width']}w" for variant in variants)
+    return (
+        f'<img src="{largest["url"]}" srcset="{srcset}" sizes="{sizes}" '
+        f'width="{largest["width"]}" height="{largest["height"]}" '
+        f'loading="lazy" decoding="async" alt="{alt}" '
+        f'style="width: 100%; height: auto; border-radius: 18px;">'
+    )
@@ -0,0 +1,97 @@
+import threading
+import time
+
+from prediction_client import _env_float
+
+
+# Segundos sin cambios en las entradas antes de enviar la predicción en vivo
+LIVE_DEBOUNCE_SECONDS = _env_float("ICFES_LIVE_DEBOUNCE", 0.6)
+
+
+class LiveDebouncer:
+    """Estado del modo en vivo de una sesión: la última entrada vista y la que espera envío.
+
+    Cada cambio reinicia la espera; solo la entrada que se mantiene
+    ``delay`` segundos sin cambios llega a enviarse. Vive en
+    ``st.session_state``, así que no guarda locks ni referencias compartidas.
+    """
+
+    def __init__(self, delay=None):
+        self.delay = delay or LIVE_DEBOUNCE_SECONDS
+        self.key = None
+        self.pending = None
+        self.changed_at = None
+
+    def observe(self, key, payload):
+        """Registra la entrada actual; devuelve True si cambió respecto a la anterior"""
+        if key == self.key:
+            return False
+        self.key = key
+        self.pending = payload
+        self.changed_at = time.monotonic()
+        return True
+
+    def due(self):
+        return self.pending is not None and time.monotonic() - self.changed_at >= self.delay
+
+    def postpone(self, seconds):
+        """Retrasa el envío de la entrada en espera al menos ``seconds`` (p. ej. sin cuota)"""
+        self.changed_at = time.monotonic() - self.delay + seconds
+
+    def take(self):
+        """Saca la entrada en espera para enviarla (o resolverla sin red)"""
+        payload, self.pending = self.pending, None
+        return payload
+
+    def reset(self):
+        self.key = None
+        self.pending = None
+
+
+class LiveStats:
+    """Contadores del modo en vivo de todo el proceso.
+
+    ``requests_saved`` compara los cambios de entrada con las peticiones
+    que realmente salieron: lo que ahorran el debounce, la caché y el
+    modelo local.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.changes = 0
+        self.debounced = 0
+        self.cancelled_in_flight = 0
+        self.requests_sent = 0
+        self.cache_hits = 0
+        self.local = 0
+
+    def record_change(self, debounced, cancelled):
+        with self._lock:
+            self.changes += 1
+            self.debounced += int(debounced)
+            self.cancelled_in_flight += int(cancelled)
+
+    def record_resolution(self, source):
+        """``source``: "remote" si salió una petición, "cache" o "local" si no"""
+        with self._lock:
+            if source == "remote":
+                self.requests_sent += 1
+            elif source == "cache":
+                self.cache_hits += 1
+            else:
+                self.local += 1
+
+    def stats(self):
+        with self._lock:
+            saved = self.changes - self.requests_sent
+            return {
+                "input_changes": self.changes,
+                "requests_sent": self.requests_sent,
+                "requests_saved": saved,
+                "saved_ratio": saved / self.changes if self.changes else None,
+                "debounced_changes": self.debounced,
+                "cancelled_in_flight": self.cancelled_in_flight,
+                "cache_hits": self.cache_hits,
+                "local_predictions": self.local,
+                "debounce_seconds": LIVE_DEBOUNCE_SECONDS,
+            }
@@ -0,0 +1,211 @@
+import os
+from pathlib import Path
+
+import numpy as np
+
+from prediction_client import FEATURE_COLUMNS, extract_prediction
+
+
+DEFAULT_MODEL_PATH = os.environ.get(
+    "ICFES_LOCAL_MODEL_PATH", str(Path(__file__).parent / "model" / "gradient_boosting.npz")
+)
+
+# Filas evaluadas a la vez; acota la memoria de las matrices (filas x árboles)
+ROW_BLOCK = 8192
+
+
+class TreeEnsemble:
+    """Ensamble de árboles de regresión guardado en arreglos planos de NumPy.
+
+    Cada arreglo tiene forma ``(n_trees, max_nodes)``: ``feature`` y
+    ``threshold`` del split, ``left``/``right`` con el índice del hijo y
+    ``value`` con el valor de la hoja. Los nodos hoja tienen ``feature < 0``.
+    La predicción es ``init + learning_rate * suma(valores de hoja)``, igual
+    que ``GradientBoostingRegressor``.
+    """
+
+    def __init__(self, feature, threshold, left, right, value, init, learning_rate, feature_names=FEATURE_COLUMNS):
+        self.feature = np.asarray(feature, dtype=np.int32)
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.left = np.asarray(left, dtype=np.int32)
+        self.right = np.asarray(right, dtype=np.int32)
+        self.value = np.asarray(value, dtype=np.float64)
+        self.init = float(init)
+        self.learning_rate = float(learning_rate)
+        self.feature_names = list(feature_names)
+        self.n_trees, self.max_nodes = self.feature.shape
+        self._tree_index = np.arange(self.n_trees)
+        # Vistas planas: el nodo ``j`` del árbol ``t`` está en ``t * max_nodes + j``
+        self._offsets = (self._tree_index * self.max_nodes).astype(np.int32)
+        self._flat_feature = self.feature.ravel()
+        self._flat_threshold = self.threshold.ravel()
+        self._flat_left = self.left.ravel()
+        self._flat_right = self.right.ravel()
+        self._flat_value = self.value.ravel()
+        self.max_depth = self._compute_depth()
+
+    def _compute_depth(self):
+        depth = np.zeros_like(self.feature)
+        for tree in range(self.n_trees):
+            for node in range(self.max_nodes):
+                if self.feature[tree, node] >= 0:
+                    depth[tree, self.left[tree, node]] = depth[tree, node] + 1
+                    depth[tree, self.right[tree, node]] = depth[tree, node] + 1
+        return int(depth.max())
+
+    @classmethod
+    def load(cls, path=DEFAULT_MODEL_PATH):
+        """Carga un ensamble exportado con ``export_gradient_boosting``"""
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                feature=data["feature"],
+                threshold=data["threshold"],
+                left=data["left"],
+                right=data["right"],
+                value=data["value"],
+                init=data["init"],
+                learning_rate=data["learning_rate"],
+                feature_names=[str(name) for name in data["feature_names"]],
+            )
+
+    def save(self, path):
+        np.savez_compressed(
+            path,
+            feature=self.feature,
+            threshold=self.threshold,
+            left=self.left,
+            right=self.right,
+            value=self.value,
+            init=np.float64(self.init),
+            learning_rate=np.float64(self.learning_rate),
+            feature_names=np.array(self.feature_names),
+        )
+
+    def leaf_indices(self, X):
+        """Índice de la hoja alcanzada por cada fila en cada árbol, forma ``(n, n_trees)``"""
+        # Los árboles de scikit-learn comparan en float32
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        node = np.zeros((X.shape[0], self.n_trees), dtype=np.int32)
+        for _ in range(self.max_depth):
+            flat = node + self._offsets
+            feature = self._flat_feature[flat]
+            is_leaf = feature < 0
+            x_value = np.take_along_axis(X, np.maximum(feature, 0), axis=1)
+            go_left = x_value <= self._flat_threshold[flat]
+            child = np.where(go_left, self._flat_left[flat], self._flat_right[flat])
+            node = np.where(is_leaf, node, child)
+        return node
+
+    def predict(self, X):
+        """Predice un arreglo ``(n, 5)`` en bloques de ``ROW_BLOCK`` filas"""
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        out = np.empty(X.shape[0], dtype=np.float64)
+        for start in range(0, X.shape[0], ROW_BLOCK):
+            block = X[start:start + ROW_BLOCK]
+            leaves = self.leaf_indices(block)
+            out[start:start + ROW_BLOCK] = self.init + self.learning_rate * self._flat_value[leaves + self._offsets].sum(axis=1)
+        return out
+
+    @property
+    def expected_value(self):
+        """Valor base de las contribuciones: predicción antes de cualquier split"""
+        return self.init + self.learning_rate * float(self.value[:, 0].sum())
+
+    def _block_contributions(self, X):
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        n_rows, n_features = X.shape[0], len(self.feature_names)
+        out = np.zeros(n_rows * n_features, dtype=np.float64)
+        row_base = (np.arange(n_rows, dtype=np.int64) * n_features)[:, None]
+        node = np.zeros((n_rows, self.n_trees), dtype=np.int32)
+        for _ in range(self.max_depth):
+            flat = node + self._offsets
+            feature = self._flat_feature[flat]
+            is_leaf = feature < 0
+            safe_feature = np.maximum(feature, 0)
+            x_value = np.take_along_axis(X, safe_feature, axis=1)
+            go_left = x_value <= self._flat_threshold[flat]
+            child = np.where(is_leaf, node, np.where(go_left, self._flat_left[flat], self._flat_right[flat]))
+            # En una hoja child == node y el aporte es cero
+            delta = self._flat_value[child + self._offsets] - self._flat_value[flat]
+            out += np.bincount((row_base + safe_feature).ravel(), weights=delta.ravel(), minlength=out.size)
+            node = child
+        return out.reshape(n_rows, n_features) * self.learning_rate
+
+    def contributions(self, X):
+        """Aporte de cada feature a la predicción de cada fila, forma ``(n, n_features)``.
+
+        Atribución por camino (Saabas): en cada split el cambio del valor del
+        nodo se asigna a la feature que lo decidió. Es aditiva:
+        ``expected_value + contributions(X).sum(axis=1) == predict(X)``.
+        """
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        out = np.empty((X.shape[0], len(self.feature_names)), dtype=np.float64)
+        for start in range(0, X.shape[0], ROW_BLOCK):
+            out[start:start + ROW_BLOCK] = self._block_contributions(X[start:start + ROW_BLOCK])
+        return out
+
+    def predict_payload(self, payload):
+        """Predice un payload con el mismo formato que el endpoint"""
+        row = [[float(payload[column]) for column in self.feature_names]]
+        return float(self.predict(row)[0])
+
+
+def export_gradient_boosting(model, path, feature_names=FEATURE_COLUMNS):
+    """Exporta un ``GradientBoostingRegressor`` entrenado al formato ``.npz``"""
+    trees = [estimator.tree_ for estimator in model.estimators_[:, 0]]
+    max_nodes = max(tree.node_count for tree in trees)
+    shape = (len(trees), max_nodes)
+    feature = np.full(shape, -2, dtype=np.int32)
+    threshold = np.zeros(shape, dtype=np.float64)
+    left = np.full(shape, -1, dtype=np.int32)
+    right = np.full(shape, -1, dtype=np.int32)
+    value = np.zeros(shape, dtype=np.float64)
+    for i, tree in enumerate(trees):
+        n = tree.node_count
+        feature[i, :n] = tree.feature
+        threshold[i, :n] = tree.threshold
+        left[i, :n] = tree.children_left
+        right[i, :n] = tree.children_right
+        value[i, :n] = tree.value[:, 0, 0]
+    ensemble = TreeEnsemble(
+        feature, threshold, left, right, value,
+        init=float(np.ravel(model.init_.constant_)[0]),
+        learning_rate=model.learning_rate,
+        feature_names=feature_names,
+    )
+    ensemble.save(path)
+    return ensemble
+
+
+def load_local_model(path=DEFAULT_MODEL_PATH):
+    """Carga el modelo local si el archivo existe; devuelve None en caso contrario"""
+    if not Path(path).exists():
+        return None
+    return TreeEnsemble.load(path)
+
+
+def parity_check(ensemble, client, n_samples=50, seed=0):
+    """Compara el modelo local contra la API remota sobre payloads aleatorios"""
+    rng = np.random.default_rng(seed)
+    X = rng.integers(0, 101, size=(n_samples, len(ensemble.feature_names))).astype(np.float64)
+    local = ensemble.predict(X)
+    diffs, failures = [], 0
+    for row, local_value in zip(X, local):
+        payload = dict(zip(ensemble.feature_names, row.tolist()))
+        try:
+            response = client.predict(payload, kind="parity")
+            remote_value = extract_prediction(response.json()) if response.status_code == 200 else None
+        except Exception:
+            remote_value = None
+        if remote_value is None:
+            failures += 1
+            continue
+        diffs.append(abs(float(remote_value) - local_value))
+    diffs = np.asarray(diffs)
+    return {
+        "samples": n_samples,
+        "compared": int(diffs.size),
+        "failures": failures,
+        "max_abs_diff": float(diffs.max()) if diffs.size else None,
+        "mean_abs_diff": float(diffs.mean()) if diffs.size else None,
+    }
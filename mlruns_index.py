@@ -0,0 +1,238 @@
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from prediction_client import _env_float
+
+
+DEFAULT_MLRUNS_DIR = os.environ.get("ICFES_MLRUNS_DIR", "mlruns")
+
+# Por defecto el índice vive junto a mlruns/ y no dentro, para no confundir a MLflow
+DEFAULT_INDEX_PATH = os.environ.get("ICFES_MLRUNS_INDEX_PATH") or None
+
+# Nombres con los que los experimentos suelen registrar cada métrica, en orden de preferencia
+METRIC_ALIASES = {
+    "r2": ("r2", "r2_score", "test_r2", "val_r2", "R2"),
+    "rmse": ("rmse", "test_rmse", "val_rmse", "RMSE"),
+    "fit_time": ("fit_time", "training_time", "train_time", "fit_time_s"),
+}
+MODEL_NAME_PARAMS = ("model", "model_name", "model_type")
+
+COLUMNS = ["Modelo", "R² Score", "RMSE", "Tiempo (s)", "Runs"]
+
+
+def _read_meta(path):
+    """Lee el meta.yaml plano de MLflow sin depender de PyYAML"""
+    meta = {}
+    try:
+        with open(path, encoding="utf-8") as handle:
+            for line in handle:
+                if line[:1].isspace() or ":" not in line:
+                    continue
+                key, _, value = line.partition(":")
+                meta[key.strip()] = value.strip().strip("'\"")
+    except OSError:
+        pass
+    return meta
+
+
+def _read_text(path):
+    try:
+        return Path(path).read_text(encoding="utf-8").strip() or None
+    except OSError:
+        return None
+
+
+def _last_metric_value(path):
+    """Último valor de un archivo de métrica (líneas ``timestamp valor paso``)"""
+    try:
+        with open(path, "rb") as handle:
+            handle.seek(0, os.SEEK_END)
+            size = handle.tell()
+            handle.seek(max(size - 512, 0))
+            lines = handle.read().splitlines()
+    except OSError:
+        return None
+    for line in reversed(lines):
+        parts = line.split()
+        if len(parts) >= 2:
+            try:
+                return float(parts[1])
+            except ValueError:
+                return None
+    return None
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return 0
+
+
+def _int_or_none(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class MlrunsIndex:
+    """Índice persistente de las métricas de un file store local de MLflow.
+
+    Cada run se guarda en SQLite con una firma (el mtime más reciente de sus
+    archivos relevantes). ``refresh`` solo hace ``stat`` de los runs y vuelve
+    a leer los que cambiaron; ``generation`` aumenta cuando el índice cambia,
+    así la tabla estilizada se puede cachear hasta entonces.
+    """
+
+    def __init__(self, mlruns_dir=DEFAULT_MLRUNS_DIR, index_path=DEFAULT_INDEX_PATH, min_interval=None):
+        self.mlruns_dir = Path(mlruns_dir)
+        self.index_path = index_path or str(self.mlruns_dir.resolve().parent / ".mlruns_index.sqlite")
+        self.min_interval = min_interval if min_interval is not None else _env_float("ICFES_MLRUNS_REFRESH", 60.0)
+        self._lock = threading.Lock()
+        self._last_refresh = 0.0
+        self.last_changed = 0
+        self.last_scan_seconds = None
+
+        self._db = sqlite3.connect(self.index_path, check_same_thread=False)
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id TEXT PRIMARY KEY,
+                experiment_id TEXT NOT NULL,
+                signature INTEGER NOT NULL,
+                model TEXT NOT NULL,
+                r2 REAL,
+                rmse REAL,
+                fit_time REAL,
+                start_time INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS index_state (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+            INSERT OR IGNORE INTO index_state (key, value) VALUES ('generation', 0);
+            """
+        )
+        self._db.commit()
+
+    @property
+    def generation(self):
+        with self._lock:
+            return self._db.execute("SELECT value FROM index_state WHERE key = 'generation'").fetchone()[0]
+
+    def _run_dirs(self):
+        """Recorre experimentos y runs activos; devuelve ``(experiment_id, run_dir)``"""
+        if not self.mlruns_dir.is_dir():
+            return
+        for experiment in os.scandir(self.mlruns_dir):
+            if not experiment.is_dir() or experiment.name.startswith("."):
+                continue
+            if _read_meta(os.path.join(experiment.path, "meta.yaml")).get("lifecycle_stage") == "deleted":
+                continue
+            for run in os.scandir(experiment.path):
+                if run.is_dir() and os.path.exists(os.path.join(run.path, "meta.yaml")):
+                    yield experiment.name, run
+
+    @staticmethod
+    def _signature(run_path):
+        """mtime más reciente entre meta.yaml, los directorios y los archivos de métricas"""
+        metrics_dir = os.path.join(run_path, "metrics")
+        latest = max(
+            _mtime(os.path.join(run_path, "meta.yaml")),
+            _mtime(metrics_dir),
+            _mtime(os.path.join(run_path, "tags")),
+            _mtime(os.path.join(run_path, "params")),
+        )
+        try:
+            for entry in os.scandir(metrics_dir):
+                latest = max(latest, entry.stat().st_mtime_ns)
+        except OSError:
+            pass
+        return latest
+
+    @staticmethod
+    def _read_run(run_path, run_id):
+        """Lee un run: nombre del modelo, métricas y tiempo de ajuste"""
+        meta = _read_meta(os.path.join(run_path, "meta.yaml"))
+        if meta.get("lifecycle_stage") == "deleted":
+            return None
+
+        metrics = {}
+        for name, aliases in METRIC_ALIASES.items():
+            for alias in aliases:
+                value = _last_metric_value(os.path.join(run_path, "metrics", alias))
+                if value is not None:
+                    metrics[name] = value
+                    break
+
+        start_time, end_time = _int_or_none(meta.get("start_time")), _int_or_none(meta.get("end_time"))
+        if "fit_time" not in metrics and start_time and end_time:
+            # Sin métrica de tiempo se usa la duración del run
+            metrics["fit_time"] = (end_time - start_time) / 1000
+
+        model = next(
+            (value for value in (_read_text(os.path.join(run_path, "params", name)) for name in MODEL_NAME_PARAMS) if value),
+            None,
+        ) or _read_text(os.path.join(run_path, "tags", "mlflow.runName")) or meta.get("run_name") or run_id[:8]
+
+        return model, metrics.get("r2"), metrics.get("rmse"), metrics.get("fit_time"), start_time
+
+    def refresh(self, force=False):
+        """Re-escanea mlruns/ si pasó ``min_interval``; devuelve cuántos runs cambiaron"""
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._last_refresh and now - self._last_refresh < self.min_interval:
+                return 0
+            self._last_refresh = now
+            started = time.perf_counter()
+
+            known = dict(self._db.execute("SELECT run_id, signature FROM runs"))
+            seen, upserts = set(), []
+            for experiment_id, run in self._run_dirs():
+                seen.add(run.name)
+                signature = self._signature(run.path)
+                if known.get(run.name) == signature:
+                    continue
+                row = self._read_run(run.path, run.name)
+                if row is not None:
+                    upserts.append((run.name, experiment_id, signature) + row)
+                else:
+                    seen.discard(run.name)
+            removed = [(run_id,) for run_id in known if run_id not in seen]
+
+            if upserts or removed:
+                self._db.executemany("INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?)", upserts)
+                self._db.executemany("DELETE FROM runs WHERE run_id = ?", removed)
+                self._db.execute("UPDATE index_state SET value = value + 1 WHERE key = 'generation'")
+                self._db.commit()
+
+            self.last_changed = len(upserts) + len(removed)
+            self.last_scan_seconds = time.perf_counter() - started
+            return self.last_changed
+
+    def frame(self):
+        """Mejor run (mayor R²) por modelo, con las columnas de la tabla de comparación"""
+        with self._lock:
+            runs = pd.read_sql_query("SELECT model, r2, rmse, fit_time FROM runs", self._db)
+        if runs.empty:
+            return pd.DataFrame(columns=COLUMNS)
+        counts = runs.groupby("model").size()
+        best = runs.sort_values("r2", ascending=False, na_position="last").drop_duplicates("model")
+        best = best.assign(runs=best["model"].map(counts)).sort_values("r2", ascending=False, na_position="last")
+        best.columns = COLUMNS
+        return best.reset_index(drop=True)
+
+    def stats(self):
+        with self._lock:
+            runs = self._db.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+        return {
+            "mlruns_dir": str(self.mlruns_dir),
+            "index_path": self.index_path,
+            "runs": runs,
+            "generation": self.generation,
+            "last_changed": self.last_changed,
+            "last_scan_seconds": self.last_scan_seconds,
+        }
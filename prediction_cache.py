@@ -0,0 +1,157 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from prediction_client import FEATURE_COLUMNS, MODEL_VERSION, _env_float, _env_int
+
+
+# Cada cuántas escrituras se poda la capa en disco
+DISK_PRUNE_EVERY = 1000
+
+
+def make_key(payload, model_version=MODEL_VERSION):
+    """Llave normalizada: versión del modelo + las cinco features en orden fijo"""
+    values = ",".join(f"{round(float(payload[column]), 4):g}" for column in FEATURE_COLUMNS)
+    return f"{model_version}|{values}"
+
+
+class PredictionCache:
+    """Caché LRU con TTL compartida por todas las sesiones del proceso.
+
+    Si se indica ``disk_path`` se mantiene además una capa SQLite para que la
+    caché caliente sobreviva a un reinicio del contenedor; cada
+    ``DISK_PRUNE_EVERY`` escrituras se borran las filas vencidas y, pasadas
+    ``disk_maxsize`` filas, las que vencen antes. Con ``shared``
+    (ver ``shared_store``) los resultados se publican para las demás réplicas
+    de la app y una réplica recién arrancada los lee de ahí.
+    """
+
+    def __init__(self, maxsize=None, ttl=None, disk_path=None, model_version=MODEL_VERSION, shared=None,
+                 disk_maxsize=None):
+        self.maxsize = maxsize or _env_int("ICFES_CACHE_MAXSIZE", 10000)
+        self.disk_maxsize = disk_maxsize or _env_int("ICFES_CACHE_DISK_MAXSIZE", 10 * self.maxsize)
+        self.ttl = ttl if ttl is not None else _env_float("ICFES_CACHE_TTL", 3600.0)
+        self.model_version = model_version
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.disk_hits = 0
+        self.shared_hits = 0
+        self.shared = shared
+        self._disk_writes = 0
+
+        self.disk_path = disk_path if disk_path is not None else os.environ.get("ICFES_CACHE_PATH") or None
+        self._db = None
+        if self.disk_path:
+            self._db = sqlite3.connect(self.disk_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS predictions (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)"
+            )
+            self._prune_disk()
+
+    def get(self, payload):
+        """Devuelve el resultado guardado para ``payload`` o None"""
+        key = make_key(payload, self.model_version)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires FROM predictions WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and row[1] > now:
+                    value = json.loads(row[0])
+                    self._store(key, value, row[1])
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return value
+
+        # Fuera del lock: la consulta al almacén compartido puede ir por red
+        if self.shared is not None:
+            value = self.shared.get(key)
+            if value is not None:
+                with self._lock:
+                    self._store(key, value, now + self.ttl)
+                    self.hits += 1
+                    self.shared_hits += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, payload, value, share=True):
+        """Guarda el resultado de la API para ``payload`` (y lo publica si hay almacén compartido)"""
+        key = make_key(payload, self.model_version)
+        expires = time.time() + self.ttl
+        with self._lock:
+            self._store(key, value, expires)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO predictions (key, value, expires) VALUES (?, ?, ?)",
+                    (key, json.dumps(value), expires),
+                )
+                self._db.commit()
+                self._disk_writes += 1
+                if self._disk_writes % DISK_PRUNE_EVERY == 0:
+                    self._prune_disk()
+        if share and self.shared is not None:
+            self.shared.set(key, value, self.ttl)
+
+    def _prune_disk(self):
+        """Borra las filas vencidas y, si sobran, las que vencen antes (con el lock tomado)"""
+        self._db.execute("DELETE FROM predictions WHERE expires <= ?", (time.time(),))
+        self._db.execute(
+            "DELETE FROM predictions WHERE key IN "
+            "(SELECT key FROM predictions ORDER BY expires DESC LIMIT -1 OFFSET ?)",
+            (self.disk_maxsize,),
+        )
+        self._db.commit()
+
+    def _store(self, key, value, expires):
+        self._entries[key] = (value, expires)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM predictions")
+                self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "model_version": self.model_version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "disk_hits": self.disk_hits,
+                "disk_path": self.disk_path,
+                "disk_maxsize": self.disk_maxsize,
+                "shared_hits": self.shared_hits,
+            }
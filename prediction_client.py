@@ -0,0 +1,305 @@
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from prediction_metrics import (
+    SUCCESS, HTTP_ERROR, NON_JSON, TIMEOUT, CONNECTION_ERROR, OTHER_ERROR,
+)
+
+
+DEFAULT_ENDPOINT = os.environ.get(
+    "ICFES_API_URL", "https://proyecto-icfes-pv4t.onrender.com/predict/"
+)
+
+# Endpoint opcional que acepta una lista de payloads en una sola petición
+DEFAULT_BATCH_ENDPOINT = os.environ.get("ICFES_BATCH_API_URL") or None
+
+# Formato del cuerpo de los lotes: json, arrow, f32 o auto; y su compresión: identity, gzip o zstd
+DEFAULT_WIRE_FORMAT = os.environ.get("ICFES_WIRE_FORMAT", "json")
+DEFAULT_WIRE_ENCODING = os.environ.get("ICFES_WIRE_ENCODING", "identity")
+
+# Respuesta con la que un servidor rechaza un formato de cuerpo que no entiende; se recuerda para el proceso
+UNSUPPORTED_FORMAT_STATUS = 415
+
+# Respuestas con las que se repite el lote en JSON; un 400/422 puede ser del lote y no se recuerda
+RETRY_AS_JSON_STATUSES = (400, UNSUPPORTED_FORMAT_STATUS, 422)
+
+# Versión del modelo servido por el endpoint; forma parte de la llave de caché
+MODEL_VERSION = os.environ.get("ICFES_MODEL_VERSION", "v1.2.0")
+
+# Nombres de las features en el formato que espera la API
+FEATURE_COLUMNS = [
+    "MOD_INGLES_PNAL",
+    "MOD_COMUNI_ESCRITA_PNAL",
+    "MOD_COMPETEN_CIUDADA_PNAL",
+    "MOD_LECTURA_CRITICA_PNAL",
+    "MOD_RAZONA_CUANTITATIVO_PNAL",
+]
+
+# Claves posibles donde la API devuelve el valor de la predicción
+PREDICTION_KEYS = ['predicted_score', 'r_Copy to clipboard', 'puntaje_global', 'PUNT_GLOBAL', 'prediction', 'score', 'result']
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def _env_float(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def build_payload(ingles, comunicacion, competencias, lectura, razonamiento):
+    """Arma el payload del endpoint en el orden de FEATURE_COLUMNS"""
+    values = (ingles, comunicacion, competencias, lectura, razonamiento)
+    return {column: float(value) for column, value in zip(FEATURE_COLUMNS, values)}
+
+
+def extract_prediction(result):
+    """Devuelve el valor de predicción de la respuesta de la API o None"""
+    if not isinstance(result, dict):
+        return None
+    for key in PREDICTION_KEYS:
+        if key in result:
+            return result[key]
+    return None
+
+
+def _classify_response(response):
+    if response.status_code != 200:
+        return HTTP_ERROR
+    content_type = response.headers.get("Content-Type", "")
+    if content_type.startswith("application/") and not content_type.startswith("application/json"):
+        # Respuesta columnar negociada; se decodifica en ``score_batch``
+        return SUCCESS
+    try:
+        response.json()
+    except ValueError:
+        return NON_JSON
+    return SUCCESS
+
+
+class PredictionClient:
+    """Cliente HTTP con pool de conexiones keep-alive compartido entre sesiones.
+
+    Se crea una sola vez por proceso (ver ``get_prediction_client`` en app.py)
+    para que todas las sesiones de Streamlit reutilicen las conexiones TCP/TLS
+    abiertas en lugar de negociar una nueva en cada clic.
+
+    Con un ``pool`` (``EndpointPool``) las llamadas sin ``endpoint`` explícito
+    se reparten entre sus réplicas y la respuesta lleva en ``replica`` el
+    nombre de la que la sirvió.
+
+    Los lotes (``score_batch``) pueden viajar en formato columnar
+    (``wire_format``): Arrow IPC o float32 empaquetado, con gzip o zstd
+    opcional. Si el servidor rechaza el formato se repite el lote en JSON y
+    el formato no se vuelve a intentar en este proceso.
+
+    Con ``admission`` (``AdmissionController``) cada llamada espera su turno
+    antes de salir; si no lo obtiene se lanza ``AdmissionRejected`` sin tocar
+    la red.
+    """
+
+    def __init__(
+        self,
+        endpoint=DEFAULT_ENDPOINT,
+        batch_endpoint=DEFAULT_BATCH_ENDPOINT,
+        pool_connections=None,
+        pool_maxsize=None,
+        max_retries=None,
+        backoff_factor=None,
+        connect_timeout=None,
+        read_timeout=None,
+        metrics=None,
+        pool=None,
+        wire_format=DEFAULT_WIRE_FORMAT,
+        wire_encoding=DEFAULT_WIRE_ENCODING,
+        admission=None,
+    ):
+        self.pool = pool
+        self.admission = admission
+        self.endpoint = pool.replicas[0].url if pool is not None else endpoint
+        self.metrics = metrics
+        self.batch_endpoint = batch_endpoint
+        self.pool_connections = pool_connections or _env_int("ICFES_POOL_CONNECTIONS", 4)
+        self.pool_maxsize = pool_maxsize or _env_int("ICFES_POOL_MAXSIZE", 20)
+        self.max_retries = max_retries if max_retries is not None else _env_int("ICFES_MAX_RETRIES", 2)
+        self.backoff_factor = backoff_factor if backoff_factor is not None else _env_float("ICFES_BACKOFF_FACTOR", 0.5)
+        self.timeout = (
+            connect_timeout or _env_float("ICFES_CONNECT_TIMEOUT", 5.0),
+            read_timeout or _env_float("ICFES_READ_TIMEOUT", 30.0),
+        )
+
+        # La predicción no tiene efectos secundarios, así que el POST se puede
+        # reintentar con seguridad ante fallos de conexión y 502/503/504.
+        # Los timeouts de lectura no se reintentan para no multiplicar la espera.
+        retry = Retry(
+            total=self.max_retries,
+            connect=self.max_retries,
+            read=False,
+            status=self.max_retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset({"POST"}),
+            raise_on_status=False,
+        )
+        # Sin bloqueo: pasadas ``pool_maxsize`` llamadas simultáneas a un host se abre una
+        # conexión extra que se cierra al terminar, en lugar de esperar sin límite un cupo.
+        # El tope de concurrencia lo pone el control de admisión.
+        self._adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            max_retries=retry,
+            pool_block=False,
+        )
+        self._session = requests.Session()
+        self._session.headers.update({"Content-Type": "application/json", "Connection": "keep-alive"})
+        self._session.mount("https://", self._adapter)
+        self._session.mount("http://", self._adapter)
+
+        self.wire_format = wire_format
+        self.wire_encoding = wire_encoding
+        self._rejected_wire = set()
+        self._wire_counts = {}
+
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self._total_requests = 0
+
+    def predict(self, payload, endpoint=None, timeout=None, kind="prediction"):
+        """Envía un payload al endpoint y devuelve el ``requests.Response``.
+
+        Si el cliente tiene ``metrics``, cada llamada se cronometra y se
+        clasifica por desenlace bajo la etiqueta ``kind``.
+        """
+        return self._post(endpoint, timeout, kind, json=payload)
+
+    def _post(self, endpoint, timeout, kind, **request_kwargs):
+        if self.admission is None:
+            return self._send(endpoint, timeout, kind, **request_kwargs)
+        with self.admission.admit(kind):
+            return self._send(endpoint, timeout, kind, **request_kwargs)
+
+    def _send(self, endpoint, timeout, kind, **request_kwargs):
+        with self._lock:
+            self._in_flight += 1
+            self._total_requests += 1
+            self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+        replica = self.pool.acquire() if endpoint is None and self.pool is not None else None
+        started = time.perf_counter()
+        outcome = OTHER_ERROR
+        healthy = False
+        try:
+            url = replica.url if replica is not None else endpoint or self.endpoint
+            response = self._session.post(url, timeout=timeout or self.timeout, **request_kwargs)
+            outcome = _classify_response(response)
+            healthy = outcome == SUCCESS or (outcome == HTTP_ERROR and response.status_code < 500)
+            response.replica = replica.name if replica is not None else None
+            return response
+        except requests.exceptions.Timeout:
+            outcome = TIMEOUT
+            raise
+        except requests.exceptions.ConnectionError:
+            outcome = CONNECTION_ERROR
+            raise
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            latency = time.perf_counter() - started
+            if replica is not None:
+                self.pool.release(replica, latency, healthy)
+            if self.metrics is not None:
+                self.metrics.record(kind, outcome, latency)
+
+    def score_batch(self, values):
+        """Puntúa una matriz ``(filas, 5)`` (orden de FEATURE_COLUMNS) en una petición de lote.
+
+        Devuelve un arreglo float64 con NaN donde falte la predicción; lanza
+        ``ValueError`` si el endpoint responde con error.
+        """
+        import wire_format
+
+        if not self.batch_endpoint:
+            raise ValueError("No hay un endpoint de lotes configurado (ICFES_BATCH_API_URL)")
+        content_type = wire_format.resolve_format(self.wire_format)
+        encoding = wire_format.resolve_encoding(self.wire_encoding)
+        if (content_type, encoding) in self._rejected_wire:
+            content_type, encoding = wire_format.JSON, wire_format.IDENTITY
+
+        response = self._post_batch(values, content_type, encoding)
+        if response.status_code in RETRY_AS_JSON_STATUSES and (content_type, encoding) != (wire_format.JSON, wire_format.IDENTITY):
+            # Solo un 415 dice que el servidor no entiende el formato; un 400/422 puede ser del lote
+            if response.status_code == UNSUPPORTED_FORMAT_STATUS:
+                with self._lock:
+                    self._rejected_wire.add((content_type, encoding))
+            content_type, encoding = wire_format.JSON, wire_format.IDENTITY
+            response = self._post_batch(values, content_type, encoding)
+
+        if response.status_code != 200:
+            raise ValueError(f"Error {response.status_code}: {response.text[:200]}")
+        predictions = wire_format.decode_predictions(response.content, response.headers.get("Content-Type"))
+        if len(predictions) != len(values):
+            raise ValueError("La respuesta del endpoint de lotes no coincide con el número de filas")
+        return predictions
+
+    def _post_batch(self, values, content_type, encoding):
+        import wire_format
+
+        body = wire_format.compress(wire_format.encode_rows(values, content_type), encoding)
+        headers = {"Content-Type": content_type, "Accept": f"{content_type}, {wire_format.JSON};q=0.5"}
+        if content_type == wire_format.F32:
+            headers[wire_format.COLUMNS_HEADER] = ",".join(FEATURE_COLUMNS)
+        if encoding != wire_format.IDENTITY:
+            headers["Content-Encoding"] = encoding
+        with self._lock:
+            counts = self._wire_counts.setdefault(f"{content_type}+{encoding}", {"requests": 0, "rows": 0, "bytes": 0})
+            counts["requests"] += 1
+            counts["rows"] += len(values)
+            counts["bytes"] += len(body)
+        return self._post(self.batch_endpoint, None, "batch", data=body, headers=headers)
+
+    def max_call_seconds(self, timeout=None):
+        """Cota de la duración de una llamada: la espera de admisión, todos los intentos con su timeout y el backoff"""
+        connect, read = timeout or self.timeout
+        attempts = self.max_retries + 1
+        backoff = sum(self.backoff_factor * 2 ** retry for retry in range(self.max_retries))
+        admission_wait = self.admission.max_wait if self.admission is not None else 0.0
+        return admission_wait + attempts * (connect + read) + backoff
+
+    def pool_stats(self):
+        """Uso del pool para dimensionar ``pool_maxsize``"""
+        pools = []
+        for key in list(self._adapter.poolmanager.pools.keys()):
+            pool = self._adapter.poolmanager.pools.get(key)
+            if pool is None:
+                continue
+            pools.append({
+                "host": f"{pool.scheme}://{pool.host}:{pool.port}",
+                "connections_opened": pool.num_connections,
+                "requests_served": pool.num_requests,
+                "idle_connections": sum(1 for conn in list(pool.pool.queue) if conn is not None) if pool.pool else 0,
+            })
+        with self._lock:
+            return {
+                "pool_maxsize": self.pool_maxsize,
+                "in_flight": self._in_flight,
+                "peak_in_flight": self._peak_in_flight,
+                "total_requests": self._total_requests,
+                "wire": {"format": self.wire_format, "encoding": self.wire_encoding,
+                         "rejected": sorted(f"{fmt}+{enc}" for fmt, enc in self._rejected_wire),
+                         "sent": {name: dict(counts) for name, counts in self._wire_counts.items()}},
+                "pools": pools,
+            }
+
+    def close(self):
+        self._session.close()
@@ -0,0 +1,171 @@
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from prediction_client import FEATURE_COLUMNS, _env_float, _env_int
+
+
+# Archivo del historial; vacío (por defecto) lo desactiva. Guarda las entradas de todos los visitantes
+DEFAULT_HISTORY_PATH = os.environ.get("ICFES_HISTORY_PATH", "")
+
+INPUT_COLUMNS = ("ingles", "comunicacion", "competencias", "lectura", "razonamiento")
+
+COLUMNS = ("id", "ts") + INPUT_COLUMNS + ("score", "status", "latency", "source", "endpoint", "error")
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS predictions (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    {", ".join(f"{column} REAL NOT NULL" for column in INPUT_COLUMNS)},
+    score REAL,
+    status TEXT NOT NULL,
+    latency REAL,
+    source TEXT NOT NULL,
+    endpoint TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_predictions_ts ON predictions (ts);
+CREATE INDEX IF NOT EXISTS idx_predictions_inputs ON predictions ({", ".join(INPUT_COLUMNS)});
+"""
+
+_INSERT = f"INSERT INTO predictions ({', '.join(COLUMNS[1:])}) VALUES ({', '.join('?' * (len(COLUMNS) - 1))})"
+
+
+class PredictionHistory:
+    """Historial append-only de predicciones en SQLite (modo WAL), uno por proceso.
+
+    ``record`` solo encola la fila en una cola acotada y vuelve de inmediato;
+    un hilo escritor la vacía por lotes de hasta ``batch_size`` filas, o cada
+    ``flush_interval`` segundos, en una sola transacción. Si la cola está
+    llena la fila se descarta y se cuenta en ``dropped``: el historial nunca
+    frena una predicción.
+
+    Las consultas paginan por cursor sobre ``id`` (creciente en el tiempo),
+    así que cada página cuesta lo mismo con mil filas o con millones; los
+    índices por ``ts`` y por la tupla de entradas cubren los filtros.
+    """
+
+    def __init__(self, path=DEFAULT_HISTORY_PATH, queue_size=None, batch_size=None, flush_interval=None):
+        self.path = path
+        self.batch_size = batch_size or _env_int("ICFES_HISTORY_BATCH", 500)
+        self.flush_interval = flush_interval or _env_float("ICFES_HISTORY_FLUSH", 1.0)
+        self._queue = queue.Queue(maxsize=queue_size or _env_int("ICFES_HISTORY_QUEUE", 10000))
+        self._stats_lock = threading.Lock()
+        self.queued = 0
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.last_error = None
+
+        writer = sqlite3.connect(self.path, check_same_thread=False)
+        writer.execute("PRAGMA journal_mode=WAL")
+        writer.execute("PRAGMA synchronous=NORMAL")
+        writer.executescript(_SCHEMA)
+        writer.commit()
+        self._writer = writer
+
+        # Con WAL las lecturas no esperan al escritor; una conexión de lectura propia
+        self._read_lock = threading.Lock()
+        self._reader = sqlite3.connect(self.path, check_same_thread=False)
+
+        self._thread = threading.Thread(target=self._run, name="icfes-history-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def record(self, payload, record, endpoint=None):
+        """Encola una predicción (payload + ``PredictionRecord``) sin bloquear"""
+        row = (time.time(), *(float(payload[column]) for column in FEATURE_COLUMNS),
+               record.score, record.status, record.latency, record.source, endpoint, record.error)
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            with self._stats_lock:
+                self.dropped += 1
+            return False
+        with self._stats_lock:
+            self.queued += 1
+        return True
+
+    def _run(self):
+        # Ninguna fila puede quedar sin ``task_done``: ``flush`` (también al salir) espera a todas
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, batch):
+        try:
+            with self._writer:
+                self._writer.executemany(_INSERT, batch)
+        except Exception as e:
+            # Cualquier error (también una fila mal formada) descarta el lote sin matar al hilo escritor
+            with self._stats_lock:
+                self.last_error = f"{type(e).__name__}: {e}"
+                self.dropped += len(batch)
+            return
+        with self._stats_lock:
+            self.written += len(batch)
+            self.batches += 1
+
+    def flush(self):
+        """Espera a que todo lo encolado quede escrito; sin hilo escritor no hay nada que esperar"""
+        if self._thread.is_alive():
+            self._queue.join()
+
+    def page(self, before_id=None, limit=50, since=None, inputs=None):
+        """Hasta ``limit`` filas con ``id < before_id``, de la más reciente a la más antigua.
+
+        ``since`` filtra por timestamp (índice por ``ts``) e ``inputs`` por la
+        tupla exacta de las cinco entradas (índice compuesto). La siguiente
+        página se pide con el ``id`` de la última fila devuelta.
+        """
+        clauses, params = [], []
+        if before_id is not None:
+            clauses.append("id < ?")
+            params.append(before_id)
+        if since is not None:
+            # Los ids crecen con el tiempo: el periodo se traduce a un id mínimo con el índice por ts
+            clauses.append("id >= (SELECT id FROM predictions WHERE ts >= ? ORDER BY ts LIMIT 1)")
+            params.append(since)
+        if inputs is not None:
+            clauses.extend(f"{column} = ?" for column in INPUT_COLUMNS)
+            params.extend(float(inputs[column]) for column in FEATURE_COLUMNS)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = f"SELECT {', '.join(COLUMNS)} FROM predictions {where} ORDER BY id DESC LIMIT ?"
+        with self._read_lock:
+            rows = self._reader.execute(sql, (*params, limit)).fetchall()
+        return [dict(zip(COLUMNS, row)) for row in rows]
+
+    def stats(self):
+        with self._read_lock:
+            # min y max por separado: juntos en un SELECT SQLite recorre la tabla
+            first_id, last_id = self._reader.execute(
+                "SELECT (SELECT min(id) FROM predictions), (SELECT max(id) FROM predictions)"
+            ).fetchone()
+        with self._stats_lock:
+            return {
+                "path": self.path,
+                # Aproximado a partir del rango de ids: no recorre la tabla
+                "rows": last_id - first_id + 1 if last_id is not None else 0,
+                "queued": self.queued,
+                "written": self.written,
+                "pending": self._queue.qsize(),
+                "dropped": self.dropped,
+                "batches": self.batches,
+                "last_error": self.last_error,
+            }
@@ -0,0 +1,190 @@
+import functools
+import itertools
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from admission_control import AdmissionRejected
+from prediction_cache import make_key
+from session_memory import DEBUG_MODE, OK, PredictionRecord
+from shared_store import LEASE_MARGIN_SECONDS
+
+
+_job_ids = itertools.count(1)
+
+
+class PredictionJob:
+    """Predicción remota en curso para una sesión"""
+
+    def __init__(self, future, payload, key, coalescer):
+        self.id = next(_job_ids)
+        self.future = future
+        self.payload = payload
+        self.key = key
+        self.coalescer = coalescer
+        self.submitted_at = time.time()
+
+    def done(self):
+        return self.future.done()
+
+    def cancel(self):
+        """Deja de esperar la petición; solo se cancela si ninguna otra sesión la comparte
+        y aún no empezó. Si ya está en vuelo, su resultado se descarta."""
+        return self.coalescer.release(self.key, self.future)
+
+    def outcome(self):
+        return self.future.result()
+
+
+def make_executor(max_workers):
+    """Executor del proceso para ejecutar las predicciones fuera del hilo del script"""
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="icfes-predict")
+
+
+def submit_prediction(executor, coalescer, client, cache, monitor, payload, previous_job=None, breaker=None, hedger=None):
+    """Encola una predicción remota y reemplaza a ``previous_job`` si seguía pendiente.
+
+    Las peticiones con el mismo payload que ya estén en vuelo, de cualquier
+    sesión, se unen a esa llamada en lugar de abrir otra hacia el endpoint.
+    """
+    if previous_job is not None and not previous_job.done():
+        previous_job.cancel()
+    key = make_key(payload, cache.model_version)
+    future = coalescer.submit(key, executor, execute_remote_prediction, client, cache, monitor, payload, breaker, hedger)
+    return PredictionJob(future, payload, key, coalescer)
+
+
+def call_endpoint(client, cache, payload, endpoint=None, kind="prediction", source="remote", monitor=None, breaker=None):
+    """Hace una llamada al endpoint y la convierte en ``PredictionRecord``.
+
+    Informa la latencia al ``monitor`` y el desenlace al ``breaker``: cuentan
+    como fallo los errores de red, los timeouts, los 5xx y las respuestas no JSON.
+    Un rechazo del control de admisión no salió a la red y no cuenta para
+    nadie; si la llamada era la prueba del circuito semiabierto, se devuelve.
+    """
+    started = time.perf_counter()
+    healthy = False
+    rejected = False
+    try:
+        response = client.predict(payload, endpoint=endpoint, kind=kind)
+        latency = time.perf_counter() - started
+        replica = getattr(response, "replica", None)
+        if monitor is not None:
+            monitor.observe(latency, response.status_code == 200, replica=replica)
+
+        # Diagnóstico de la respuesta; PredictionRecord solo lo conserva en modo debug
+        diagnostic = None
+        if DEBUG_MODE:
+            diagnostic = f"Status: {response.status_code}\nHeaders: {dict(response.headers)}\nBody: {response.text}"
+
+        if response.status_code == 200:
+            try:
+                result = response.json()
+                healthy = True
+                record = PredictionRecord.from_result(result, latency=latency, source=source, diagnostic=diagnostic, replica=replica)
+                # Un 200 sin campo de predicción no se guarda: la caché lo serviría como resultado durante todo el TTL
+                if record.status == OK:
+                    cache.put(payload, result)
+                return record.fit_budget()
+            except json.JSONDecodeError:
+                error_message = f"La API devolvió una respuesta no JSON: {response.text}"
+        else:
+            healthy = response.status_code < 500
+            error_message = f"Error {response.status_code}: {response.text}"
+        return PredictionRecord.from_error(error_message, latency=latency, source=source, diagnostic=diagnostic, replica=replica).fit_budget()
+
+    except AdmissionRejected as e:
+        rejected = True
+        error_message = str(e)
+        source = "limiter"
+    except requests.exceptions.ConnectionError:
+        error_message = "No se pudo conectar con la API. Verifica que el servidor esté ejecutándose."
+    except requests.exceptions.Timeout:
+        error_message = "La solicitud tardó demasiado tiempo. Intenta nuevamente."
+    except Exception as e:
+        error_message = f"Error inesperado: {str(e)}"
+    finally:
+        if breaker is not None and rejected:
+            breaker.release_trial()
+        elif breaker is not None:
+            if healthy:
+                breaker.record_success()
+            else:
+                breaker.record_failure()
+    return PredictionRecord.from_error(error_message, latency=time.perf_counter() - started, source=source)
+
+
+def endpoint_secondary(client, cache, endpoint):
+    """Backend secundario de hedging: otra URL servida con el mismo cliente y pool"""
+    return functools.partial(_call_secondary_endpoint, client, cache, endpoint)
+
+
+def _call_secondary_endpoint(client, cache, endpoint, payload):
+    return call_endpoint(client, cache, payload, endpoint=endpoint, kind="hedge", source="secondary")
+
+
+def local_secondary(ensemble):
+    """Backend secundario de hedging: el ensamble local, en proceso"""
+    return functools.partial(_predict_local, ensemble)
+
+
+def _predict_local(ensemble, payload):
+    started = time.perf_counter()
+    try:
+        score = ensemble.predict_payload(payload)
+    except Exception as e:
+        return PredictionRecord.from_error(f"Error del modelo local: {e}", latency=time.perf_counter() - started, source="local")
+    return PredictionRecord(score=score, latency=time.perf_counter() - started, source="local")
+
+
+def execute_remote_prediction(client, cache, monitor, payload, breaker=None, hedger=None):
+    """Llama al endpoint y devuelve un ``PredictionRecord``.
+
+    Con el circuito abierto la llamada falla de inmediato (o va directo al
+    secundario del ``hedger``). Se ejecuta en un hilo del executor, por lo
+    que no debe tocar ``st.session_state``; el fragmento del resultado
+    aplica el desenlace.
+    """
+    if breaker is not None and not breaker.allow():
+        if hedger is not None:
+            return hedger.failover(payload)
+        return PredictionRecord.from_error(
+            "El servidor de predicción falló varias veces seguidas; se volverá a intentar "
+            f"automáticamente en {breaker.retry_in():.0f} s.",
+            latency=0.0,
+            source="breaker",
+        )
+    primary = functools.partial(call_endpoint, client, cache, payload, monitor=monitor, breaker=breaker)
+    call = primary if hedger is None else functools.partial(hedger.run, primary, payload)
+    if cache.shared is None:
+        return call()
+    return _shared_get_or_call(client, cache, payload, call, breaker)
+
+
+def _shared_get_or_call(client, cache, payload, call, breaker=None):
+    """Get-or-compute entre réplicas: una sola llama al endpoint por payload y las demás leen su resultado.
+
+    Si el resultado lo publicó otra réplica, esta no llamó al endpoint y la
+    prueba del circuito semiabierto que tomó ``allow`` se devuelve.
+    """
+    started = time.perf_counter()
+    records = []
+
+    def compute():
+        records.append(call())
+        # ``call_endpoint`` ya publicó el resultado exitoso con ``cache.put``
+        return None
+
+    # El lease dura lo que puede tardar la llamada con todos sus reintentos
+    result, _ = cache.shared.get_or_compute(
+        make_key(payload, cache.model_version), compute, ttl=cache.ttl,
+        lease_seconds=client.max_call_seconds() + LEASE_MARGIN_SECONDS,
+    )
+    if records:
+        return records[0]
+    if breaker is not None:
+        breaker.release_trial()
+    cache.put(payload, result, share=False)
+    return PredictionRecord.from_result(result, latency=time.perf_counter() - started, source="shared")
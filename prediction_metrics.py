@@ -0,0 +1,138 @@
+import bisect
+import threading
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+SUCCESS = "success"
+HTTP_ERROR = "http_error"
+NON_JSON = "non_json"
+TIMEOUT = "timeout"
+CONNECTION_ERROR = "connection_error"
+OTHER_ERROR = "other_error"
+
+OUTCOMES = (SUCCESS, HTTP_ERROR, NON_JSON, TIMEOUT, CONNECTION_ERROR, OTHER_ERROR)
+
+# Límites del histograma en segundos, pensados para un endpoint con arranques en frío
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class PredictionMetrics:
+    """Contadores e histogramas de latencia de las llamadas al endpoint.
+
+    Cada llamada se registra con un ``kind`` (prediction, batch, probe) y un
+    desenlace de ``OUTCOMES``. Los cuantiles p50/p95/p99 se calculan sobre una
+    ventana de las últimas ``window`` latencias de cada tipo; los buckets del
+    histograma son acumulados desde el arranque, como espera Prometheus.
+    """
+
+    def __init__(self, window=2048):
+        self._lock = threading.Lock()
+        self._counts = defaultdict(int)
+        self._bucket_counts = defaultdict(lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+        self._sum = defaultdict(float)
+        self._recent = defaultdict(lambda: deque(maxlen=window))
+
+    def record(self, kind, outcome, seconds):
+        with self._lock:
+            self._counts[(kind, outcome)] += 1
+            self._bucket_counts[kind][bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            self._sum[kind] += seconds
+            self._recent[kind].append(seconds)
+
+    def quantiles(self, kind):
+        # numpy solo se importa al consultar cuantiles, no al arrancar la app
+        import numpy as np
+
+        with self._lock:
+            recent = np.fromiter(self._recent.get(kind, ()), dtype=np.float64)
+        if not recent.size:
+            return {q: None for q in QUANTILES}
+        return dict(zip(QUANTILES, np.quantile(recent, QUANTILES).tolist()))
+
+    def latency_quantile(self, kind, q, min_samples=1):
+        """Cuantil ``q`` de la ventana reciente, o None si hay menos de ``min_samples``"""
+        import numpy as np
+
+        with self._lock:
+            recent = np.fromiter(self._recent.get(kind, ()), dtype=np.float64)
+        if recent.size < min_samples:
+            return None
+        return float(np.quantile(recent, q))
+
+    def summary(self):
+        """Resumen por tipo de llamada para el panel de administración"""
+        with self._lock:
+            kinds = sorted(self._bucket_counts)
+            counts = dict(self._counts)
+        rows = []
+        for kind in kinds:
+            quantiles = self.quantiles(kind)
+            total = sum(counts.get((kind, outcome), 0) for outcome in OUTCOMES)
+            row = {"kind": kind, "total": total}
+            row.update({outcome: counts.get((kind, outcome), 0) for outcome in OUTCOMES})
+            row.update({f"p{int(q * 100)}_s": value for q, value in quantiles.items()})
+            rows.append(row)
+        return rows
+
+    def to_prometheus(self):
+        """Exporta las métricas en el formato de texto de Prometheus"""
+        with self._lock:
+            counts = dict(self._counts)
+            buckets = {kind: list(values) for kind, values in self._bucket_counts.items()}
+            sums = dict(self._sum)
+
+        lines = [
+            "# HELP icfes_prediction_requests_total Llamadas al endpoint de predicción por desenlace",
+            "# TYPE icfes_prediction_requests_total counter",
+        ]
+        for (kind, outcome), value in sorted(counts.items()):
+            lines.append(f'icfes_prediction_requests_total{{kind="{kind}",outcome="{outcome}"}} {value}')
+
+        lines += [
+            "# HELP icfes_prediction_latency_seconds Latencia de las llamadas al endpoint",
+            "# TYPE icfes_prediction_latency_seconds histogram",
+        ]
+        for kind, values in sorted(buckets.items()):
+            cumulative = 0
+            for bound, value in zip(LATENCY_BUCKETS + (float("inf"),), values):
+                cumulative += value
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f'icfes_prediction_latency_seconds_bucket{{kind="{kind}",le="{le}"}} {cumulative}')
+            lines.append(f'icfes_prediction_latency_seconds_sum{{kind="{kind}"}} {sums[kind]}')
+            lines.append(f'icfes_prediction_latency_seconds_count{{kind="{kind}"}} {cumulative}')
+
+        lines += [
+            "# HELP icfes_prediction_latency_recent_seconds Cuantiles de latencia sobre la ventana reciente",
+            "# TYPE icfes_prediction_latency_recent_seconds summary",
+        ]
+        for kind in sorted(buckets):
+            for q, value in self.quantiles(kind).items():
+                if value is not None:
+                    lines.append(f'icfes_prediction_latency_recent_seconds{{kind="{kind}",quantile="{q}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+def start_metrics_server(metrics, port, host="0.0.0.0"):
+    """Sirve ``/metrics`` en un hilo daemon para que Prometheus lo pueda consultar"""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.to_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="icfes-metrics", daemon=True).start()
+    return server
@@ -0,0 +1,63 @@
+import threading
+
+
+class RequestCoalescer:
+    """Single-flight: peticiones idénticas concurrentes comparten una sola llamada.
+
+    Es única por proceso, así que agrupa sesiones distintas. Cada llamada en
+    vuelo se indexa por su llave (ver ``prediction_cache.make_key``) y todos
+    los suscriptores reciben el mismo ``Future``, con su resultado o su error.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self.calls = 0
+        self.coalesced = 0
+        self.cancelled = 0
+
+    def submit(self, key, executor, fn, *args):
+        """Devuelve el ``Future`` en vuelo para ``key`` o envía ``fn(*args)`` al executor"""
+        with self._lock:
+            entry = self._in_flight.get(key)
+            if entry is not None and not entry["future"].done():
+                entry["waiters"] += 1
+                self.coalesced += 1
+                return entry["future"]
+            future = executor.submit(fn, *args)
+            self._in_flight[key] = {"future": future, "waiters": 1}
+            self.calls += 1
+        future.add_done_callback(lambda done, key=key: self._forget(key, done))
+        return future
+
+    def release(self, key, future):
+        """Un suscriptor deja de esperar; la llamada se cancela solo si nadie más la espera"""
+        with self._lock:
+            entry = self._in_flight.get(key)
+            if entry is None or entry["future"] is not future:
+                return False
+            entry["waiters"] -= 1
+            if entry["waiters"] > 0:
+                return False
+        if future.cancel():
+            with self._lock:
+                self.cancelled += 1
+            return True
+        return False
+
+    def _forget(self, key, future):
+        with self._lock:
+            entry = self._in_flight.get(key)
+            if entry is not None and entry["future"] is future:
+                del self._in_flight[key]
+
+    def stats(self):
+        with self._lock:
+            requests = self.calls + self.coalesced
+            return {
+                "upstream_calls": self.calls,
+                "coalesced_requests": self.coalesced,
+                "saved_ratio": self.coalesced / requests if requests else 0.0,
+                "cancelled_calls": self.cancelled,
+                "in_flight": len(self._in_flight),
+            }
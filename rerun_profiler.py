@@ -0,0 +1,88 @@
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+
+APP = "app"
+FRAGMENT = "fragment"
+
+
+def _install_byte_counter(ctx):
+    """Envuelve ``ctx._enqueue`` una sola vez para sumar los bytes enviados al navegador.
+
+    ``_enqueue`` es interno de Streamlit; si no existe, solo se mide el tiempo.
+    """
+    if hasattr(ctx, "_icfes_sent_bytes"):
+        return True
+    original = getattr(ctx, "_enqueue", None)
+    if original is None:
+        return False
+    ctx._icfes_sent_bytes = 0
+
+    def counting_enqueue(msg):
+        ctx._icfes_sent_bytes += msg.ByteSize()
+        original(msg)
+
+    ctx._enqueue = counting_enqueue
+    return True
+
+
+class RerunProfiler:
+    """Tiempo de script y bytes de deltas por rerun, separados por alcance.
+
+    ``app`` son las ejecuciones completas del script y ``fragment`` las
+    re-ejecuciones parciales del formulario de predicción, así se puede
+    comparar el costo de un cambio de input antes y después de aislarlo.
+    """
+
+    def __init__(self, window=500):
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=window))
+
+    def start(self, scope=APP):
+        """Inicia una medición; devuelve un token para ``finish`` (o None fuera de Streamlit)"""
+        ctx = get_script_run_ctx(suppress_warning=True)
+        if ctx is None:
+            return None
+        counting = _install_byte_counter(ctx)
+        return (scope, ctx, time.perf_counter(), ctx._icfes_sent_bytes if counting else None)
+
+    def finish(self, token):
+        if token is None:
+            return
+        scope, ctx, started, bytes_before = token
+        elapsed = time.perf_counter() - started
+        sent = ctx._icfes_sent_bytes - bytes_before if bytes_before is not None else None
+        with self._lock:
+            self._samples[scope].append((elapsed, sent))
+
+    @contextmanager
+    def measure_fragment(self):
+        """Mide el cuerpo de un fragmento solo cuando corre como rerun parcial"""
+        ctx = get_script_run_ctx(suppress_warning=True)
+        token = self.start(FRAGMENT) if ctx is not None and ctx.fragment_ids_this_run else None
+        try:
+            yield
+        finally:
+            self.finish(token)
+
+    def summary(self):
+        import numpy as np
+
+        with self._lock:
+            samples = {scope: list(values) for scope, values in self._samples.items()}
+        rows = []
+        for scope, values in sorted(samples.items()):
+            seconds = np.array([value[0] for value in values])
+            sent = np.array([value[1] for value in values if value[1] is not None])
+            rows.append({
+                "scope": scope,
+                "runs": len(values),
+                "median_ms": float(np.median(seconds) * 1000),
+                "p95_ms": float(np.quantile(seconds, 0.95) * 1000),
+                "median_delta_bytes": float(np.median(sent)) if sent.size else None,
+            })
+        return rows
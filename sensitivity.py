@@ -0,0 +1,160 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from attributions import FEATURE_LABELS
+from batch_prediction import MAX_SCORE, MIN_SCORE, score_chunk
+from prediction_cache import make_key
+from prediction_client import FEATURE_COLUMNS, MODEL_VERSION, _env_int
+
+
+# Paso de la malla del barrido 2-D: con 5 son 21 x 21 = 441 puntos
+SWEEP_2D_STEP = _env_int("ICFES_SWEEP_2D_STEP", 5)
+
+# Barridos guardados por proceso (cada uno es una malla pequeña de puntajes)
+SWEEP_CACHE_SIZE = _env_int("ICFES_SWEEP_CACHE_SIZE", 256)
+
+
+def grid_values(step=1):
+    return np.arange(MIN_SCORE, MAX_SCORE + 1, step, dtype=np.float64)
+
+
+def sweep_grid(payload, features, step=1):
+    """Malla con una fila por punto: cada feature de ``features`` recorre 0-100 y las demás quedan fijas.
+
+    Con una feature es un barrido 1-D; con varias se concatenan sus barridos
+    (curvas independientes). Devuelve el DataFrame en el orden de FEATURE_COLUMNS.
+    """
+    values = grid_values(step)
+    base = np.array([float(payload[column]) for column in FEATURE_COLUMNS])
+    blocks = []
+    for feature in features:
+        block = np.tile(base, (len(values), 1))
+        block[:, FEATURE_COLUMNS.index(feature)] = values
+        blocks.append(block)
+    return pd.DataFrame(np.vstack(blocks), columns=FEATURE_COLUMNS)
+
+
+def sweep_grid_2d(payload, feature_x, feature_y, step=SWEEP_2D_STEP):
+    """Malla 2-D: ``feature_x`` y ``feature_y`` recorren 0-100 con ``step``; fila = (y, x) en orden C"""
+    values = grid_values(step)
+    xx, yy = np.meshgrid(values, values)
+    block = np.tile([float(payload[column]) for column in FEATURE_COLUMNS], (xx.size, 1))
+    block[:, FEATURE_COLUMNS.index(feature_x)] = xx.ravel()
+    block[:, FEATURE_COLUMNS.index(feature_y)] = yy.ravel()
+    return pd.DataFrame(block, columns=FEATURE_COLUMNS)
+
+
+class SensitivityExplorer:
+    """Barridos "qué pasa si" sobre el puntaje global, compartidos por todas las sesiones.
+
+    Todos los puntos de un barrido se puntúan juntos: con el ensamble local
+    en una sola llamada vectorizada, o con la API en una sola petición al
+    endpoint de lotes. Sin endpoint de lotes no se ofrece el backend remoto:
+    serían cientos de peticiones por barrido. Los resultados se guardan por
+    payload base, backend y barrido en un LRU; con ``compute=False`` solo se
+    devuelve lo que ya está guardado, sin puntuar nada.
+    """
+
+    def __init__(self, client=None, ensemble=None, maxsize=SWEEP_CACHE_SIZE):
+        self.client = client
+        self.ensemble = ensemble
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.points_scored = 0
+        self.requests = 0
+
+    def backends(self):
+        options = []
+        if self.client is not None and self.client.batch_endpoint:
+            options.append("remote")
+        if self.ensemble is not None:
+            options.append("local")
+        return options
+
+    def sweep(self, payload, features, backend, compute=True):
+        """Curvas 1-D: DataFrame con índice 0-100 y una columna por feature (etiqueta legible)"""
+        spec = f"1d|{backend}|{'+'.join(features)}"
+        return self._cached(payload, spec, lambda: self._sweep(payload, features, backend), compute)
+
+    def sweep_2d(self, payload, feature_x, feature_y, backend, step=SWEEP_2D_STEP, compute=True):
+        """Superficie 2-D en formato largo: columnas x, y y PUNT_GLOBAL"""
+        spec = f"2d|{backend}|{feature_x}|{feature_y}|{step}"
+        return self._cached(payload, spec, lambda: self._sweep_2d(payload, feature_x, feature_y, backend, step), compute)
+
+    def _cached(self, payload, spec, sweep, compute):
+        key = make_key(payload, f"{MODEL_VERSION}|{spec}")
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            if not compute:
+                return None
+            self.misses += 1
+        result = sweep()
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return result
+
+    def _sweep(self, payload, features, backend):
+        grid = sweep_grid(payload, features)
+        scores, seconds = self._score(grid, backend)
+        values = grid_values()
+        frame = pd.DataFrame(
+            scores.reshape(len(features), len(values)).T,
+            index=pd.Index(values.astype(int), name="Puntaje del área"),
+            columns=[FEATURE_LABELS.get(feature, feature) for feature in features],
+        )
+        return {"frame": frame, "points": len(grid), "seconds": seconds}
+
+    def _sweep_2d(self, payload, feature_x, feature_y, backend, step):
+        grid = sweep_grid_2d(payload, feature_x, feature_y, step)
+        scores, seconds = self._score(grid, backend)
+        frame = pd.DataFrame({
+            "x": grid[feature_x].astype(int).to_numpy(),
+            "y": grid[feature_y].astype(int).to_numpy(),
+            "PUNT_GLOBAL": scores,
+        })
+        return {"frame": frame, "points": len(grid), "seconds": seconds}
+
+    def _score(self, grid, backend):
+        """Puntúa la malla completa; devuelve ``(puntajes, segundos)``"""
+        started = time.perf_counter()
+        if backend == "local":
+            scores = self.ensemble.predict(grid[self.ensemble.feature_names].to_numpy(dtype=np.float64))
+            requests = 0
+        else:
+            if not self.client.batch_endpoint:
+                raise ValueError("El barrido remoto requiere un endpoint de lotes (ICFES_BATCH_API_URL)")
+            predictions, errors = score_chunk(self.client, grid)
+            if errors[0] is not None:
+                raise ValueError(errors[0])
+            scores = np.array([np.nan if value is None else float(value) for value in predictions])
+            requests = 1
+        if np.isnan(scores).all():
+            raise ValueError("El endpoint no devolvió predicciones para el barrido")
+        with self._lock:
+            self.points_scored += len(grid)
+            self.requests += requests
+        return scores, time.perf_counter() - started
+
+    def stats(self):
+        with self._lock:
+            return {
+                "cached_sweeps": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "points_scored": self.points_scored,
+                "http_requests": self.requests,
+            }
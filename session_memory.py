@@ -0,0 +1,172 @@
+import os
+import pickle
+import sys
+
+from prediction_client import _env_int, extract_prediction
+
+
+# Con ICFES_DEBUG=1 cada registro guarda también un diagnóstico truncado de la respuesta
+DEBUG_MODE = os.environ.get("ICFES_DEBUG", "").lower() in ("1", "true", "yes")
+
+# Con ICFES_ADMIN=1 se muestran los paneles de diagnóstico (pool, caché, memoria, métricas...)
+ADMIN_MODE = os.environ.get("ICFES_ADMIN", "").lower() in ("1", "true", "yes")
+
+# Presupuesto de memoria por sesión para el registro de predicción, en bytes
+SESSION_BUDGET_BYTES = _env_int("ICFES_SESSION_BUDGET_BYTES", 2048)
+
+DIAGNOSTIC_MAX_CHARS = 500
+ERROR_MAX_CHARS = 300
+
+OK = "ok"
+MISSING = "missing"
+ERROR = "error"
+
+
+def _truncate(text, limit):
+    if text is None or len(text) <= limit:
+        return text
+    return text[:limit - 1] + "…"
+
+
+class PredictionRecord:
+    """Registro compacto del último resultado de predicción de una sesión.
+
+    Sustituye al dict completo de la respuesta y al texto con headers y body:
+    solo guarda el puntaje, el estado, la latencia, el origen y la réplica que
+    respondió, más un diagnóstico truncado cuando ``DEBUG_MODE`` está activo.
+    """
+
+    __slots__ = ("score", "status", "error", "latency", "source", "replica", "diagnostic")
+
+    def __init__(self, score=None, status=OK, error=None, latency=None, source="remote", diagnostic=None, replica=None):
+        self.score = score
+        self.status = status
+        self.error = _truncate(error, ERROR_MAX_CHARS)
+        self.latency = latency
+        self.source = source
+        self.replica = replica
+        self.diagnostic = _truncate(diagnostic, DIAGNOSTIC_MAX_CHARS) if DEBUG_MODE else None
+
+    @classmethod
+    def from_result(cls, result, latency=None, source="remote", diagnostic=None, replica=None):
+        """Construye el registro a partir del JSON devuelto por la API"""
+        value = extract_prediction(result)
+        if value is None:
+            return cls(status=MISSING, latency=latency, source=source, diagnostic=diagnostic, replica=replica)
+        return cls(score=float(value), latency=latency, source=source, diagnostic=diagnostic, replica=replica)
+
+    @classmethod
+    def from_error(cls, error, latency=None, source="remote", diagnostic=None, replica=None):
+        return cls(status=ERROR, error=error, latency=latency, source=source, diagnostic=diagnostic, replica=replica)
+
+    def nbytes(self):
+        """Tamaño aproximado del registro y sus campos"""
+        return sys.getsizeof(self) + sum(sys.getsizeof(getattr(self, name)) for name in self.__slots__)
+
+    def fit_budget(self, budget=None):
+        """Recorta el diagnóstico y luego el error hasta caber en el presupuesto"""
+        budget = budget or SESSION_BUDGET_BYTES
+        if self.nbytes() > budget:
+            self.diagnostic = None
+        while self.error and self.nbytes() > budget and len(self.error) > 40:
+            self.error = _truncate(self.error, len(self.error) // 2)
+        return self
+
+    def __repr__(self):
+        return f"PredictionRecord(score={self.score!r}, status={self.status!r}, latency={self.latency!r}, source={self.source!r}, replica={self.replica!r})"
+
+
+# Tipos cuyos elementos se recorren al medir; el resto de objetos se recorre por sus atributos
+_CONTAINERS = (list, tuple, set, frozenset)
+
+
+def deep_sizeof(obj):
+    """Bytes de ``obj`` y de todo lo que alcanza: ``sys.getsizeof`` por objeto, sin contar dos veces.
+
+    Los tipos que calculan su propio tamaño (arreglos de numpy, DataFrames)
+    se toman tal cual, más el búfer que compartan; de las demás instancias
+    se recorren sus atributos.
+    """
+    seen, stack, total = set(), [obj], 0
+    while stack:
+        item = stack.pop()
+        if id(item) in seen or isinstance(item, type):
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, _CONTAINERS):
+            stack.extend(item)
+        elif isinstance(item, memoryview):
+            stack.append(item.obj)
+        elif type(item).__sizeof__ is not object.__sizeof__:
+            # Un arreglo de numpy que no es dueño de sus datos (p. ej. recién deserializado) los tiene en ``base``
+            base = getattr(item, "base", None)
+            if base is not None:
+                stack.append(base)
+        else:
+            if hasattr(item, "__dict__"):
+                stack.append(vars(item))
+            for name in getattr(type(item), "__slots__", ()):
+                if hasattr(item, name):
+                    stack.append(getattr(item, name))
+    return total
+
+
+def measure_bytes(obj):
+    """Bytes que ocupa una copia reconstruida de ``obj``.
+
+    Se mide una copia deserializada con pickle: ``deepcopy`` reutilizaría los
+    str y números inmutables, y el objeto original puede compartir valores
+    con otras sesiones que no le corresponden. Lanza una excepción si ``obj``
+    no se puede serializar (futuros, locks).
+    """
+    return deep_sizeof(pickle.loads(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)))
+
+
+def _active_session_states():
+    """Session state de todas las sesiones activas del servidor de Streamlit"""
+    from streamlit.runtime import Runtime
+
+    if not Runtime.exists():
+        return []
+    # API interna de Streamlit; si cambia, el panel solo mide la sesión actual
+    session_manager = getattr(Runtime.instance(), "_session_mgr", None)
+    if session_manager is None or not hasattr(session_manager, "list_active_sessions"):
+        return []
+    states = []
+    for session_info in session_manager.list_active_sessions():
+        session = session_info.session
+        states.append((session.id, session.session_state))
+    return states
+
+
+def measure_session(values):
+    """Devuelve ``(bytes, claves_no_medidas)`` para un dict de session state"""
+    total, unmeasured = 0, 0
+    for value in values.values():
+        try:
+            total += measure_bytes(value)
+        except Exception:
+            unmeasured += 1
+    return total, unmeasured
+
+
+def session_state_usage():
+    """Memoria de session state por sesión, medida con ``measure_bytes``.
+
+    Los valores que no se pueden serializar (futuros, locks) se cuentan aparte
+    en ``unmeasured_keys`` en lugar de interrumpir la medición.
+    """
+    sessions = []
+    for session_id, state in _active_session_states():
+        total, unmeasured = measure_session(state.filtered_state)
+        sessions.append({"session": session_id[:8], "bytes": total, "unmeasured_keys": unmeasured})
+    return {
+        "sessions": len(sessions),
+        "total_bytes": sum(session["bytes"] for session in sessions),
+        "budget_bytes_per_session": SESSION_BUDGET_BYTES,
+        "per_session": sessions,
+    }
@@ -0,0 +1,259 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+from prediction_client import _env_float
+
+
+# Almacén compartido entre réplicas de la app: ruta de SQLite (o sqlite:///ruta) o URL redis://
+DEFAULT_SHARED_STORE = os.environ.get("ICFES_SHARED_STORE", "")
+
+# Prefijo de las llaves, para compartir un Redis con otras aplicaciones
+KEY_PREFIX = os.environ.get("ICFES_SHARED_PREFIX", "icfes:")
+
+# Duración del lease de get-or-compute cuando quien llama no indica una: debe cubrir el cálculo más lento
+DEFAULT_LEASE_SECONDS = _env_float("ICFES_SHARED_LEASE", 35.0)
+
+# Margen que se suma a la duración máxima de una llamada al calcular su lease
+LEASE_MARGIN_SECONDS = 5.0
+
+# Cada cuánto se consulta si la réplica que calcula ya publicó el valor
+POLL_SECONDS = 0.05
+
+REDIS_SCHEMES = ("redis://", "rediss://", "unix://")
+
+# Borra el lease solo si sigue siendo nuestro (pudo vencer y tomarlo otra réplica)
+_REDIS_RELEASE = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) else return 0 end"
+
+
+class SharedStore:
+    """Valores JSON con TTL compartidos por varios procesos, con get-or-compute atómico.
+
+    ``get_or_compute`` toma un lease por llave antes de calcular: entre todas
+    las réplicas solo una calcula a la vez y las demás esperan a que publique
+    el valor. Si el backend falla, las operaciones degradan a "no hay valor"
+    y se calcula localmente, como sin almacén compartido.
+    """
+
+    backend = None
+
+    def __init__(self, prefix=KEY_PREFIX, lease_seconds=None):
+        self.prefix = prefix
+        self.lease_seconds = lease_seconds or DEFAULT_LEASE_SECONDS
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.computed = 0
+        self.waited = 0
+        self.lease_timeouts = 0
+        self.errors = 0
+        self.last_error = None
+
+    def _failed(self, error):
+        with self._stats_lock:
+            self.errors += 1
+            self.last_error = f"{type(error).__name__}: {error}"
+
+    def _count(self, name):
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def get(self, key):
+        """Valor vigente de ``key`` o None"""
+        try:
+            raw = self._get(self.prefix + key)
+        except Exception as e:
+            self._failed(e)
+            return None
+        self._count("hits" if raw is not None else "misses")
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl):
+        try:
+            self._set(self.prefix + key, json.dumps(value), ttl)
+        except Exception as e:
+            self._failed(e)
+
+    def get_or_compute(self, key, compute, ttl, wait_timeout=None, lease_seconds=None):
+        """Devuelve ``(valor, calculado_aquí)``.
+
+        ``compute()`` devuelve el valor a publicar, o None si no hay nada que
+        publicar (un error, o un valor que ya guardó por su cuenta). El lease
+        dura ``lease_seconds`` (por defecto ``self.lease_seconds``) y debe
+        cubrir el ``compute()`` más lento: si vence antes, otra réplica
+        calcula a la vez. Si otra réplica tiene el lease se espera hasta
+        ``wait_timeout`` segundos (por defecto la duración del lease) a que
+        publique; después se calcula aquí de todas formas.
+        """
+        lease_seconds = lease_seconds or self.lease_seconds
+        value = self.get(key)
+        if value is not None:
+            return value, False
+        lease_key = f"{self.prefix}lease:{key}"
+        deadline = time.monotonic() + (wait_timeout or lease_seconds)
+        while True:
+            token = self._try_lease(lease_key, lease_seconds)
+            if token is not None:
+                try:
+                    # Otra réplica pudo publicar entre la lectura y el lease
+                    value = self.get(key)
+                    if value is not None:
+                        return value, False
+                    return self._compute(key, compute, ttl), True
+                finally:
+                    self._release(lease_key, token)
+            time.sleep(POLL_SECONDS)
+            value = self.get(key)
+            if value is not None:
+                self._count("waited")
+                return value, False
+            if time.monotonic() >= deadline:
+                self._count("lease_timeouts")
+                return self._compute(key, compute, ttl), True
+
+    def _compute(self, key, compute, ttl):
+        value = compute()
+        self._count("computed")
+        if value is not None:
+            self.set(key, value, ttl)
+        return value
+
+    def _try_lease(self, lease_key, seconds):
+        token = f"{self.owner}:{uuid.uuid4().hex}"
+        try:
+            return token if self._acquire(lease_key, token, seconds) else None
+        except Exception as e:
+            # Sin backend no hay coordinación posible: se calcula como si el lease fuera nuestro
+            self._failed(e)
+            return ""
+
+    def _release(self, lease_key, token):
+        if not token:
+            return
+        try:
+            self._release_lease(lease_key, token)
+        except Exception as e:
+            self._failed(e)
+
+    def stats(self):
+        with self._stats_lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": self.backend,
+                "owner": self.owner,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "computed": self.computed,
+                "waited_for_other_replica": self.waited,
+                "lease_timeouts": self.lease_timeouts,
+                "errors": self.errors,
+                "last_error": self.last_error,
+            }
+
+
+class SqliteSharedStore(SharedStore):
+    """Backend en un archivo SQLite (WAL, lecturas por mmap) para réplicas que comparten disco"""
+
+    backend = "sqlite"
+
+    def __init__(self, path, mmap_bytes=64 * 1024 * 1024, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._db = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(f"PRAGMA mmap_size={int(mmap_bytes)}")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS shared_values (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS shared_leases (key TEXT PRIMARY KEY, token TEXT NOT NULL, expires REAL NOT NULL)"
+        )
+
+    def _get(self, key):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value FROM shared_values WHERE key = ? AND expires > ?", (key, time.time())
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    def _set(self, key, raw, ttl):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO shared_values (key, value, expires) VALUES (?, ?, ?)", (key, raw, now + ttl)
+            )
+            self._writes += 1
+            if self._writes % 1000 == 0:
+                self._db.execute("DELETE FROM shared_values WHERE expires <= ?", (now,))
+
+    def _acquire(self, lease_key, token, seconds):
+        now = time.time()
+        # Una sola sentencia: inserta el lease o reemplaza uno vencido, de forma atómica entre procesos
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO shared_leases (key, token, expires) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET token = excluded.token, expires = excluded.expires "
+                "WHERE shared_leases.expires <= ?",
+                (lease_key, token, now + seconds, now),
+            )
+        return cursor.rowcount == 1
+
+    def _release_lease(self, lease_key, token):
+        with self._lock:
+            self._db.execute("DELETE FROM shared_leases WHERE key = ? AND token = ?", (lease_key, token))
+
+    def stats(self):
+        return {**super().stats(), "path": self.path}
+
+
+class RedisSharedStore(SharedStore):
+    """Backend en un servidor compatible con Redis (requiere el paquete ``redis``)"""
+
+    backend = "redis"
+
+    def __init__(self, url, **kwargs):
+        super().__init__(**kwargs)
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError("ICFES_SHARED_STORE es una URL de Redis pero falta el paquete redis (pip install redis)") from e
+
+        self.url = url
+        self._redis = redis.Redis.from_url(url, socket_timeout=1.0, socket_connect_timeout=1.0)
+        self._release_script = self._redis.register_script(_REDIS_RELEASE)
+
+    def _get(self, key):
+        raw = self._redis.get(key)
+        return raw.decode("utf-8") if raw is not None else None
+
+    def _set(self, key, raw, ttl):
+        self._redis.set(key, raw, px=max(1, int(ttl * 1000)))
+
+    def _acquire(self, lease_key, token, seconds):
+        return bool(self._redis.set(lease_key, token, nx=True, px=max(1, int(seconds * 1000))))
+
+    def _release_lease(self, lease_key, token):
+        self._release_script(keys=[lease_key], args=[token])
+
+    def stats(self):
+        # Sin credenciales en la URL que se muestra
+        return {**super().stats(), "url": self.url.split("@")[-1]}
+
+
+def open_shared_store(url=None):
+    """Almacén de ``ICFES_SHARED_STORE``: Redis para URLs redis://, SQLite para el resto; None si está vacía"""
+    url = url if url is not None else DEFAULT_SHARED_STORE
+    if not url:
+        return None
+    if url.startswith(REDIS_SCHEMES):
+        return RedisSharedStore(url)
+    return SqliteSharedStore(url[len("sqlite:///"):] if url.startswith("sqlite:///") else url)
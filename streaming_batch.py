@@ -0,0 +1,235 @@
+import os
+import tempfile
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from batch_prediction import score_chunk, validate_features
+from prediction_client import FEATURE_COLUMNS, _env_float, _env_int
+
+
+# Filas que se leen del archivo por chunk en modo streaming
+STREAM_CHUNK_ROWS = _env_int("ICFES_STREAM_CHUNK_ROWS", 50000)
+
+# Carpeta del servidor con archivos grandes para puntuar sin subirlos (opcional)
+DATA_DIR = os.environ.get("ICFES_BATCH_DATA_DIR") or None
+
+# Carpeta donde se escriben los resultados
+OUTPUT_DIR = os.environ.get("ICFES_BATCH_OUTPUT_DIR") or tempfile.gettempdir()
+
+# Prefijo de los CSV de resultados: solo estos archivos se borran al podar OUTPUT_DIR
+OUTPUT_PREFIX = "predicciones_icfes_"
+
+# Horas que se conservan en el servidor los resultados que no se descargaron
+OUTPUT_TTL_SECONDS = _env_float("ICFES_BATCH_OUTPUT_TTL_HOURS", 24.0) * 3600
+
+# Límites del histograma de puntajes globales (0-500 en tramos de 10 puntos)
+HISTOGRAM_BINS = np.linspace(0, 500, 51)
+
+RESULT_COLUMNS = ["FILA", *FEATURE_COLUMNS, "PREDICCION_PUNT_GLOBAL", "ERROR"]
+
+
+def data_files():
+    """Archivos CSV o Parquet de ``DATA_DIR`` que se pueden puntuar en streaming"""
+    if not DATA_DIR or not Path(DATA_DIR).is_dir():
+        return []
+    return sorted(
+        path.name for path in Path(DATA_DIR).iterdir()
+        if path.is_file() and path.suffix.lower() in (".csv", ".parquet")
+    )
+
+
+def prune_outputs(max_age=OUTPUT_TTL_SECONDS):
+    """Borra los resultados de ``OUTPUT_DIR`` con más de ``max_age`` segundos; devuelve cuántos borró"""
+    cutoff = time.time() - max_age
+    removed = 0
+    for path in Path(OUTPUT_DIR).glob(f"{OUTPUT_PREFIX}*.csv"):
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+                removed += 1
+        except OSError:
+            # Otro proceso pudo borrarlo o seguir escribiéndolo
+            continue
+    return removed
+
+
+def new_output_path():
+    """Ruta única para los resultados de una corrida; antes poda los resultados vencidos"""
+    prune_outputs()
+    return Path(OUTPUT_DIR) / f"{OUTPUT_PREFIX}{int(time.time())}_{uuid.uuid4().hex[:8]}.csv"
+
+
+def _file_size(handle):
+    position = handle.tell()
+    handle.seek(0, os.SEEK_END)
+    size = handle.tell()
+    handle.seek(position)
+    return size
+
+
+def iter_chunks(handle, name, chunk_rows=STREAM_CHUNK_ROWS):
+    """Genera ``(chunk, fracción_leída)`` sin cargar el archivo completo.
+
+    Parquet se lee por lotes de sus row groups y CSV con el lector por chunks
+    de pandas; en ambos casos solo se leen las cinco columnas del modelo.
+    """
+    if Path(name).suffix.lower() == ".parquet":
+        import pyarrow.parquet as pq
+
+        parquet = pq.ParquetFile(handle)
+        missing = [column for column in FEATURE_COLUMNS if column not in parquet.schema_arrow.names]
+        if missing:
+            raise ValueError(f"Faltan columnas requeridas: {', '.join(missing)}")
+        total, done = max(parquet.metadata.num_rows, 1), 0
+        for batch in parquet.iter_batches(batch_size=chunk_rows, columns=FEATURE_COLUMNS):
+            done += batch.num_rows
+            yield batch.to_pandas(), done / total
+        return
+
+    size = max(_file_size(handle), 1)
+    header = pd.read_csv(handle, nrows=0)
+    missing = [column for column in FEATURE_COLUMNS if column not in header.columns]
+    if missing:
+        raise ValueError(f"Faltan columnas requeridas: {', '.join(missing)}")
+    handle.seek(0)
+    for chunk in pd.read_csv(handle, usecols=FEATURE_COLUMNS, chunksize=chunk_rows):
+        # Posición del lector en el archivo: aproximada, el parser lee por bloques
+        yield chunk, min(handle.tell() / size, 1.0)
+
+
+class RunningStats:
+    """Conteo, media, desviación, extremos e histograma de los puntajes, chunk a chunk"""
+
+    def __init__(self, bins=HISTOGRAM_BINS):
+        self.bins = bins
+        self.histogram = np.zeros(len(bins) - 1, dtype=np.int64)
+        self.count = 0
+        self.failed = 0
+        self.invalid = 0
+        self._sum = 0.0
+        self._sum_squares = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, scores):
+        scores = np.asarray(scores, dtype=np.float64)
+        valid = scores[~np.isnan(scores)]
+        self.failed += len(scores) - len(valid)
+        if not len(valid):
+            return
+        self.count += len(valid)
+        self._sum += float(valid.sum())
+        self._sum_squares += float(np.square(valid).sum())
+        self.min = min(self.min, float(valid.min()))
+        self.max = max(self.max, float(valid.max()))
+        self.histogram += np.histogram(np.clip(valid, self.bins[0], self.bins[-1]), bins=self.bins)[0]
+
+    @property
+    def mean(self):
+        return self._sum / self.count if self.count else None
+
+    @property
+    def std(self):
+        if self.count < 2:
+            return None
+        variance = (self._sum_squares - self._sum ** 2 / self.count) / (self.count - 1)
+        return max(variance, 0.0) ** 0.5
+
+    def histogram_frame(self):
+        """Histograma listo para ``st.bar_chart``: índice = inicio del tramo"""
+        return pd.DataFrame({"Estudiantes": self.histogram}, index=pd.Index(self.bins[:-1].astype(int), name="Puntaje"))
+
+    def summary(self):
+        return {
+            "scored_rows": self.count,
+            "failed_rows": self.failed,
+            "invalid_rows": self.invalid,
+            "mean": self.mean,
+            "std": self.std,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+        }
+
+
+def _score_part(start_row, chunk, client, ensemble, request_rows):
+    """Valida y puntúa un chunk; devuelve ``(resultados, filas_inválidas)``"""
+    features, invalid_mask, _ = validate_features(chunk)
+    valid = features[~invalid_mask.to_numpy()]
+    if ensemble is not None:
+        predictions = ensemble.predict(valid[ensemble.feature_names].to_numpy(dtype=np.float64)) if len(valid) else np.empty(0)
+        errors = [None] * len(valid)
+    else:
+        predictions, errors = [], []
+        for offset in range(0, len(valid), request_rows):
+            part_predictions, part_errors = score_chunk(client, valid.iloc[offset:offset + request_rows])
+            predictions.extend(part_predictions)
+            errors.extend(part_errors)
+    results = valid.copy()
+    results.insert(0, "FILA", start_row + np.flatnonzero(~invalid_mask.to_numpy()))
+    results["PREDICCION_PUNT_GLOBAL"] = np.array([np.nan if value is None else value for value in predictions], dtype=np.float64)
+    results["ERROR"] = errors
+    return results, int(invalid_mask.sum())
+
+
+def stream_score(handle, name, output_path, client=None, ensemble=None, chunk_rows=STREAM_CHUNK_ROWS,
+                 max_in_flight=4, request_rows=500, progress_callback=None):
+    """Puntúa un archivo por chunks y escribe los resultados en ``output_path`` a medida que terminan.
+
+    A lo sumo ``max_in_flight`` chunks están leídos y sin escribir a la vez
+    (en vuelo o esperando a uno anterior para respetar el orden), así que la
+    memoria depende del tamaño del chunk y no del archivo. Con ``ensemble``
+    se puntúa en proceso; si no, con ``client`` en peticiones de
+    ``request_rows`` filas. ``progress_callback(stats, fracción, filas_por_segundo)``
+    se llama desde el hilo que invoca la función tras escribir cada chunk.
+    """
+    stats = RunningStats()
+    started = time.perf_counter()
+    pending, ready = {}, {}
+    next_to_write, written_fraction = 0, 0.0
+    fractions = {}
+
+    with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="icfes-stream") as executor, \
+            open(output_path, "w", newline="", encoding="utf-8") as output:
+
+        def drain():
+            nonlocal next_to_write, written_fraction
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                ready[pending.pop(future)] = future.result()
+            while next_to_write in ready:
+                results, invalid = ready.pop(next_to_write)
+                results.to_csv(output, header=next_to_write == 0, index=False)
+                stats.invalid += invalid
+                stats.update(results["PREDICCION_PUNT_GLOBAL"].to_numpy())
+                written_fraction = fractions.pop(next_to_write)
+                next_to_write += 1
+                if progress_callback is not None:
+                    elapsed = time.perf_counter() - started
+                    processed = stats.count + stats.failed + stats.invalid
+                    progress_callback(stats, written_fraction, processed / elapsed if elapsed > 0 else 0.0)
+
+        start_row = 0
+        for sequence, (chunk, fraction) in enumerate(iter_chunks(handle, name, chunk_rows)):
+            fractions[sequence] = fraction
+            pending[executor.submit(_score_part, start_row, chunk, client, ensemble, request_rows)] = sequence
+            start_row += len(chunk)
+            del chunk
+            while len(pending) + len(ready) >= max_in_flight:
+                drain()
+        while pending:
+            drain()
+
+    elapsed = time.perf_counter() - started
+    total = stats.count + stats.failed + stats.invalid
+    return stats, {
+        "rows": total,
+        "seconds": elapsed,
+        "rows_per_second": total / elapsed if elapsed > 0 else 0.0,
+        "output_path": str(output_path),
+        "output_bytes": os.path.getsize(output_path),
+    }
@@ -0,0 +1,137 @@
+import gzip
+import json
+
+import numpy as np
+
+from prediction_client import FEATURE_COLUMNS, extract_prediction
+
+
+JSON = "application/json"
+ARROW = "application/vnd.apache.arrow.stream"
+F32 = "application/x-icfes-float32"
+
+FORMATS = {"json": JSON, "arrow": ARROW, "f32": F32}
+
+IDENTITY = "identity"
+GZIP = "gzip"
+ZSTD = "zstd"
+
+# Header con el orden de columnas del arreglo float32 (el cuerpo no lleva esquema)
+COLUMNS_HEADER = "X-Icfes-Columns"
+
+PREDICTION_COLUMN = "predictions"
+
+
+def has_arrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def has_zstd():
+    try:
+        import zstandard  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def resolve_format(name):
+    """Tipo de contenido para ``ICFES_WIRE_FORMAT``: json, arrow, f32 o auto (Arrow si hay pyarrow)"""
+    if name == "auto":
+        return ARROW if has_arrow() else F32
+    return FORMATS.get(name, JSON)
+
+
+def resolve_encoding(name):
+    """Compresión del cuerpo; zstd sin el paquete ``zstandard`` cae a gzip"""
+    if name == ZSTD and not has_zstd():
+        return GZIP
+    return name if name in (GZIP, ZSTD) else IDENTITY
+
+
+def compress(body, encoding):
+    if encoding == GZIP:
+        return gzip.compress(body, compresslevel=1)
+    if encoding == ZSTD:
+        import zstandard
+
+        return zstandard.ZstdCompressor(level=3).compress(body)
+    return body
+
+
+def decompress(body, encoding):
+    if encoding == GZIP:
+        return gzip.decompress(body)
+    if encoding == ZSTD:
+        import zstandard
+
+        return zstandard.ZstdDecompressor().decompress(body)
+    return body
+
+
+def _arrow_bytes(arrays, names):
+    import pyarrow as pa
+
+    batch = pa.RecordBatch.from_arrays([pa.array(array, type=pa.float32()) for array in arrays], names=names)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+
+def _arrow_table(body):
+    import pyarrow as pa
+
+    return pa.ipc.open_stream(body).read_all()
+
+
+def encode_rows(values, content_type):
+    """Serializa una matriz ``(filas, 5)`` en el orden de FEATURE_COLUMNS"""
+    values = np.asarray(values, dtype=np.float64)
+    if content_type == ARROW:
+        return _arrow_bytes([values[:, i] for i in range(values.shape[1])], FEATURE_COLUMNS)
+    if content_type == F32:
+        return np.ascontiguousarray(values, dtype="<f4").tobytes()
+    return json.dumps([dict(zip(FEATURE_COLUMNS, row)) for row in values.tolist()]).encode("utf-8")
+
+
+def decode_rows(body, content_type, columns=None):
+    """Inverso de ``encode_rows``: devuelve la matriz float64 ``(filas, 5)``"""
+    if content_type == ARROW:
+        table = _arrow_table(body)
+        return np.column_stack([table.column(name).to_numpy() for name in FEATURE_COLUMNS]).astype(np.float64)
+    if content_type == F32:
+        order = columns or FEATURE_COLUMNS
+        values = np.frombuffer(body, dtype="<f4").reshape(-1, len(order)).astype(np.float64)
+        return values[:, [order.index(name) for name in FEATURE_COLUMNS]]
+    rows = json.loads(body)
+    return np.array([[float(row[name]) for name in FEATURE_COLUMNS] for row in rows], dtype=np.float64).reshape(-1, len(FEATURE_COLUMNS))
+
+
+def encode_predictions(scores, content_type):
+    """Serializa las predicciones de un lote (respuesta del servidor)"""
+    scores = np.asarray(scores, dtype=np.float64)
+    if content_type == ARROW:
+        return _arrow_bytes([scores], [PREDICTION_COLUMN])
+    if content_type == F32:
+        return np.ascontiguousarray(scores, dtype="<f4").tobytes()
+    return json.dumps({PREDICTION_COLUMN: scores.tolist()}).encode("utf-8")
+
+
+def decode_predictions(body, content_type):
+    """Predicciones de una respuesta de lote como arreglo float64 (NaN donde falten)"""
+    content_type = (content_type or JSON).split(";")[0].strip()
+    if content_type == ARROW:
+        return _arrow_table(body).column(PREDICTION_COLUMN).to_numpy().astype(np.float64)
+    if content_type == F32:
+        return np.frombuffer(body, dtype="<f4").astype(np.float64)
+    payload = json.loads(body)
+    if isinstance(payload, dict):
+        payload = payload.get(PREDICTION_COLUMN, payload.get("results"))
+    if not isinstance(payload, list):
+        raise ValueError("La respuesta del endpoint de lotes no trae una lista de predicciones")
+    values = [extract_prediction(item) if isinstance(item, dict) else item for item in payload]
+    return np.array([np.nan if value is None else float(value) for value in values], dtype=np.float64)